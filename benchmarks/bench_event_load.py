@@ -0,0 +1,393 @@
+#!/usr/bin/env python
+
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Drives synthetic onu.events and authentication.events for a whole fleet of ONUs through
+# ONUEventStep, SubscriberAuthEventStep and the model policies they trigger, against the
+# mock model accessor and a stub ONOS, and reports the throughput, the latency and the
+# model reads and writes per event of each phase:
+#
+#   whitelist       the whitelist entries of the fleet are created
+#   activated       an "activated" onu.event for each ONU
+#   authenticated   an "APPROVED" authentication.event for each ONU (package B)
+#   repeated        the "activated" onu.events again, they don't change anything
+#   disabled        a "disabled" onu.event for each ONU
+#
+# The latency of an event includes the model policies run because of the models it saved.
+# The results are written as a JSON baseline, a later run can be compared to it:
+#
+#   python benchmarks/bench_event_load.py --onus 1000,10000 --output event_load.json
+#   python benchmarks/bench_event_load.py --onus 1000,10000 --compare event_load.json
+
+import argparse
+import collections
+import json
+import platform
+import threading
+import time
+
+from bench_utils import NullLog, setup_model_accessor, install_store, percentile, print_table, exit
+
+ONU_COUNTS = [1000, 10000, 100000]
+ONUS_PER_PON = 32
+PONS_PER_OLT = 16
+FIRST_PON_PORT = 536870912
+# a phase slower than the baseline by more than this fraction is reported as a regression
+TOLERANCE = 0.2
+
+TECHNOLOGY_PROFILE = '{"profile_type": "EPON","epon_attribute": {"package_type": "B"}}'
+
+
+class StubResponse(object):
+    status_code = 200
+    text = ""
+
+
+class StubOnosClient(object):
+    """ Stands for the ONOS olt-app, counts the subscriber calls """
+
+    base_url = "http://onos-voltha-rest:8181"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = collections.Counter()
+
+    def add_subscriber(self, of_dpid, uni_port_id):
+        with self.lock:
+            self.calls["add"] += 1
+        return StubResponse()
+
+    def remove_subscriber(self, of_dpid, uni_port_id):
+        with self.lock:
+            self.calls["remove"] += 1
+        return StubResponse()
+
+
+class KafkaMessage(object):
+    """ The fields of XOSKafkaMessage used by the event steps """
+
+    def __init__(self, topic, value, timestamp):
+        self.topic = topic
+        self.key = None
+        self.value = json.dumps(value)
+        self.timestamp = timestamp
+
+
+class Fleet(object):
+    """ The OLTs, PON ports, ONUs and whitelist entries of a deployment """
+
+    def __init__(self, model_accessor, package="B"):
+        self.model_accessor = model_accessor
+        self.service = model_accessor.NttWorkflowDriverService(
+            id=1, name="ntt-workflow-driver", onos_voltha_url="onos-voltha-rest", onos_voltha_port=8181,
+            onos_voltha_user="onos", onos_voltha_pass="rocks")
+        self.profile = model_accessor.TechnologyProfile(
+            id=1, profile_id=64, profile_value=TECHNOLOGY_PROFILE.replace('"B"', '"%s"' % package))
+        self.pon_ports = {}
+        self.onus = []
+        self.whitelist = []
+
+    @property
+    def olts(self):
+        return len(set(onu.of_dpid for onu in self.onus))
+
+    def add_onu(self, serial_number, mac_address, of_dpid, uni_port_id, pon_port, pon_port_range):
+        """ Add an ONU, whitelisted on the range of PON ports """
+        key = (of_dpid, pon_port)
+        if key not in self.pon_ports:
+            self.pon_ports[key] = self.model_accessor.PONPort(id=len(self.pon_ports) + 1, port_no=pon_port)
+        onu = self.model_accessor.ONUDevice(
+            id=len(self.onus) + 1, serial_number=serial_number, mac_address=mac_address,
+            pon_port=self.pon_ports[key], admin_state="AUTO_ACTIVATED")
+        onu.of_dpid = of_dpid
+        onu.uni_port_id = uni_port_id
+        self.onus.append(onu)
+        self.whitelist.append(self.model_accessor.NttWorkflowDriverWhiteListEntry(
+            id=len(self.whitelist) + 1, owner=self.service, owner_id=self.service.id, mac_address=mac_address,
+            pon_port_from=pon_port_range[0], pon_port_to=pon_port_range[1]))
+        return onu
+
+    def interleaved(self):
+        """ The ONUs, interleaved across the OLTs as their events would be on the bus """
+        return sorted(self.onus, key=lambda onu: (onu.uni_port_id, onu.of_dpid))
+
+
+def synthetic_fleet(model_accessor, onus, onus_per_pon, pons_per_olt):
+    fleet = Fleet(model_accessor)
+    onus_per_olt = onus_per_pon * pons_per_olt
+    for i in range(onus):
+        (olt, index) = divmod(i, onus_per_olt)
+        fleet.add_onu("BBSM%04x%04x" % (olt, index), "0a%04x%06x" % (olt, index), "of:%016x" % (olt + 1),
+                      16 * (index + 1), FIRST_PON_PORT + index // onus_per_pon,
+                      (FIRST_PON_PORT, FIRST_PON_PORT + pons_per_olt - 1))
+    return fleet
+
+
+class EventLoad(object):
+    """ Runs the phases for a fleet and collects their measurements """
+
+    def __init__(self, model_accessor, fleet):
+        self.model_accessor = model_accessor
+        self.fleet = fleet
+        self.log = NullLog()
+        self.timestamp = int(time.time() * 1000)
+
+        from helpers import NttHelpers
+        from onu_event import ONUEventStep
+        from auth_event import SubscriberAuthEventStep
+        from model_policy_ntt_workflow_driver_serviceinstance import NttWorkflowDriverServiceInstancePolicy
+        from model_policy_ntt_workflow_driver_whitelistentry import NttWorkflowDriverWhiteListEntryPolicy
+        import onos_client
+
+        self.helpers = NttHelpers
+        self.onu_step = ONUEventStep
+        self.auth_step = SubscriberAuthEventStep
+
+        self.si_policy = NttWorkflowDriverServiceInstancePolicy(model_accessor=model_accessor)
+        self.si_policy.logger = self.log
+        self.whitelist_policy = NttWorkflowDriverWhiteListEntryPolicy(model_accessor=model_accessor)
+        self.whitelist_policy.logger = self.log
+
+        # get_onos_client returns the client cached for the service's ONOS endpoint
+        self.onos = StubOnosClient()
+        service = fleet.service
+        key = (service.onos_voltha_url, service.onos_voltha_port, service.onos_voltha_user, service.onos_voltha_pass)
+        with onos_client.clients_lock:
+            onos_client.clients[key] = self.onos
+
+        self.stores = {
+            "NttWorkflowDriverService": install_store(model_accessor.NttWorkflowDriverService, [service]),
+            "TechnologyProfile": install_store(model_accessor.TechnologyProfile, [fleet.profile]),
+            "ONUDevice": install_store(model_accessor.ONUDevice, fleet.onus),
+            "NttWorkflowDriverWhiteListEntry": install_store(model_accessor.NttWorkflowDriverWhiteListEntry, []),
+            "NttWorkflowDriverServiceInstance": install_store(model_accessor.NttWorkflowDriverServiceInstance, []),
+            "NttWorkflowDriverOltInformation": install_store(model_accessor.NttWorkflowDriverOltInformation, []),
+        }
+
+        # like XOS, the policy of a model runs when it's created or saved with always_update_timestamp
+        self.policy_queue = collections.deque()
+        self.policies = {
+            "NttWorkflowDriverServiceInstance": self.si_policy,
+            "NttWorkflowDriverWhiteListEntry": self.whitelist_policy,
+        }
+        for name in self.policies:
+            self.track_policy(getattr(model_accessor, name))
+
+    def track_policy(self, model_class):
+        queue = self.policy_queue
+
+        def save(model, update_fields=[], always_update_timestamp=False):
+            created = model.is_new
+            model.objects.save(model)
+            if created or always_update_timestamp:
+                queue.append((model_class.__name__, model, created))
+
+        model_class.save = save
+
+    def run_policies(self):
+        while self.policy_queue:
+            (name, model, created) = self.policy_queue.popleft()
+            policy = self.policies[name]
+            if created:
+                policy.handle_create(model)
+            else:
+                policy.handle_update(model)
+
+    def counters(self):
+        from metrics import elided_writes_total
+        return dict((name, (store.queries, store.reads, store.writes, elided_writes_total.get(model=name)))
+                    for (name, store) in self.stores.items())
+
+    def process(self, process_event, latencies):
+        """ Process an event and run the model policies it triggers """
+        start = time.time()
+        process_event()
+        self.run_policies()
+        latencies.append(time.time() - start)
+
+    def run_phase(self, name, events):
+        """ Process the events one at a time """
+        return self.measure(lambda latencies: [self.process(e, latencies) for e in events])
+
+    def measure(self, run):
+        """
+        Call `run(latencies)`, which processes events and appends their latencies to the list.
+        Then the due ONOS provisioning jobs are fired and awaited.
+        """
+        before = self.counters()
+        calls = sum(self.onos.calls.values())
+        latencies = []
+        start = time.time()
+        run(latencies)
+
+        self.helpers.provisioning_scheduler.run_pending(now=time.time() + self.helpers.provisioning_scheduler.delay)
+        self.helpers.onos_dispatcher.join()
+        elapsed = time.time() - start
+
+        after = self.counters()
+        count = float(len(latencies))
+        queries = sum(after[n][0] - before[n][0] for n in after)
+        reads = sum(after[n][1] - before[n][1] for n in after)
+        writes = sum(after[n][2] - before[n][2] for n in after)
+        elided = sum(after[n][3] - before[n][3] for n in after)
+        return collections.OrderedDict([
+            ("events", len(latencies)),
+            ("seconds", round(elapsed, 3)),
+            ("events_per_second", round(len(latencies) / elapsed, 1)),
+            ("p50_ms", round(percentile(latencies, 50) * 1e3, 3)),
+            ("p99_ms", round(percentile(latencies, 99) * 1e3, 3)),
+            ("queries_per_event", round(queries / count, 2)),
+            ("reads_per_event", round(reads / count, 2)),
+            ("writes_per_event", round(writes / count, 2)),
+            ("elided_writes_per_event", round(elided / count, 2)),
+            ("onos_calls", sum(self.onos.calls.values()) - calls),
+        ])
+
+    def next_timestamp(self):
+        self.timestamp += 1
+        return self.timestamp
+
+    def onu_event(self, onu, status):
+        message = KafkaMessage("onu.events", {
+            "timestamp": self.next_timestamp(),
+            "status": status,
+            "serialNumber": onu.serial_number,
+            "portNumber": str(onu.uni_port_id),
+            "deviceId": onu.of_dpid,
+        }, self.timestamp)
+        # the Kafka engine creates a step for each event
+        return lambda: self.onu_step(model_accessor=self.model_accessor, log=self.log).process_event(message)
+
+    def auth_event(self, onu, state):
+        message = KafkaMessage("authentication.events", {
+            "timestamp": self.next_timestamp(),
+            "deviceId": onu.of_dpid,
+            "portNumber": str(onu.uni_port_id),
+            "serialNumber": onu.serial_number,
+            "authenticationState": state,
+        }, self.timestamp)
+        return lambda: self.auth_step(model_accessor=self.model_accessor, log=self.log).process_event(message)
+
+    def create_whitelist_entry(self, entry):
+        return lambda: entry.save()
+
+    def run(self):
+        onus = self.fleet.interleaved()
+        phases = collections.OrderedDict()
+        phases["whitelist"] = self.run_phase(
+            "whitelist", [self.create_whitelist_entry(e) for e in self.fleet.whitelist])
+        phases["activated"] = self.run_phase(
+            "activated", [self.onu_event(onu, "activated") for onu in onus])
+        phases["authenticated"] = self.run_phase(
+            "authenticated", [self.auth_event(onu, "APPROVED") for onu in onus])
+        phases["repeated"] = self.run_phase(
+            "repeated", [self.onu_event(onu, "activated") for onu in onus])
+        phases["disabled"] = self.run_phase(
+            "disabled", [self.onu_event(onu, "disabled") for onu in onus])
+
+        sis = self.stores["NttWorkflowDriverServiceInstance"].items
+        assert len(sis) == len(onus), "%d service instances for %d ONUs" % (len(sis), len(onus))
+        assert phases["authenticated"]["onos_calls"] == len(onus), "every subscriber must be provisioned"
+        return phases
+
+
+def reset_caches():
+    from whitelist_index import whitelist_index
+    from service_instance_index import service_instance_index
+    from onu_index import onu_index
+    from technology_profile import technology_profile_cache
+    from olt_information_cache import olt_information_cache
+    from pending_events import pending_events
+    from event_dedup import event_dedup
+    from admission_cache import admission_cache
+
+    for cache in [whitelist_index, service_instance_index, onu_index, technology_profile_cache,
+                  olt_information_cache, pending_events, event_dedup, admission_cache]:
+        cache.clear()
+
+
+def compare(results, baseline_path):
+    """
+    Compare the throughput of each phase to the baseline
+
+    :return: the number of phases slower than the baseline by more than TOLERANCE
+    """
+    with open(baseline_path) as f:
+        baseline = dict((r["onus"], r["phases"]) for r in json.load(f)["results"])
+
+    rows = []
+    regressions = 0
+    for result in results:
+        for (phase, measures) in result["phases"].items():
+            reference = baseline.get(result["onus"], {}).get(phase)
+            if reference is None:
+                continue
+            ratio = measures["events_per_second"] / reference["events_per_second"]
+            regression = ratio < 1 - TOLERANCE
+            regressions += regression
+            rows.append((result["onus"], phase, reference["events_per_second"], measures["events_per_second"],
+                         "%.2f" % ratio, reference["writes_per_event"], measures["writes_per_event"],
+                         "REGRESSION" if regression else ""))
+
+    print("")
+    print_table(("onus", "phase", "baseline_ev_s", "ev_s", "ratio", "baseline_writes", "writes", ""), rows)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic event load on the NTT workflow driver")
+    parser.add_argument("--onus", default=",".join(str(c) for c in ONU_COUNTS),
+                        help="comma separated fleet sizes (default: %(default)s)")
+    parser.add_argument("--onus-per-pon", type=int, default=ONUS_PER_PON)
+    parser.add_argument("--pons-per-olt", type=int, default=PONS_PER_OLT)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare the results to a JSON baseline, exit with 1 on a regression")
+    args = parser.parse_args()
+
+    model_accessor = setup_model_accessor()
+
+    results = []
+    rows = []
+    for count in [int(c) for c in args.onus.split(",")]:
+        reset_caches()
+        fleet = synthetic_fleet(model_accessor, count, args.onus_per_pon, args.pons_per_olt)
+        phases = EventLoad(model_accessor, fleet).run()
+        results.append(collections.OrderedDict([("onus", count), ("olts", fleet.olts), ("phases", phases)]))
+        for (phase, m) in phases.items():
+            rows.append((count, fleet.olts, phase, m["events_per_second"], "%.3f" % m["p50_ms"],
+                         "%.3f" % m["p99_ms"], m["reads_per_event"], m["writes_per_event"],
+                         m["elided_writes_per_event"], m["onos_calls"]))
+
+    print_table(("onus", "olts", "phase", "events_s", "p50_ms", "p99_ms", "reads_ev", "writes_ev", "elided_ev",
+                 "onos"), rows)
+
+    report = collections.OrderedDict([
+        ("python", platform.python_version()),
+        ("onus_per_pon", args.onus_per_pon),
+        ("pons_per_olt", args.pons_per_olt),
+        ("results", results),
+    ])
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, separators=(",", ": "))
+            f.write("\n")
+
+    if args.compare and compare(results, args.compare):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
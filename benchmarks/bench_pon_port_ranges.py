@@ -0,0 +1,73 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Compares the PON port check of PonPortRanges with a linear scan over the whitelist
+# entries of a MAC address, for a growing number of entries, and measures the cost of
+# updating an entry.
+#
+#   python benchmarks/bench_pon_port_ranges.py
+
+import random
+import sys
+
+from bench_utils import synchronizer_path, measure, percentile, print_table
+
+ENTRY_COUNTS = [1, 10, 100, 1000, 10000]
+ITERATIONS = 5000
+
+
+def linear_scan(ranges, port_no):
+    return any(pon_port_from <= port_no <= pon_port_to for (pon_port_from, pon_port_to) in ranges)
+
+
+def main():
+    sys.path.append(synchronizer_path)
+    from pon_port_ranges import PonPortRanges
+
+    rnd = random.Random(42)
+    rows = []
+    for count in ENTRY_COUNTS:
+        entries = []
+        for i in range(count):
+            pon_port_from = rnd.randint(0, count * 100)
+            entries.append((pon_port_from, pon_port_from + rnd.randint(0, 50)))
+
+        ranges = PonPortRanges()
+        for (entry_id, (pon_port_from, pon_port_to)) in enumerate(entries):
+            ranges.add(entry_id, pon_port_from, pon_port_to)
+
+        ports = [rnd.randint(0, count * 100 + 50) for _ in range(ITERATIONS)]
+        for port_no in ports[:100]:
+            assert ranges.contains(port_no) == linear_scan(entries, port_no)
+
+        it = iter(ports)
+        scan = measure(lambda: linear_scan(entries, next(it)), ITERATIONS)
+        it = iter(ports)
+        indexed = measure(lambda: ranges.contains(next(it)), ITERATIONS)
+
+        # an entry update merges the intervals of the MAC address again
+        updates = measure(lambda: ranges.add(0, *entries[0]), min(ITERATIONS, 200))
+
+        rows.append((count, len(ranges.intervals()),
+                     "%.2f" % (percentile(scan, 50) * 1e6), "%.2f" % (percentile(scan, 99) * 1e6),
+                     "%.2f" % (percentile(indexed, 50) * 1e6), "%.2f" % (percentile(indexed, 99) * 1e6),
+                     "%.1f" % (percentile(updates, 50) * 1e6)))
+
+    print_table(("entries", "intervals", "scan_p50_us", "scan_p99_us", "indexed_p50_us", "indexed_p99_us",
+                 "update_p50_us"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Replays a recording of onu.events and authentication.events (see xos/synchronizer/event_recorder.py)
+# through the event steps and the model policies, against the mock model accessor and a stub ONOS.
+# The ONUs of the recording are created and whitelisted before the replay.
+#
+#   python benchmarks/bench_replay.py storm.jsonl.gz                # as fast as possible
+#   python benchmarks/bench_replay.py --speed 1 storm.jsonl.gz      # at the recorded pace
+#   python benchmarks/bench_replay.py --speed 10 storm.jsonl.gz     # 10 times faster
+
+import argparse
+import json
+
+from bench_utils import NullLog, setup_model_accessor, print_table, exit
+from bench_event_load import Fleet, EventLoad, FIRST_PON_PORT, reset_caches
+
+
+def recorded_fleet(model_accessor, events, package):
+    """ A fleet with the ONUs of the recorded events, all on the same PON port of their OLT """
+    fleet = Fleet(model_accessor, package)
+    serials = set()
+    for event in events:
+        value = json.loads(event.value)
+        serial_number = value.get("serialNumber", "").split("-")[0]
+        if not serial_number or serial_number in serials or "deviceId" not in value:
+            continue
+        serials.add(serial_number)
+        fleet.add_onu(serial_number, "%012x" % len(serials), value["deviceId"], long(value.get("portNumber", 0)),
+                      FIRST_PON_PORT, (FIRST_PON_PORT, FIRST_PON_PORT))
+    return fleet
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded events through the NTT workflow driver")
+    parser.add_argument("file", help="the recording to replay")
+    parser.add_argument("--speed", type=float,
+                        help="replay N times faster than the events were recorded (default: as fast as possible)")
+    parser.add_argument("--package", default="B", help="technology package of the TechnologyProfile (default: B)")
+    args = parser.parse_args()
+
+    model_accessor = setup_model_accessor()
+    from event_recorder import EventReplayer, read_events
+
+    events = list(read_events(args.file))
+    reset_caches()
+    fleet = recorded_fleet(model_accessor, events, args.package)
+    load = EventLoad(model_accessor, fleet)
+    load.run_phase("whitelist", [load.create_whitelist_entry(e) for e in fleet.whitelist])
+
+    def replay(latencies):
+        # the policies triggered by an event run right after it, and are part of its latency
+        steps = {}
+        for step in [load.onu_step, load.auth_step]:
+            for topic in step.topics:
+                steps[topic] = type(step.__name__, (step,), {
+                    "process_event": lambda self, event, step=step: load.process(
+                        lambda: step.process_event(self, event), latencies)})
+        stats.update(EventReplayer(model_accessor, NullLog(), steps, speed=args.speed).replay(events))
+
+    stats = {}
+    measures = load.measure(replay)
+
+    print_table(("onus", "olts", "events", "skipped", "failed", "events_s", "p50_ms", "p99_ms", "max_lag_s",
+                 "reads_ev", "writes_ev", "onos"),
+                [(len(fleet.onus), fleet.olts, measures["events"], stats["skipped"], stats["failed"],
+                  measures["events_per_second"], "%.3f" % measures["p50_ms"], "%.3f" % measures["p99_ms"],
+                  "%.3f" % stats["max_lag"], measures["reads_per_event"], measures["writes_per_event"],
+                  measures["onos_calls"])])
+
+
+if __name__ == "__main__":
+    main()
+    exit()
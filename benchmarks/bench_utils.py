@@ -0,0 +1,214 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Shared setup for the benchmarks, they run against the same mock model accessor
+# used by the unit tests, so they need the same checkout layout (see docs/README.md)
+
+import os
+import sys
+import time
+
+bench_path = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+synchronizer_path = os.path.abspath(os.path.join(bench_path, "..", "xos", "synchronizer"))
+
+
+class NullLog(object):
+    """ A logger that drops everything, so that logging doesn't dominate the measurements """
+
+    def _drop(self, *args, **kwargs):
+        pass
+
+    debug = info = warn = warning = error = exception = _drop
+
+    def bind(self, **kwargs):
+        return self
+
+
+def setup_model_accessor():
+    for path in [synchronizer_path,
+                 os.path.join(synchronizer_path, "event_steps"),
+                 os.path.join(synchronizer_path, "model_policies")]:
+        if path not in sys.path:
+            sys.path.append(path)
+
+    from xosconfig import Config
+    Config.clear()
+    Config.init(os.path.join(synchronizer_path, "test_config.yaml"), "synchronizer-config-schema.yaml")
+
+    from xossynchronizer.mock_modelaccessor_build import mock_modelaccessor_config
+    mock_modelaccessor_config(synchronizer_path, [("ntt-workflow-driver", "ntt-workflow-driver.xproto"),
+                                                  ("olt-service", "volt.xproto"),
+                                                  ("rcord", "rcord.xproto")])
+
+    from xossynchronizer.modelaccessor import model_accessor
+    return model_accessor
+
+
+class CountingObjectStore(object):
+    """
+    Replacement for the mock object stores that looks objects up through hash indexes,
+    like the indexes of a real database, and counts the queries and the objects read and written.
+
+    The equality filters use an index per field, built on first use and updated when an
+    object is saved: like in a database, the changes to an object are only visible to the
+    queries once it's saved.
+    """
+
+    def __init__(self, objects):
+        self.items = list(objects)
+        self.by_id = {}
+        self.indexes = {}
+        self.queries = 0
+        self.reads = 0
+        self.writes = 0
+        for (i, o) in enumerate(self.items):
+            if o.id in (None, 98052):
+                o.id = i + 1
+            self.by_id[o.id] = o
+        self.next_id = max(self.by_id.keys() or [0]) + 1
+
+    def _index(self, field):
+        index = self.indexes.get(field)
+        if index is None:
+            # value -> {id: object}, id -> indexed value
+            index = ({}, {})
+            for o in self.items:
+                value = getattr(o, field, None)
+                index[0].setdefault(value, {})[o.id] = o
+                index[1][o.id] = value
+            self.indexes[field] = index
+        return index
+
+    def _reindex(self, o):
+        for (field, (objects, values)) in self.indexes.items():
+            value = getattr(o, field, None)
+            if o.id in values:
+                old = values[o.id]
+                if old == value:
+                    continue
+                del objects[old][o.id]
+                if not objects[old]:
+                    del objects[old]
+            objects.setdefault(value, {})[o.id] = o
+            values[o.id] = value
+
+    def _read(self, objects):
+        self.queries += 1
+        self.reads += len(objects)
+        return objects
+
+    def get_items(self):
+        return self._read(self.items)
+
+    def count(self):
+        return len(self.items)
+
+    def first(self):
+        return self._read(self.items[:1])[0] if self.items else None
+
+    def all(self):
+        return self.get_items()
+
+    def filter(self, **kwargs):
+        if list(kwargs.keys()) == ["id"]:
+            o = self.by_id.get(kwargs["id"])
+            return self._read([o] if o else [])
+
+        exact = [k for k in kwargs if "__" not in k]
+        if exact:
+            candidates = sorted(self._index(exact[0])[0].get(kwargs[exact[0]], {}).values(), key=lambda o: o.id)
+        else:
+            candidates = self.items
+
+        items = candidates
+        for (k, v) in kwargs.items():
+            if k.endswith("__iexact"):
+                field = k[:-len("__iexact")]
+                items = [x for x in items if (getattr(x, field) or "").lower() == v.lower()]
+            else:
+                items = [x for x in items if getattr(x, k) == v]
+        return self._read(items)
+
+    def get(self, **kwargs):
+        objs = self.filter(**kwargs)
+        if not objs:
+            raise IndexError("No objects matching %s" % str(kwargs))
+        return objs[0]
+
+    def save(self, o):
+        self.writes += 1
+        if self.by_id.get(o.id) is not o:
+            # a new object, 98052 is the default id of the mock models
+            if o.id in (None, 98052) or o.id in self.by_id:
+                while self.next_id in self.by_id:
+                    self.next_id += 1
+                o.id = self.next_id
+            self.next_id = max(self.next_id, o.id + 1)
+            self.items.append(o)
+            self.by_id[o.id] = o
+        self._reindex(o)
+        # like the ORM, the saved state is the new reference to compute the changed fields
+        o.is_new = False
+        o.recompute_initial()
+
+
+def install_store(model_class, objects):
+    """ Replace the object store of `model_class` with a CountingObjectStore """
+    store = CountingObjectStore(objects)
+    model_class.objects = store
+    return store
+
+
+def set_objects(model_class, objects):
+    """ Replace the content of the mock object store of `model_class` """
+    model_class.objects.item_list = objects
+    for (i, o) in enumerate(objects):
+        if o.id in (None, 98052):
+            o.id = i + 1
+
+
+def measure(fn, iterations):
+    """ Call `fn` `iterations` times and return the per-call durations in seconds """
+    durations = []
+    for i in range(iterations):
+        start = time.time()
+        fn()
+        durations.append(time.time() - start)
+    return durations
+
+
+def percentile(durations, p):
+    ordered = sorted(durations)
+    if not ordered:
+        return 0.0
+    k = int(round((len(ordered) - 1) * p / 100.0))
+    return ordered[k]
+
+
+def print_table(header, rows):
+    widths = [max(len(str(x)) for x in column) for column in zip(header, *rows)]
+    line = "  ".join("%%%ds" % w for w in widths)
+    print(line % tuple(header))
+    for row in rows:
+        print(line % tuple(row))
+
+
+def exit(code=0):
+    """
+    Exit without tearing down the modules: the background workers of the driver are daemon threads
+    blocked on their queues, python 2 reports errors when the modules disappear under them.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(code)
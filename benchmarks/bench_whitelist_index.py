@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Measures NttHelpers.validate_onu against whitelists of growing size,
+# the per-validation cost is expected to stay flat.
+#
+#   python benchmarks/bench_whitelist_index.py
+
+from bench_utils import NullLog, setup_model_accessor, set_objects, measure, percentile, print_table
+
+WHITELIST_SIZES = [100, 1000, 10000, 50000]
+ITERATIONS = 2000
+
+
+def main():
+    model_accessor = setup_model_accessor()
+    from helpers import NttHelpers
+    from whitelist_index import whitelist_index
+
+    # the provisioning itself is not part of the validation cost
+    NttHelpers.provisioning_scheduler.schedule = lambda *args, **kwargs: None
+
+    log = NullLog()
+    service = model_accessor.NttWorkflowDriverService(id=1)
+
+    pon_port = model_accessor.PONPort(port_no=1234)
+    onu = model_accessor.ONUDevice(serial_number="BRCM1234", pon_port=pon_port, admin_state="ENABLED")
+    set_objects(model_accessor.ONUDevice, [onu])
+
+    profile = model_accessor.TechnologyProfile(
+        profile_id=64, profile_value='{"profile_type": "EPON","epon_attribute": {"package_type": "A"}}')
+    set_objects(model_accessor.TechnologyProfile, [profile])
+
+    rows = []
+    for size in WHITELIST_SIZES:
+        entries = [model_accessor.NttWorkflowDriverWhiteListEntry(
+                   owner_id=service.id, mac_address="%012X" % i, pon_port_from=1234, pon_port_to=1235)
+                   for i in range(size)]
+        set_objects(model_accessor.NttWorkflowDriverWhiteListEntry, entries)
+        whitelist_index.clear()
+
+        # match the last entry, the worst case for a linear scan
+        si = model_accessor.NttWorkflowDriverServiceInstance(
+            serial_number="BRCM1234", owner=service, owner_id=service.id,
+            mac_address="%012x" % (size - 1), of_dpid="of:1234", uni_port_id=16)
+
+        [valid, message] = NttHelpers.validate_onu(model_accessor, log, si)
+        assert valid, message
+
+        durations = measure(lambda: NttHelpers.validate_onu(model_accessor, log, si), ITERATIONS)
+        rows.append((size, "%.1f" % (percentile(durations, 50) * 1e6), "%.1f" % (percentile(durations, 99) * 1e6)))
+
+    print_table(("whitelist_size", "p50_us", "p99_us"), rows)
+
+
+if __name__ == "__main__":
+    main()
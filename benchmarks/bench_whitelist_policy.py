@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Measures the cost of a whitelist change in NttWorkflowDriverWhiteListEntryPolicy
+# with a growing number of service instances, compared to a full table scan.
+#
+#   python benchmarks/bench_whitelist_policy.py
+
+from bench_utils import NullLog, setup_model_accessor, install_store, measure, percentile, print_table
+
+SI_COUNTS = [1000, 10000, 50000]
+WHITELIST_CHANGES = 200
+
+
+def full_scan(model_accessor, whitelist):
+    """ The previous implementation: load every SI and compare the MACs in Python """
+    sis = model_accessor.NttWorkflowDriverServiceInstance.objects.all()
+    return [si for si in sis if si.mac_address.lower() == whitelist.mac_address.lower()]
+
+
+def main():
+    model_accessor = setup_model_accessor()
+    from model_policy_ntt_workflow_driver_whitelistentry import NttWorkflowDriverWhiteListEntryPolicy
+    from service_instance_index import service_instance_index
+    from whitelist_index import whitelist_index
+
+    service = model_accessor.NttWorkflowDriverService(id=1)
+    policy = NttWorkflowDriverWhiteListEntryPolicy(model_accessor=model_accessor)
+    policy.logger = NullLog()
+
+    # the validation itself is measured by bench_whitelist_index.py
+    validated = []
+    policy.validate_onu_state = lambda si: validated.append(si)
+
+    rows = []
+    for count in SI_COUNTS:
+        sis = [model_accessor.NttWorkflowDriverServiceInstance(
+               serial_number="BRCM%08d" % i, owner_id=service.id, mac_address="%012x" % i)
+               for i in range(count)]
+        store = install_store(model_accessor.NttWorkflowDriverServiceInstance, sis)
+        install_store(model_accessor.NttWorkflowDriverWhiteListEntry, [])
+
+        step = max(1, count // WHITELIST_CHANGES)
+        whitelist = [model_accessor.NttWorkflowDriverWhiteListEntry(
+                     id=i + 1, owner=service, owner_id=service.id, mac_address="%012X" % i,
+                     pon_port_from=1, pon_port_to=2)
+                     for i in range(0, count, step)][:WHITELIST_CHANGES]
+        for entry in whitelist:
+            entry.save = lambda *args, **kwargs: None
+
+        # full table scan
+        store.reads = 0
+        entries = iter(whitelist)
+        scan = measure(lambda: full_scan(model_accessor, next(entries)), len(whitelist))
+        scan_reads = store.reads / float(len(whitelist))
+
+        # indexed, the index is loaded once and then kept current by the policies
+        service_instance_index.clear()
+        service_instance_index.load(model_accessor)
+        whitelist_index.clear()
+        store.reads = 0
+        del validated[:]
+        entries = iter(whitelist)
+        indexed = measure(lambda: policy.handle_update(next(entries)), len(whitelist))
+        indexed_reads = store.reads / float(len(whitelist))
+        assert len(validated) == len(whitelist)
+
+        rows.append((count,
+                     "%.1f" % (percentile(scan, 50) * 1e3), "%.1f" % scan_reads,
+                     "%.3f" % (percentile(indexed, 50) * 1e3), "%.1f" % indexed_reads))
+
+    print_table(("service_instances", "scan_p50_ms", "scan_si_reads", "indexed_p50_ms", "indexed_si_reads"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from collections import OrderedDict
+from whitelist_index import normalize_mac
+from metrics import registry
+
+
+class AdmissionDecision(object):
+    """
+    The outcome of the validation of an ONU against the whitelist
+
+    :param approve: the authentication doesn't apply to the package, the SI is approved
+    :param provision: the subscriber has to be provisioned in ONOS
+    """
+
+    def __init__(self, valid, message, approve=False, provision=False):
+        self.valid = valid
+        self.message = message
+        self.approve = approve
+        self.provision = provision
+
+
+class AdmissionCache(object):
+    """
+    Remembers the admission decisions by the inputs they depend on: the owner and MAC address of the SI,
+    the PON port and admin_state of its ONU, its authentication_state, the technology package and the
+    generation of the whitelist index, which changes with any whitelist entry.
+
+    Up to `max_entries` decisions are kept, the least recently used are dropped first.
+    """
+
+    max_entries = 100000
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.decisions = OrderedDict()
+            self.hits = 0
+            self.misses = 0
+
+    @staticmethod
+    def key(ntt_si, onu, tech, whitelist_generation):
+        return (ntt_si.owner_id, normalize_mac(ntt_si.mac_address), onu.pon_port.port_no, onu.admin_state,
+                ntt_si.authentication_state, tech, whitelist_generation)
+
+    def get(self, key):
+        with self.lock:
+            decision = self.decisions.pop(key, None)
+            if decision is None:
+                self.misses += 1
+                return None
+            # most recently used last
+            self.decisions[key] = decision
+            self.hits += 1
+            return decision
+
+    def put(self, key, decision):
+        with self.lock:
+            self.decisions[key] = decision
+            while len(self.decisions) > self.max_entries:
+                self.decisions.popitem(last=False)
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.decisions),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def __len__(self):
+        with self.lock:
+            return len(self.decisions)
+
+
+admission_cache = AdmissionCache()
+registry.register_stats("ntt_admission_cache", "Memoized ONU admission decisions", admission_cache.get_stats)
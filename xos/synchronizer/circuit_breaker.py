@@ -0,0 +1,129 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(Exception):
+    """ A call rejected by an open circuit breaker """
+
+    def __init__(self, message, retry_in):
+        super(CircuitOpenError, self).__init__(message)
+        self.retry_in = retry_in
+
+
+class CircuitBreaker(object):
+    """
+    Stops calling an endpoint that keeps failing.
+
+    The breaker opens after `failure_threshold` consecutive failures: the calls are rejected without
+    reaching the endpoint until the backoff delay has elapsed, then it is half-open and lets a single
+    probe through. A successful probe closes it, a failed one opens it again for twice the delay.
+    The delay starts at `base_delay` and is capped at `max_delay`, a random jitter of up to half the
+    delay is subtracted so that the synchronizers don't all probe the endpoint at the same time.
+    """
+
+    failure_threshold = 5
+    base_delay = 1.0
+    max_delay = 60.0
+
+    def __init__(self, failure_threshold=None, base_delay=None, max_delay=None, clock=time.time,
+                 random=random.random):
+        if failure_threshold is not None:
+            self.failure_threshold = failure_threshold
+        if base_delay is not None:
+            self.base_delay = base_delay
+        if max_delay is not None:
+            self.max_delay = max_delay
+        self.clock = clock
+        self.random = random
+
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        # number of times the breaker opened since it was last closed, it drives the backoff
+        self.attempts = 0
+        self.retry_at = None
+        self.probing = False
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self):
+        """
+        :return: True if the call can go ahead, it must then be reported with record_success or record_failure
+        """
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() >= self.retry_at:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self.probing:
+                self.probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.attempts = 0
+            self.probing = False
+
+    def release(self):
+        """
+        Let another probe through when the allowed call could not be reported (it raised an unexpected error)
+        """
+        with self.lock:
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        delay = min(self.max_delay, self.base_delay * 2 ** self.attempts)
+        delay -= delay * 0.5 * self.random()
+        self.state = OPEN
+        self.attempts += 1
+        self.opened += 1
+        self.probing = False
+        self.retry_at = self.clock() + delay
+
+    def retry_in(self):
+        """
+        :return: the number of seconds until a probe can be sent, 0 if the breaker is closed
+        """
+        with self.lock:
+            if self.state == CLOSED:
+                return 0.0
+            return max(0.0, self.retry_at - self.clock())
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "state": self.state,
+                "open": int(self.state != CLOSED),
+                "failures": self.failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
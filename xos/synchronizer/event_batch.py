@@ -0,0 +1,68 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+
+class EventBatcher(object):
+    """
+    Accumulates events and hands them to `flush` in batches of at most `max_size` events,
+    a partial batch is flushed `max_wait` seconds after its first event has been added.
+
+    Batches are flushed one at a time, in the order the events have been added.
+    """
+
+    def __init__(self, flush, max_size, max_wait, log):
+        self.flush_batch = flush
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.log = log
+
+        self.events = []
+        self.timer = None
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+
+    def add(self, event):
+        with self.lock:
+            self.events.append(event)
+            full = len(self.events) >= self.max_size
+            if not full and self.timer is None:
+                self.timer = threading.Timer(self.max_wait, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                events = self.events
+                self.events = []
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+
+            if not events:
+                return 0
+
+            try:
+                self.flush_batch(events)
+            except Exception as e:
+                self.log.exception("Failed to process batch of events", size=len(events), e=e)
+            return len(events)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.events)
@@ -0,0 +1,116 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from onu_index import normalize_serial
+from metrics import registry
+
+
+class EventDeduplicator(object):
+    """
+    Recognizes Kafka messages that are delivered more than once, e.g. replayed after a consumer restart.
+
+    The Kafka messages don't carry their partition and offset, so a message is identified by the
+    digest of its topic, key, timestamp and value. The digests seen in the last `window` seconds
+    are remembered, up to `max_entries`. Without a timestamp two messages can't be told apart from
+    two identical events, so a message is only a duplicate if it's identical to the previous one
+    received for the same ONU.
+
+    A message is only recorded once it has been processed, a message whose processing failed is
+    processed again when it's redelivered. The digests are kept in memory: only the redeliveries to
+    a running synchronizer are recognized, the messages replayed after a restart are processed
+    again (the event steps don't save the models they leave unchanged).
+    """
+
+    window = 600
+    max_entries = 100000
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            # digest -> time it was seen, oldest first
+            self.seen = OrderedDict()
+            # (topic, serial) -> digest of the last message
+            self.last = OrderedDict()
+            self.hits = 0
+            self.misses = 0
+
+    @staticmethod
+    def digest(event):
+        return hashlib.sha1("%s\0%s\0%s\0%s" % (event.topic, event.key, event.timestamp, event.value)).hexdigest()
+
+    def _expire(self, now):
+        while self.seen:
+            # items() would copy the whole dict on python 2, only look at the oldest digest
+            digest = next(iter(self.seen))
+            if now - self.seen[digest] <= self.window and len(self.seen) <= self.max_entries:
+                break
+            self.seen.popitem(last=False)
+        while len(self.last) > self.max_entries:
+            self.last.popitem(last=False)
+
+    def is_duplicate(self, serial_number, event):
+        """
+        Check if a message received for an ONU has already been processed
+
+        :return: True if the message has already been processed
+        """
+        digest = self.digest(event)
+        key = (event.topic, normalize_serial(serial_number))
+        with self.lock:
+            self._expire(self.clock())
+
+            if event.timestamp is not None:
+                duplicate = digest in self.seen
+            else:
+                duplicate = self.last.get(key) == digest
+
+            if duplicate:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return duplicate
+
+    def record(self, serial_number, event):
+        """
+        Record a message that has been processed (or parked until its ONU is known)
+        """
+        digest = self.digest(event)
+        key = (event.topic, normalize_serial(serial_number))
+        now = self.clock()
+        with self.lock:
+            self._expire(now)
+            self.seen.pop(digest, None)
+            self.seen[digest] = now
+            self.last.pop(key, None)
+            self.last[key] = digest
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.seen),
+            }
+
+
+event_dedup = EventDeduplicator()
+registry.register_stats("ntt_event_dedup", "Redelivered Kafka messages", event_dedup.get_stats)
@@ -0,0 +1,267 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Record the onu.events and authentication.events consumed by the event steps and replay them.
+
+    python event_recorder.py record [--duration 600] [--count N] events.jsonl.gz
+    python event_recorder.py replay [--speed 10 | --max-speed] events.jsonl.gz
+
+Recordings are JSON lines files (gzipped if the name ends with .gz): a header line, then one
+[offset, topic, timestamp, key, value] array per message, offset being the number of seconds
+since the first recorded message and timestamp the Kafka timestamp of the message.
+The recorder uses its own consumer group, so it doesn't take the messages of the synchronizer.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+sync_path = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+sys.path.append(sync_path)
+
+
+FORMAT = "ntt-workflow-driver-events"
+VERSION = 1
+TOPICS = ["onu.events", "authentication.events"]
+
+
+class RecordedEvent(object):
+    """ A recorded Kafka message, it has the fields of XOSKafkaMessage used by the event steps """
+
+    def __init__(self, offset, topic, timestamp, key, value):
+        self.offset = offset
+        self.topic = topic
+        self.timestamp = timestamp
+        self.key = key
+        self.value = value
+
+
+def open_recording(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def _to_str(value):
+    # the Kafka messages hold byte strings
+    if isinstance(value, unicode):
+        return value.encode("utf-8")
+    return value
+
+
+class EventRecorder(object):
+    """
+    Writes Kafka messages to a recording, with the time they were received
+    """
+
+    def __init__(self, path, clock=time.time):
+        self.clock = clock
+        self.start = None
+        self.count = 0
+        self.file = open_recording(path, "wb")
+        self.file.write(json.dumps({"format": FORMAT, "version": VERSION, "recorded_at": self.clock()}) + "\n")
+
+    def record(self, message):
+        now = self.clock()
+        if self.start is None:
+            self.start = now
+        record = [round(now - self.start, 6), message.topic, message.timestamp, message.key, message.value]
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_events(path):
+    """
+    Iterate over the RecordedEvents of a recording
+
+    :raises ValueError: if the file is not a recording or a record is invalid
+    """
+    with open_recording(path, "rb") as f:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get("format") != FORMAT:
+            raise ValueError("%s is not a recording of events" % path)
+        if header.get("version") != VERSION:
+            raise ValueError("%s: unsupported recording version %s" % (path, header.get("version")))
+
+        for (number, line) in enumerate(f, 2):
+            if not line.strip():
+                continue
+            try:
+                (offset, topic, timestamp, key, value) = json.loads(line)
+            except ValueError:
+                raise ValueError("%s:%d: invalid record" % (path, number))
+            yield RecordedEvent(offset, _to_str(topic), timestamp, _to_str(key), _to_str(value))
+
+
+def get_event_steps():
+    """ The event steps of the synchronizer, by topic """
+    # imported here, the steps need the synchronizer in their path
+    from event_steps.onu_event import ONUEventStep
+    from event_steps.auth_event import SubscriberAuthEventStep
+
+    return dict((topic, step) for step in [ONUEventStep, SubscriberAuthEventStep] for topic in step.topics)
+
+
+class EventReplayer(object):
+    """
+    Feeds recorded events to the event steps of their topics, like the Kafka engine a step is created for each event.
+
+    The events are replayed at `speed` times their original pace (1 for the original pace),
+    or as fast as possible if `speed` is None.
+    """
+
+    def __init__(self, model_accessor, log, steps, speed=1.0, clock=time.time, sleep=time.sleep):
+        self.model_accessor = model_accessor
+        self.log = log
+        self.steps = steps
+        self.speed = speed
+        self.clock = clock
+        self.sleep = sleep
+
+    def replay(self, events):
+        """
+        :return: a dict with the number of processed, skipped (no step for the topic) and failed events,
+                 the duration, the events per second and the largest delay behind the requested pace
+        """
+        processed = 0
+        skipped = 0
+        failed = 0
+        max_lag = 0.0
+        start = self.clock()
+        for event in events:
+            step = self.steps.get(event.topic)
+            if step is None:
+                skipped += 1
+                continue
+
+            if self.speed:
+                delay = start + event.offset / float(self.speed) - self.clock()
+                if delay > 0:
+                    self.sleep(delay)
+                else:
+                    max_lag = max(max_lag, -delay)
+
+            try:
+                step(model_accessor=self.model_accessor, log=self.log).process_event(event)
+            except Exception as e:
+                self.log.exception("Exception in event step", topic=event.topic, value=event.value, e=e)
+                failed += 1
+            processed += 1
+
+        elapsed = self.clock() - start
+        return {
+            "events": processed,
+            "skipped": skipped,
+            "failed": failed,
+            "seconds": elapsed,
+            "events_per_second": processed / elapsed if elapsed > 0 else 0.0,
+            "max_lag": max_lag,
+        }
+
+
+def record(args, log):
+    import confluent_kafka
+    from xosconfig import Config
+    from xossynchronizer.event_engine import XOSKafkaMessage
+
+    bootstrap_servers = args.bootstrap or Config.get("event_bus.endpoint")
+    consumer = confluent_kafka.Consumer(**{
+        "group.id": args.group or "%s-recorder" % Config.get("name"),
+        "bootstrap.servers": ",".join(bootstrap_servers),
+        "default.topic.config": {"auto.offset.reset": "smallest" if args.from_beginning else "largest"},
+    })
+    consumer.subscribe(args.topics.split(","))
+
+    deadline = time.time() + args.duration if args.duration else None
+    with EventRecorder(args.file) as recorder:
+        try:
+            while (deadline is None or time.time() < deadline) and (not args.count or recorder.count < args.count):
+                msg = consumer.poll(timeout=1.0)
+                if msg is None:
+                    continue
+                if msg.error():
+                    if msg.error().code() != confluent_kafka.KafkaError._PARTITION_EOF:
+                        log.error("Error in kafka message: %s" % msg.error())
+                    continue
+                recorder.record(XOSKafkaMessage(msg))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            consumer.close()
+    return {"events": recorder.count}
+
+
+def replay(args, log):
+    from xossynchronizer.modelaccessor import model_accessor
+
+    speed = None if args.max_speed else args.speed
+    return EventReplayer(model_accessor, log, get_event_steps(), speed=speed).replay(read_events(args.file))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay the events consumed by the event steps")
+    subparsers = parser.add_subparsers(dest="command")
+
+    record_parser = subparsers.add_parser("record", help="record the events from Kafka")
+    record_parser.add_argument("file", help="the recording to write, gzipped if the name ends with .gz")
+    record_parser.add_argument("--topics", default=",".join(TOPICS), help="comma separated topics to record")
+    record_parser.add_argument("--bootstrap", action="append",
+                               help="Kafka bootstrap server (default: the event_bus endpoint of the configuration)")
+    record_parser.add_argument("--group", help="consumer group (default: <synchronizer name>-recorder)")
+    record_parser.add_argument("--from-beginning", action="store_true",
+                               help="record the messages still retained by Kafka, not only the new ones")
+    record_parser.add_argument("--duration", type=float, help="stop after this number of seconds")
+    record_parser.add_argument("--count", type=int, help="stop after this number of events")
+
+    replay_parser = subparsers.add_parser("replay", help="replay a recording through the event steps")
+    replay_parser.add_argument("file", help="the recording to replay")
+    replay_parser.add_argument("--speed", type=float, default=1.0,
+                               help="replay N times faster than the events were recorded (default: 1)")
+    replay_parser.add_argument("--max-speed", action="store_true", help="replay the events as fast as possible")
+    args = parser.parse_args()
+
+    from xosconfig import Config
+    base_config_file = os.path.join(sync_path, "config.yaml")
+    mounted_config_file = os.path.join(sync_path, "mounted_config.yaml")
+    config_schema = os.path.join(sync_path, "ntt-workflow-driver-config-schema.yaml")
+    if os.path.isfile(mounted_config_file):
+        Config.init(base_config_file, config_schema, mounted_config_file)
+    else:
+        Config.init(base_config_file, config_schema)
+
+    from multistructlog import create_logger
+    log = create_logger(Config().get('logging'))
+
+    stats = record(args, log) if args.command == "record" else replay(args, log)
+    print(json.dumps(stats, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import zlib
+from Queue import Queue
+from onu_index import normalize_serial
+from metrics import registry
+
+
+def shard_key(value):
+    """
+    The key of an event: its OLT, or the base serial number of its ONU if it doesn't have one.
+    All the events of an ONU have the same key, and the events of an OLT are handled by a single
+    shard so that its OLT information is never created twice.
+    """
+    if value.get("deviceId"):
+        return value["deviceId"]
+    return normalize_serial(value["serialNumber"])
+
+
+class ShardedExecutor(object):
+    """
+    Runs the event handlers on `shards` worker threads (disabled with 0 shards).
+
+    The events are hashed by key onto the shards: the events with the same key are handled in the
+    order they were submitted, while the events of different OLTs are handled in parallel.
+    Each shard holds up to `queue_size` events, submit() blocks when the shard is full so that the
+    Kafka consumers don't read further ahead.
+    """
+
+    shards = 0
+    queue_size = 1000
+
+    def __init__(self, shards=None, queue_size=None):
+        if shards is not None:
+            self.shards = shards
+        if queue_size is not None:
+            self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.queues = []
+        self.workers = []
+        self.processed = []
+
+    def shard(self, key):
+        return zlib.crc32(key.encode("utf-8")) % self.shards
+
+    def submit(self, key, handler, value, log):
+        """
+        Call `handler(value)` on the shard of `key`
+        """
+        self._ensure_workers()
+        self.queues[self.shard(key)].put((handler, value, log))
+
+    def join(self):
+        """
+        Wait until all the submitted events have been handled
+        """
+        with self.lock:
+            queues = list(self.queues)
+        for queue in queues:
+            queue.join()
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "shards": len(self.queues),
+                "queue_depth": dict((str(i), q.qsize()) for (i, q) in enumerate(self.queues)),
+                "processed": dict((str(i), count) for (i, count) in enumerate(self.processed)),
+            }
+
+    def _ensure_workers(self):
+        with self.lock:
+            if len(self.workers) == self.shards and all(w.is_alive() for w in self.workers):
+                return
+            while len(self.queues) < self.shards:
+                self.queues.append(Queue(self.queue_size))
+                self.processed.append(0)
+                self.workers.append(None)
+            for (i, worker) in enumerate(self.workers):
+                if worker is None or not worker.is_alive():
+                    worker = threading.Thread(target=self._run, args=(i,), name="EventShard-%s" % i)
+                    worker.daemon = True
+                    worker.start()
+                    self.workers[i] = worker
+
+    def _run(self, shard):
+        queue = self.queues[shard]
+        while True:
+            (handler, value, log) = queue.get()
+            try:
+                handler(value)
+            except Exception as e:
+                log.exception("Failed to process event", value=value, e=e)
+            finally:
+                with self.lock:
+                    self.processed[shard] += 1
+                queue.task_done()
+
+
+event_shards = ShardedExecutor()
+registry.register_stats("ntt_event_shards", "Events handled by the event shards", event_shards.get_stats,
+                        labelname="shard")
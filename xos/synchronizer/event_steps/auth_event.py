@@ -13,22 +13,88 @@
 # limitations under the License.
 
 import json
+from functools import partial
 from xossynchronizer.event_steps.eventstep import EventStep
 from helpers import NttHelpers
+from technology_profile import technology_profile_cache
+from pending_events import pending_events
+from event_dedup import event_dedup
+from event_shards import event_shards, shard_key
+from ownership import olt_ownership
+from metrics import event_latency, find_or_create_total
 
 
 class SubscriberAuthEventStep(EventStep):
     topics = ["authentication.events"]
     technology = "kafka"
 
+    # an event only saves the service instance if it changes one of these fields
+    si_fields = ["authentication_state", "mac_address"]
+    # with package B, the states that change the validation of the ONU
+    validated_states = ["APPROVED", "DENIED"]
+
     def __init__(self, *args, **kwargs):
         super(SubscriberAuthEventStep, self).__init__(*args, **kwargs)
 
+    @event_latency.timed(topic="authentication.events")
     def process_event(self, event):
         value = json.loads(event.value)
         self.log.info("authentication.events: Got event for subscriber", event_value=value)
-        
-        si = NttHelpers.find_or_create_ntt_si(self.model_accessor, self.log, value)
+
+        if olt_ownership.skip(value.get("deviceId")):
+            self.log.debug("authentication.events: Skip event, the OLT belongs to another replica",
+                           event_value=value)
+            return
+
+        if event_dedup.is_duplicate(value["serialNumber"], event):
+            self.log.info("authentication.events: Skip duplicate event", event_value=value)
+            return
+
+        if event_shards.shards:
+            # the events of different OLTs are processed in parallel, on the same shard as the onu.events of the ONU
+            event_shards.submit(shard_key(value), partial(self.process_value, event=event), value, self.log)
+            return
+
+        self.process_value(value, event)
+
+    def process_value(self, value, event=None):
+        # events for an ONU that is not known to XOS yet are parked and replayed later,
+        # so that they don't block the processing of the other events
+        pending_events.process(self.model_accessor, self.log, value["serialNumber"], self.handle_event, value)
+        if event is not None:
+            # only the processed messages are skipped when they are delivered again
+            event_dedup.record(value["serialNumber"], event)
+
+    def handle_event(self, value):
+        try:
+            si = self.model_accessor.NttWorkflowDriverServiceInstance.objects.get(serial_number=value["serialNumber"])
+        except IndexError:
+            # created like for the onu.events, its policy validates it
+            si = NttHelpers.find_or_create_ntt_si(self.model_accessor, self.log, value)
+            si.authentication_state = value["authenticationState"]
+            NttHelpers.save_event_changes(si, self.si_fields)
+            return
+
+        # only the authentication state changes, the ONU and its MAC address are updated by the onu.events
+        find_or_create_total.inc(model="NttWorkflowDriverServiceInstance", result="found")
         self.log.debug("authentication.events: Updating service instance", si=si)
+        previous_state = si.authentication_state
         si.authentication_state = value["authenticationState"]
-        si.save_changed_fields(always_update_timestamp=True)
\ No newline at end of file
+        NttHelpers.save_event_changes(si, ["authentication_state"],
+                                      run_policies=self.needs_validation(previous_state, si.authentication_state))
+
+    def needs_validation(self, previous_state, state):
+        """
+        Check if the ONU has to be validated again by the service instance policy after a change of its
+        authentication state: with package B the SI is only provisioned once APPROVED and disabled when DENIED,
+        and a denied ONU is enabled again when it authenticates again. The other packages don't use the state,
+        the policy sets it back to APPROVED.
+        """
+        try:
+            package = technology_profile_cache.get_package(self.model_accessor)
+        except IndexError:
+            # without TechnologyProfile the policy decides
+            return True
+        if package != "B":
+            return state != "APPROVED"
+        return state in self.validated_states or previous_state == "DENIED"
\ No newline at end of file
@@ -15,10 +15,19 @@
 
 
 import json
+import threading
+from functools import partial
+from collections import OrderedDict
 from xossynchronizer.event_steps.eventstep import EventStep
+from xossynchronizer.steps.syncstep import DeferredException
 from helpers import NttHelpers
-import requests
-from requests.auth import HTTPBasicAuth
+from onos_client import get_onos_client
+from pending_events import pending_events
+from event_batch import EventBatcher
+from event_dedup import event_dedup
+from event_shards import event_shards, shard_key
+from ownership import olt_ownership
+from metrics import event_latency
 
 class ONUEventStep(EventStep):
     topics = ["onu.events"]
@@ -26,9 +35,25 @@ class ONUEventStep(EventStep):
 
     max_onu_retry = 50
 
+    # micro-batching is opt-in: with batch_size > 1 the events are processed in batches of up to
+    # batch_size events, a partial batch is processed batch_wait seconds after its first event
+    batch_size = 0
+    batch_wait = 0.1
+
+    batcher = None
+    batcher_lock = threading.Lock()
+
+    # an event only saves the models if it changes one of these fields
+    oi_fields = ["of_dpid", "port_no", "olt_package"]
+    si_fields = ["of_dpid", "uni_port_id", "oper_onu_status", "mac_address"]
+    # the fields that applying an event may change, they are restored if the event fails in a batch
+    oi_event_fields = ["no_sync", "of_dpid", "port_no", "olt_package"]
+    si_event_fields = ["no_sync", "of_dpid", "uni_port_id", "oper_onu_status", "mac_address"]
+
     def __init__(self, *args, **kwargs):
         super(ONUEventStep, self).__init__(*args, **kwargs)
 
+    @event_latency.timed(topic="onu.events")
     def process_event(self, event):
         value = json.loads(event.value)
         self.log.info("onu.events: received event", value=value)
@@ -38,44 +63,205 @@ class ONUEventStep(EventStep):
             self.log.info("Skip event, only consider [serialNumber]-1 events")
             return
 
+        if olt_ownership.skip(value.get("deviceId")):
+            self.log.debug("onu.events: Skip event, the OLT belongs to another replica", value=value)
+            return
+
+        # redelivered messages would save the SI and trigger the policies again
+        if event_dedup.is_duplicate(value["serialNumber"], event):
+            self.log.info("onu.events: Skip duplicate event", value=value)
+            return
+
+        if self.batch_size > 1:
+            self.get_batcher().add((value, event))
+            return
+
+        if event_shards.shards:
+            # the events of different OLTs are processed in parallel
+            event_shards.submit(shard_key(value), partial(self.process_value, event=event), value, self.log)
+            return
+
+        self.process_value(value, event)
+
+    def process_value(self, value, event=None):
+        # events for an ONU that is not known to XOS yet are parked and replayed later,
+        # so that they don't block the processing of the other events
+        pending_events.process(self.model_accessor, self.log, value["serialNumber"], self.handle_event, value)
+        if event is not None:
+            # only the processed messages are skipped when they are delivered again
+            event_dedup.record(value["serialNumber"], event)
+
+    def get_batcher(self):
+        # a step is created for each event, the batcher is shared by the class
+        cls = self.__class__
+        with cls.batcher_lock:
+            if cls.batcher is None:
+                model_accessor = self.model_accessor
+                log = self.log
+                cls.batcher = EventBatcher(
+                    lambda messages: cls(model_accessor=model_accessor, log=log).process_messages(messages),
+                    cls.batch_size, cls.batch_wait, log)
+            return cls.batcher
+
+    def process_messages(self, messages):
+        """
+        Process a batch of (value, Kafka message), the messages of the events that have been applied are recorded
+        """
+        applied = set(id(value) for value in self.process_batch([value for (value, event) in messages]))
+        for (value, event) in messages:
+            if id(value) in applied:
+                event_dedup.record(value["serialNumber"], event)
+
+    def handle_event(self, value):
         ntt_oi = NttHelpers.find_or_create_ntt_oi(self.model_accessor, self.log, value)
+        self.update_oi(ntt_oi, value)
+        NttHelpers.save_event_changes(ntt_oi, self.oi_fields)
+        ntt_si = NttHelpers.find_or_create_ntt_si(self.model_accessor, self.log, value)
+        if self.update_si(ntt_si, value):
+            NttHelpers.save_event_changes(ntt_si, self.si_fields)
+            if value["status"] == "disabled":
+                self.remove_subscriber(ntt_si.of_dpid, ntt_si.uni_port_id)
+
+    def process_batch(self, values):
+        """
+        Process a batch of events: the OLT information and the service instances are fetched with
+        one query per OLT of the batch, each changed model is saved once at the end (unless the events
+        left it unchanged).
+        The events are applied in the order they were received, so the order per ONU is kept.
+        An event that fails is logged and skipped: the changes it made to the models shared with the other
+        events are undone, the changes of the other events are saved.
+
+        :return: the events that have been applied and saved
+        """
+        # the parked events of the same OLTs aren't replayed while the batch is applied
+        with pending_events.serialized(values):
+            ntt_ois = {}
+            ntt_sis = {}
+            for of_dpid in set(value["deviceId"] for value in values):
+                for oi in self.model_accessor.NttWorkflowDriverOltInformation.objects.filter(of_dpid=of_dpid):
+                    ntt_ois[oi.of_dpid] = oi
+                for si in self.model_accessor.NttWorkflowDriverServiceInstance.objects.filter(of_dpid=of_dpid):
+                    ntt_sis[si.serial_number] = si
+
+            # id -> (model, fields), the models are saved in the order they were first changed
+            changed = OrderedDict()
+            removed = []
+            failed = 0
+            applied = []
+            for value in values:
+                state = self.save_batch_state(value, ntt_ois, ntt_sis, changed, removed)
+                try:
+                    self.apply_batch_event(value, ntt_ois, ntt_sis, changed, removed)
+                    applied.append(value)
+                except Exception as e:
+                    self.log.exception("onu.events: Failed to process event of batch", value=value, e=e)
+                    self.restore_batch_state(state, changed, removed)
+                    failed += 1
+
+            saved = 0
+            for (model, fields) in changed.values():
+                try:
+                    saved += NttHelpers.save_event_changes(model, fields)
+                except Exception as e:
+                    self.log.exception("onu.events: Failed to save model of batch", model=model, e=e)
+                    failed += 1
+                    # the changes of the events aren't tracked by model, none of them has been applied for sure
+                    applied = []
+
+        for (of_dpid, uni_port_id) in removed:
+            try:
+                self.remove_subscriber(of_dpid, uni_port_id)
+            except Exception as e:
+                self.log.exception("onu.events: Failed to remove subscriber of batch", of_dpid=of_dpid,
+                                   uni_port_id=uni_port_id, e=e)
+                failed += 1
+
+        self.log.info("onu.events: processed batch", events=len(values), saved=saved, failed=failed)
+        return applied
+
+    def save_batch_state(self, value, ntt_ois, ntt_sis, changed, removed):
+        """
+        Remember the state of the batch that applying an event may change, see restore_batch_state()
+        """
+        models = []
+        for (known, key, fields) in [(ntt_ois, value["deviceId"], self.oi_event_fields),
+                                     (ntt_sis, value["serialNumber"], self.si_event_fields)]:
+            model = known.get(key)
+            values = dict((field, getattr(model, field)) for field in fields) if model is not None else None
+            models.append((known, key, model, values))
+        return (models, set(changed), len(removed))
+
+    def restore_batch_state(self, state, changed, removed):
+        """
+        Undo the changes of an event that failed
+        """
+        (models, changed_before, removed_before) = state
+        for (known, key, model, values) in models:
+            current = known.get(key)
+            if current is not None and id(current) not in changed_before:
+                # only changed by the failed event
+                changed.pop(id(current), None)
+            if model is None:
+                known.pop(key, None)
+            else:
+                known[key] = model
+                for (field, value) in values.items():
+                    setattr(model, field, value)
+        del removed[removed_before:]
+
+    def apply_batch_event(self, value, ntt_ois, ntt_sis, changed, removed):
+        serial_number = value["serialNumber"]
+        if pending_events.is_parked(serial_number):
+            pending_events.process(self.model_accessor, self.log, serial_number, self.handle_event, value)
+            return
+
+        try:
+            ntt_oi = NttHelpers.find_or_create_ntt_oi(self.model_accessor, self.log, value, ntt_ois)
+            ntt_si = NttHelpers.find_or_create_ntt_si(self.model_accessor, self.log, value, ntt_sis)
+        except DeferredException:
+            # the event (and the following ones for this ONU) is parked until the ONU is known
+            pending_events.process(self.model_accessor, self.log, serial_number, self.handle_event, value)
+            return
+
+        ntt_ois[value["deviceId"]] = ntt_oi
+        ntt_sis[serial_number] = ntt_si
+
+        self.update_oi(ntt_oi, value)
+        changed[id(ntt_oi)] = (ntt_oi, self.oi_fields)
+
+        if self.update_si(ntt_si, value):
+            changed[id(ntt_si)] = (ntt_si, self.si_fields)
+            if value["status"] == "disabled":
+                removed.append((ntt_si.of_dpid, ntt_si.uni_port_id))
+
+    def update_oi(self, ntt_oi, value):
         ntt_oi.no_sync = False
         ntt_oi.of_dpid = value["deviceId"]
-        ntt_oi.save_changed_fields(always_update_timestamp=True)
-        ntt_si = NttHelpers.find_or_create_ntt_si(self.model_accessor, self.log, value)
+
+    def update_si(self, ntt_si, value):
+        """
+        Apply an event to a service instance
+
+        :return: False if the event has been ignored
+        """
         if value["status"] == "activated":
             self.log.info("onu.events: activated onu", value=value)
             ntt_si.no_sync = False
             ntt_si.uni_port_id = long(value["portNumber"])
             ntt_si.of_dpid = value["deviceId"]
             ntt_si.oper_onu_status = "ENABLED"
-            ntt_si.save_changed_fields(always_update_timestamp=True)
+            return True
         elif value["status"] == "disabled":
             self.log.info("onu.events: disabled onu, resetting the subscriber", value=value)
             ntt_si.oper_onu_status = "DISABLED"
-            ntt_si.save_changed_fields(always_update_timestamp=True)
-            
-            log.debug("Removing subscriber with info",
-                uni_port_id = ntt_si.uni_port_id,
-                dp_id = ntt_si.of_dpid
-            )
-
-            onos_voltha_basic_auth = HTTPBasicAuth("karaf", "karaf")
-
-            handle = "%s/%s" % (ntt_si.of_dpid, ntt_si.uni_port_id)
-            # TODO store URL and PORT in the vOLT Service model
-            full_url = "http://129.60.110.180:8181/onos/olt/oltapp/%s" % (handle)
-
-            log.info("Sending request to onos-voltha", url=full_url)
-
-            request = requests.delete(full_url, auth=onos_voltha_basic_auth)
-
-            if request.status_code != 204:
-                raise Exception("Failed to remove subscriber from onos-voltha: %s" % request.text)
-
-            log.info("Removed Subscriber from onos voltha", response=request.text)
-
-            return
+            return True
         else:
             self.log.warn("onu.events: Unknown status value: %s" % value["status"], value=value)
-            return
\ No newline at end of file
+            return False
+
+    def remove_subscriber(self, of_dpid, uni_port_id):
+        # the subscriber may still be waiting for its provisioning delay
+        NttHelpers.cancel_add_subscriber(of_dpid, uni_port_id)
+
+        onos_client = get_onos_client(self.model_accessor.NttWorkflowDriverService.objects.first())
+        NttHelpers.dispatch_remove_subscriber(self.model_accessor, self.log, onos_client, of_dpid, uni_port_id)
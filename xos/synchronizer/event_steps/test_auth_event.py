@@ -57,9 +57,21 @@ class TestSubscriberAuthEvent(unittest.TestCase):
         self.model_accessor = model_accessor
         self.log = log
 
+        from pending_events import pending_events
+        pending_events.clear()
+        from event_dedup import event_dedup
+        self.event_dedup = event_dedup
+        self.event_dedup.clear()
+
+        from technology_profile import technology_profile_cache
+        technology_profile_cache.clear()
+
         self.event_step = SubscriberAuthEventStep(model_accessor=self.model_accessor, log=self.log)
 
         self.event = Mock()
+        self.event.topic = "authentication.events"
+        self.event.key = None
+        self.event.timestamp = 1580000000000
 
         self.ntt_si = NttWorkflowDriverServiceInstance()
         self.ntt_si.serial_number = "BRCM1234"
@@ -89,6 +101,110 @@ class TestSubscriberAuthEvent(unittest.TestCase):
                     'authentication_state', 'serial_number', 'updated'])
             self.assertEqual(self.ntt_si.authentication_state, 'APPROVED')
 
+    def test_skip_unchanged_state(self):
+
+        self.event.value = json.dumps({
+            'authenticationState': "APPROVED",
+            'deviceId': "of:0000000ce2314000",
+            'portNumber': "101",
+            'serialNumber': "BRCM1234",
+        })
+        self.ntt_si.authentication_state = "APPROVED"
+        self.ntt_si.is_new = False
+        self.ntt_si.recompute_initial()
+
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as ntt_si_mock:
+
+            ntt_si_mock.return_value = [self.ntt_si]
+
+            from metrics import elided_writes_total
+            elided = elided_writes_total.get(model="NttWorkflowDriverServiceInstance")
+
+            self.event_step.process_event(self.event)
+
+            self.ntt_si.save.assert_not_called()
+            self.assertEqual(elided_writes_total.get(model="NttWorkflowDriverServiceInstance"), elided + 1)
+
+    def process_state(self, previous_state, state, package):
+        self.event.value = json.dumps({
+            'authenticationState': state,
+            'deviceId': "of:0000000ce2314000",
+            'portNumber': "101",
+            'serialNumber': "BRCM1234",
+        })
+        self.ntt_si.authentication_state = previous_state
+        self.ntt_si.mac_address = "0a0a0a"
+        self.ntt_si.is_new = False
+        self.ntt_si.recompute_initial()
+
+        profile = TechnologyProfile(profile_id=64, profile_value=json.dumps(
+            {"profile_type": "EPON", "epon_attribute": {"package_type": package}}))
+
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as ntt_si_mock, \
+            patch.object(TechnologyProfile.objects, "get_items") as technologyProfile_mock, \
+            patch.object(ONUDevice.objects, "get_items") as onu_mock:
+            ntt_si_mock.return_value = [self.ntt_si]
+            technologyProfile_mock.return_value = [profile]
+
+            self.event_step.process_event(self.event)
+
+            # the ONU isn't looked up and the MAC address isn't rewritten
+            onu_mock.assert_not_called()
+            self.assertEqual(self.ntt_si.mac_address, "0a0a0a")
+            self.assertEqual(self.ntt_si.authentication_state, state)
+            self.ntt_si.save.assert_called_once()
+            # the model policy validates the ONU again only if the timestamp is updated
+            return self.ntt_si.save.call_args[1].get("always_update_timestamp", False)
+
+    def test_validated_on_approval(self):
+        self.assertTrue(self.process_state("REQUESTED", "APPROVED", "B"))
+
+    def test_validated_on_denial(self):
+        self.assertTrue(self.process_state("REQUESTED", "DENIED", "B"))
+
+    def test_validated_after_denial(self):
+        self.assertTrue(self.process_state("DENIED", "STARTED", "B"))
+
+    def test_not_validated_during_authentication(self):
+        for (previous_state, state) in [("AWAITING", "STARTED"), ("STARTED", "REQUESTED"), ("APPROVED", "AWAITING")]:
+            self.ntt_si.save.reset_mock()
+            self.assertFalse(self.process_state(previous_state, state, "B"))
+            self.assertEqual(self.ntt_si.save.call_args[1]["update_fields"][0], "authentication_state")
+
+    def test_not_validated_package_a(self):
+        self.assertFalse(self.process_state("REQUESTED", "APPROVED", "A"))
+
+    def test_approved_package_a(self):
+        # the policy restores the APPROVED state of the package A ONUs
+        for state in ["AWAITING", "STARTED", "REQUESTED", "DENIED"]:
+            self.ntt_si.save.reset_mock()
+            self.assertTrue(self.process_state("APPROVED", state, "A"))
+
+    def test_create_subscriber(self):
+        self.event.value = json.dumps({
+            'authenticationState': "STARTED",
+            'deviceId': "of:0000000ce2314000",
+            'portNumber': "101",
+            'serialNumber': "BRCM1234",
+        })
+        onu = ONUDevice(serial_number="BRCM1234", mac_address="0a0a0a")
+
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as ntt_si_mock, \
+            patch.object(NttWorkflowDriverService.objects, "get_items") as service_mock, \
+            patch.object(ONUDevice.objects, "get_items") as onu_mock, \
+            patch.object(NttWorkflowDriverServiceInstance, "save", autospec=True) as save_mock:
+            ntt_si_mock.return_value = []
+            service_mock.return_value = [Mock(id=1)]
+            onu_mock.return_value = [onu]
+
+            self.event_step.process_event(self.event)
+
+            save_mock.assert_called_once()
+            si = save_mock.call_args[0][0]
+            self.assertEqual(si.mac_address, "0a0a0a")
+            self.assertEqual(si.authentication_state, "STARTED")
+            self.assertTrue(save_mock.call_args[1]["always_update_timestamp"])
+
 
 if __name__ == '__main__':
     sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))  # for import of helpers.py
@@ -47,6 +47,25 @@ class TestSyncOLTDevice(unittest.TestCase):
 
         from xossynchronizer.modelaccessor import model_accessor
         from onu_event import ONUEventStep
+        from onos_client import OnosClient
+        self.OnosClient = OnosClient
+        from helpers import NttHelpers
+        self.NttHelpers = NttHelpers
+        from technology_profile import technology_profile_cache
+        self.technology_profile_cache = technology_profile_cache
+        self.technology_profile_cache.clear()
+        from olt_information_cache import olt_information_cache
+        self.olt_information_cache = olt_information_cache
+        self.olt_information_cache.clear()
+        from onu_index import onu_index
+        onu_index.clear()
+        from pending_events import pending_events
+        self.pending_events = pending_events
+        self.pending_events.clear()
+        self.pending_events._ensure_worker = Mock()
+        from event_dedup import event_dedup
+        self.event_dedup = event_dedup
+        self.event_dedup.clear()
 
         # import all class names to globals
         for (k, v) in model_accessor.all_model_classes.items():
@@ -58,6 +77,9 @@ class TestSyncOLTDevice(unittest.TestCase):
         self.event_step = ONUEventStep(model_accessor=self.model_accessor, log=self.log)
 
         self.event = Mock()
+        self.event.topic = "onu.events"
+        self.event.key = None
+        self.event.timestamp = 1580000000000
         self.event_dict = {
             'status': 'activated',
             'serialNumber': 'BRCM1234',
@@ -98,6 +120,10 @@ class TestSyncOLTDevice(unittest.TestCase):
             onu_mock.return_value = [self.onu]
             technologyProfile_mock.return_value = [self.technologyProfile]
 
+            from metrics import event_latency, find_or_create_total
+            events = event_latency.get_count(topic="onu.events")
+            created = find_or_create_total.get(model="NttWorkflowDriverServiceInstance", result="created")
+
             self.event_step.process_event(self.event)
 
             ntt_si = mock_save.call_args[0][0]
@@ -111,6 +137,104 @@ class TestSyncOLTDevice(unittest.TestCase):
             self.assertEqual(ntt_si.admin_onu_state, "AWAITING")
             self.assertEqual(ntt_si.oper_onu_status, "ENABLED")
 
+            self.assertEqual(event_latency.get_count(topic="onu.events"), events + 1)
+            self.assertEqual(find_or_create_total.get(model="NttWorkflowDriverServiceInstance", result="created"),
+                             created + 1)
+
+    def test_park_event_for_unknown_onu(self):
+
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as ntt_si_mock, \
+                patch.object(NttWorkflowDriverOltInformation.objects, "get_items") as ntt_oi_mock, \
+                patch.object(NttWorkflowDriverService.objects, "get_items") as service_mock, \
+                patch.object(NttWorkflowDriverServiceInstance, "save", autospec=True) as mock_save, \
+                patch.object(ONUDevice.objects, "get_items") as onu_mock, \
+                patch.object(TechnologyProfile.objects, "get_items") as technologyProfile_mock:
+
+            ntt_si_mock.return_value = []
+            ntt_oi_mock.return_value = []
+            service_mock.return_value = [self.pppoe]
+            onu_mock.return_value = []
+            technologyProfile_mock.return_value = [self.technologyProfile]
+
+            self.event_step.process_event(self.event)
+
+            self.assertEqual(mock_save.call_count, 0)
+            self.assertTrue(self.pending_events.is_parked(self.event_dict["serialNumber"]))
+
+            # the ONU is created, the parked event is replayed
+            onu_mock.return_value = [self.onu]
+            self.pending_events.check(self.model_accessor)
+
+            self.assertEqual(mock_save.call_count, 1)
+            self.assertFalse(self.pending_events.is_parked(self.event_dict["serialNumber"]))
+            ntt_si = mock_save.call_args[0][0]
+            self.assertEqual(ntt_si.serial_number, self.event_dict['serialNumber'])
+
+    def test_skip_duplicate_event(self):
+        si = NttWorkflowDriverServiceInstance(
+            serial_number=self.event_dict["serialNumber"],
+            of_dpid="foo",
+            uni_port_id="foo"
+        )
+
+        oi = NttWorkflowDriverOltInformation(
+            of_dpid="of:109299321"
+        )
+
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as ntt_si_mock, \
+                patch.object(NttWorkflowDriverOltInformation.objects, "get_items") as ntt_oi_mock, \
+                patch.object(NttWorkflowDriverServiceInstance, "save", autospec=True) as mock_save:
+
+            ntt_si_mock.return_value = [si]
+            ntt_oi_mock.return_value = [oi]
+
+            self.event_step.process_event(self.event)
+            # the same message is delivered again
+            self.event_step.process_event(self.event)
+
+            self.assertEqual(mock_save.call_count, 1)
+            self.assertEqual(self.event_dedup.get_stats()["hits"], 1)
+
+    def test_redelivered_failed_event(self):
+        si = NttWorkflowDriverServiceInstance(
+            serial_number=self.event_dict["serialNumber"],
+            of_dpid="foo",
+            uni_port_id="foo"
+        )
+
+        oi = NttWorkflowDriverOltInformation(
+            of_dpid="of:109299321"
+        )
+
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as ntt_si_mock, \
+                patch.object(NttWorkflowDriverOltInformation.objects, "get_items") as ntt_oi_mock, \
+                patch.object(NttWorkflowDriverServiceInstance, "save", autospec=True) as mock_save:
+
+            ntt_si_mock.return_value = [si]
+            ntt_oi_mock.return_value = [oi]
+            mock_save.side_effect = [Exception("database unavailable"), None]
+
+            with self.assertRaises(Exception):
+                self.event_step.process_event(self.event)
+            # the message whose processing failed is processed again when it's delivered again
+            self.event_step.process_event(self.event)
+
+            self.assertEqual(mock_save.call_count, 2)
+            self.assertEqual(self.event_dedup.get_stats()["hits"], 0)
+
+    def test_skip_other_replica_event(self):
+        from ownership import olt_ownership
+
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as ntt_si_mock, \
+                patch.object(NttWorkflowDriverOltInformation.objects, "get_items") as ntt_oi_mock, \
+                patch.object(olt_ownership, "owns", return_value=False) as owns:
+
+            self.event_step.process_event(self.event)
+
+            owns.assert_called_with("of:109299321")
+            ntt_si_mock.assert_not_called()
+            ntt_oi_mock.assert_not_called()
+
     def test_reuse_instance(self):
 
         si = NttWorkflowDriverServiceInstance(
@@ -167,20 +291,29 @@ class TestSyncOLTDevice(unittest.TestCase):
 
         with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as ntt_si_mock, \
                 patch.object(NttWorkflowDriverOltInformation.objects, "get_items") as ntt_oi_mock, \
-                patch.object(NttWorkflowDriverServiceInstance, "save_changed_fields", autospec=True) as mock_save:
+                patch.object(NttWorkflowDriverService.objects, "get_items") as service_mock, \
+                patch.object(NttWorkflowDriverServiceInstance, "save_changed_fields", autospec=True) as mock_save, \
+                patch.object(self.OnosClient, "remove_subscriber") as remove_subscriber:
             ntt_si_mock.return_value = [si]
             ntt_oi_mock.return_value = [oi]
+            service_mock.return_value = [self.pppoe]
 
             self.event_step.process_event(self.event)
+            # the subscriber is removed in background
+            self.assertTrue(self.NttHelpers.onos_dispatcher.join(5))
 
-            ntt_si = mock_save.call_args[0][0]
+            ntt_si = mock_save.call_args_list[0][0][0]
 
-            self.assertEqual(mock_save.call_count, 1)
+            # the SI is saved by the event, then again to report the removal
+            self.assertEqual(mock_save.call_count, 2)
 
             # Receiving an ONU event doesn't change the admin_onu_state until the model policy runs
             self.assertEqual(ntt_si.admin_onu_state, 'ENABLED')
             self.assertEqual(ntt_si.oper_onu_status, 'DISABLED')
 
+            remove_subscriber.assert_called_with("foo", "foo")
+            self.assertEqual(ntt_si.status_message, "Subscriber has been removed from ONOS")
+
     def test_enable_onu(self):
         self.event_dict = {
             'status': 'activated',
@@ -219,6 +352,347 @@ class TestSyncOLTDevice(unittest.TestCase):
             self.assertEqual(ntt_si.admin_onu_state, 'DISABLED')
             self.assertEqual(ntt_si.oper_onu_status, 'ENABLED')
 
+    def test_skip_unchanged_models(self):
+        si = NttWorkflowDriverServiceInstance(
+            serial_number="BRCM1234",
+            of_dpid="of:109299321",
+            uni_port_id=16,
+            mac_address="0a0a0a",
+            oper_onu_status="ENABLED",
+            no_sync=False,
+        )
+        oi = NttWorkflowDriverOltInformation(
+            of_dpid="of:109299321",
+            port_no=1234,
+            olt_package="A",
+            no_sync=False,
+        )
+        # models loaded from XOS
+        si.is_new = False
+        oi.is_new = False
+
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as ntt_si_mock, \
+                patch.object(NttWorkflowDriverOltInformation.objects, "get_items") as ntt_oi_mock, \
+                patch.object(ONUDevice.objects, "get_items") as onu_mock, \
+                patch.object(TechnologyProfile.objects, "get_items") as technologyProfile_mock, \
+                patch.object(NttWorkflowDriverServiceInstance, "save", autospec=True) as mock_si_save, \
+                patch.object(NttWorkflowDriverOltInformation, "save", autospec=True) as mock_oi_save:
+            ntt_si_mock.return_value = [si]
+            ntt_oi_mock.return_value = [oi]
+            onu_mock.return_value = [self.onu]
+            technologyProfile_mock.return_value = [self.technologyProfile]
+
+            from metrics import elided_writes_total
+            elided_si = elided_writes_total.get(model="NttWorkflowDriverServiceInstance")
+            elided_oi = elided_writes_total.get(model="NttWorkflowDriverOltInformation")
+
+            self.event_step.process_event(self.event)
+
+            # the event doesn't change anything, the policies don't need to run again
+            mock_si_save.assert_not_called()
+            mock_oi_save.assert_not_called()
+            self.assertEqual(elided_writes_total.get(model="NttWorkflowDriverServiceInstance"), elided_si + 1)
+            self.assertEqual(elided_writes_total.get(model="NttWorkflowDriverOltInformation"), elided_oi + 1)
+
+            # the OLT information is cached, the PON port is resolved again once the entry is dropped
+            self.pon_port.port_no = 1235
+            self.event.timestamp += 1
+            self.event_step.process_event(self.event)
+
+            mock_oi_save.assert_not_called()
+
+            self.olt_information_cache.clear()
+            self.event.timestamp += 1
+            self.event_step.process_event(self.event)
+
+            mock_si_save.assert_not_called()
+            mock_oi_save.assert_called_once()
+            self.assertEqual(mock_oi_save.call_args[1]["update_fields"], ["port_no", "updated"])
+
+    def test_cached_olt_information(self):
+        oi = NttWorkflowDriverOltInformation(of_dpid="of:109299321")
+
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as ntt_si_mock, \
+                patch.object(NttWorkflowDriverOltInformation.objects, "get_items") as ntt_oi_mock, \
+                patch.object(ONUDevice.objects, "get_items") as onu_mock, \
+                patch.object(NttWorkflowDriverService.objects, "get_items") as service_mock, \
+                patch.object(TechnologyProfile.objects, "get_items") as technologyProfile_mock, \
+                patch.object(NttWorkflowDriverServiceInstance, "save", autospec=True), \
+                patch.object(NttWorkflowDriverOltInformation, "save", autospec=True):
+            ntt_si_mock.return_value = []
+            service_mock.return_value = [self.pppoe]
+            ntt_oi_mock.return_value = [oi]
+            onu_mock.return_value = [self.onu]
+            technologyProfile_mock.return_value = [self.technologyProfile]
+
+            from metrics import find_or_create_total
+            cached = find_or_create_total.get(model="NttWorkflowDriverOltInformation", result="cached")
+
+            self.event_step.process_event(self.event)
+            self.assertEqual(oi.port_no, 1234)
+            self.assertEqual(oi.olt_package, "A")
+
+            for i in range(3):
+                self.event.timestamp += 1
+                self.event_step.process_event(self.event)
+
+            # the OLT information and the TechnologyProfile are only queried by the first event
+            self.assertEqual(ntt_oi_mock.call_count, 1)
+            self.assertEqual(technologyProfile_mock.call_count, 1)
+            self.assertEqual(find_or_create_total.get(model="NttWorkflowDriverOltInformation", result="cached"),
+                             cached + 3)
+
+            # a new TechnologyProfile resolves the OLT information again
+            self.technologyProfile.profile_value = '{"profile_type": "EPON","epon_attribute": {"package_type": "B"}}'
+            self.technology_profile_cache.checked = None
+            self.event.timestamp += 1
+            self.event_step.process_event(self.event)
+
+            self.assertEqual(ntt_oi_mock.call_count, 2)
+            self.assertEqual(oi.olt_package, "B")
+
+    def test_save_without_elision(self):
+        si = NttWorkflowDriverServiceInstance(
+            serial_number="BRCM1234",
+            of_dpid="of:109299321",
+            uni_port_id=16,
+            mac_address="0a0a0a",
+            oper_onu_status="ENABLED",
+            no_sync=True,
+        )
+        si.is_new = False
+        oi = NttWorkflowDriverOltInformation(
+            of_dpid="of:109299321",
+        )
+
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as ntt_si_mock, \
+                patch.object(NttWorkflowDriverOltInformation.objects, "get_items") as ntt_oi_mock, \
+                patch.object(ONUDevice.objects, "get_items") as onu_mock, \
+                patch.object(TechnologyProfile.objects, "get_items") as technologyProfile_mock, \
+                patch.object(self.NttHelpers, "elide_writes", False), \
+                patch.object(NttWorkflowDriverServiceInstance, "save", autospec=True) as mock_si_save:
+            ntt_si_mock.return_value = [si]
+            ntt_oi_mock.return_value = [oi]
+            onu_mock.return_value = [self.onu]
+            technologyProfile_mock.return_value = [self.technologyProfile]
+
+            self.event_step.process_event(self.event)
+
+            # only no_sync changed
+            mock_si_save.assert_called_once()
+            self.assertEqual(mock_si_save.call_args[1]["update_fields"], ["no_sync", "updated"])
+
+
+
+    def test_process_batch(self):
+        si = NttWorkflowDriverServiceInstance(
+            serial_number="BRCM1234",
+            of_dpid="of:109299321",
+            uni_port_id=16,
+            admin_onu_state="ENABLED",
+            oper_onu_status="ENABLED",
+        )
+
+        oi = NttWorkflowDriverOltInformation(
+            of_dpid="of:109299321"
+        )
+
+        events = [
+            {'status': 'disabled', 'serialNumber': 'BRCM1234', 'deviceId': 'of:109299321', 'portNumber': '16'},
+            {'status': 'activated', 'serialNumber': 'BRCM1234', 'deviceId': 'of:109299321', 'portNumber': '17'},
+        ]
+
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as ntt_si_mock, \
+                patch.object(NttWorkflowDriverOltInformation.objects, "get_items") as ntt_oi_mock, \
+                patch.object(NttWorkflowDriverService.objects, "get_items") as service_mock, \
+                patch.object(ONUDevice.objects, "get_items") as onu_mock, \
+                patch.object(TechnologyProfile.objects, "get_items") as technologyProfile_mock, \
+                patch.object(NttWorkflowDriverServiceInstance, "save_changed_fields", autospec=True) as mock_si_save, \
+                patch.object(NttWorkflowDriverOltInformation, "save_changed_fields", autospec=True) as mock_oi_save, \
+                patch.object(self.OnosClient, "remove_subscriber") as remove_subscriber:
+            ntt_si_mock.return_value = [si]
+            ntt_oi_mock.return_value = [oi]
+            service_mock.return_value = [self.pppoe]
+            onu_mock.return_value = [self.onu]
+            technologyProfile_mock.return_value = [self.technologyProfile]
+
+            self.event_step.process_batch(events)
+
+            # each model is saved once, with the state of the last event
+            self.assertEqual(mock_si_save.call_count, 1)
+            self.assertEqual(mock_oi_save.call_count, 1)
+            self.assertEqual(si.oper_onu_status, "ENABLED")
+            self.assertEqual(si.uni_port_id, 17)
+            self.assertEqual(oi.port_no, 1234)
+
+            # the subscriber is removed from the port it was using when the ONU was disabled
+            self.assertTrue(self.NttHelpers.onos_dispatcher.join(5))
+            remove_subscriber.assert_called_once_with("of:109299321", 16)
+
+    def test_process_batch_failed_event(self):
+        failing_si = NttWorkflowDriverServiceInstance(
+            serial_number="BRCM1234",
+            of_dpid="of:109299321",
+            uni_port_id=16,
+        )
+        si = NttWorkflowDriverServiceInstance(
+            serial_number="BRCM5678",
+            of_dpid="of:109299321",
+            uni_port_id=18,
+        )
+        oi = NttWorkflowDriverOltInformation(
+            of_dpid="of:109299321"
+        )
+        onu = ONUDevice(serial_number="BRCM5678", mac_address="0b0b0b", pon_port=self.pon_port)
+
+        events = [
+            {'status': 'activated', 'serialNumber': 'BRCM1234', 'deviceId': 'of:109299321', 'portNumber': 'boom'},
+            {'status': 'activated', 'serialNumber': 'BRCM5678', 'deviceId': 'of:109299321', 'portNumber': '17'},
+        ]
+
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as ntt_si_mock, \
+                patch.object(NttWorkflowDriverOltInformation.objects, "get_items") as ntt_oi_mock, \
+                patch.object(ONUDevice.objects, "get_items") as onu_mock, \
+                patch.object(TechnologyProfile.objects, "get_items") as technologyProfile_mock, \
+                patch.object(NttWorkflowDriverServiceInstance, "save_changed_fields", autospec=True) as mock_si_save, \
+                patch.object(NttWorkflowDriverOltInformation, "save_changed_fields", autospec=True):
+            ntt_si_mock.return_value = [failing_si, si]
+            ntt_oi_mock.return_value = [oi]
+            onu_mock.return_value = [self.onu, onu]
+            technologyProfile_mock.return_value = [self.technologyProfile]
+
+            self.event_step.process_batch(events)
+
+            # the event that failed doesn't prevent the other ones from being saved
+            self.assertEqual(si.uni_port_id, 17)
+            saved = [call[0][0] for call in mock_si_save.call_args_list]
+            self.assertIn(si, saved)
+
+    def test_process_batch_failed_event_restored(self):
+        si = NttWorkflowDriverServiceInstance(
+            serial_number="BRCM1234",
+            of_dpid="of:109299321",
+            uni_port_id=16,
+            oper_onu_status="ENABLED",
+        )
+        other_si = NttWorkflowDriverServiceInstance(
+            serial_number="BRCM5678",
+            of_dpid="of:109299321",
+            uni_port_id=18,
+        )
+        oi = NttWorkflowDriverOltInformation(
+            of_dpid="of:109299321"
+        )
+        onu = ONUDevice(serial_number="BRCM5678", mac_address="0b0b0b", pon_port=self.pon_port)
+
+        events = [
+            {'status': 'disabled', 'serialNumber': 'BRCM1234', 'deviceId': 'of:109299321', 'portNumber': '16'},
+            {'status': 'activated', 'serialNumber': 'BRCM1234', 'deviceId': 'of:109299321', 'portNumber': '17'},
+            {'status': 'activated', 'serialNumber': 'BRCM5678', 'deviceId': 'of:109299321', 'portNumber': '19'},
+        ]
+
+        update_si = self.event_step.update_si
+
+        def fail_after_update(ntt_si, value):
+            updated = update_si(ntt_si, value)
+            if value["portNumber"] == "17":
+                raise Exception("failed after changing the service instance")
+            return updated
+
+        saved = []
+
+        def save(model, **kwargs):
+            saved.append((model.serial_number, model.oper_onu_status, model.uni_port_id))
+
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as ntt_si_mock, \
+                patch.object(NttWorkflowDriverOltInformation.objects, "get_items") as ntt_oi_mock, \
+                patch.object(NttWorkflowDriverService.objects, "get_items") as service_mock, \
+                patch.object(ONUDevice.objects, "get_items") as onu_mock, \
+                patch.object(TechnologyProfile.objects, "get_items") as technologyProfile_mock, \
+                patch.object(NttWorkflowDriverServiceInstance, "save_changed_fields", autospec=True,
+                             side_effect=save), \
+                patch.object(NttWorkflowDriverOltInformation, "save_changed_fields", autospec=True), \
+                patch.object(self.event_step, "update_si", side_effect=fail_after_update), \
+                patch.object(self.OnosClient, "remove_subscriber") as remove_subscriber:
+            ntt_si_mock.return_value = [si, other_si]
+            ntt_oi_mock.return_value = [oi]
+            service_mock.return_value = [self.pppoe]
+            onu_mock.return_value = [self.onu, onu]
+            technologyProfile_mock.return_value = [self.technologyProfile]
+
+            applied = self.event_step.process_batch(events)
+
+            self.assertEqual(applied, [events[0], events[2]])
+            self.assertTrue(self.NttHelpers.onos_dispatcher.join(5))
+            # the service instance is saved as the first event left it (then with the outcome of the removal)
+            self.assertEqual(saved[:2], [("BRCM1234", "DISABLED", 16), ("BRCM5678", "ENABLED", 19)])
+            remove_subscriber.assert_called_once_with("of:109299321", 16)
+
+    def test_process_event_batched(self):
+        si = NttWorkflowDriverServiceInstance(
+            serial_number="BRCM1234",
+            of_dpid="of:109299321",
+            uni_port_id=16,
+        )
+
+        oi = NttWorkflowDriverOltInformation(
+            of_dpid="of:109299321"
+        )
+
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as ntt_si_mock, \
+                patch.object(NttWorkflowDriverOltInformation.objects, "get_items") as ntt_oi_mock, \
+                patch.object(ONUDevice.objects, "get_items") as onu_mock, \
+                patch.object(TechnologyProfile.objects, "get_items") as technologyProfile_mock, \
+                patch.object(NttWorkflowDriverServiceInstance, "save_changed_fields", autospec=True) as mock_save, \
+                patch.object(self.event_step.__class__, "batch_size", 2), \
+                patch.object(self.event_step.__class__, "batch_wait", 60), \
+                patch.object(self.event_step.__class__, "batcher", None):
+            ntt_si_mock.return_value = [si]
+            ntt_oi_mock.return_value = [oi]
+            onu_mock.return_value = [self.onu]
+            technologyProfile_mock.return_value = [self.technologyProfile]
+
+            self.event_step.process_event(self.event)
+            self.assertEqual(mock_save.call_count, 0)
+            self.assertEqual(len(self.event_step.get_batcher()), 1)
+
+            # the second event fills the batch
+            self.event.timestamp += 1
+            self.event_step.process_event(self.event)
+            self.assertEqual(mock_save.call_count, 1)
+            self.assertEqual(len(self.event_step.get_batcher()), 0)
+            self.assertEqual(si.oper_onu_status, "ENABLED")
+
+    def test_process_event_sharded(self):
+        si = NttWorkflowDriverServiceInstance(
+            serial_number="BRCM1234",
+            of_dpid="of:109299321",
+            uni_port_id=16,
+        )
+
+        oi = NttWorkflowDriverOltInformation(
+            of_dpid="of:109299321"
+        )
+
+        from event_shards import event_shards
+
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as ntt_si_mock, \
+                patch.object(NttWorkflowDriverOltInformation.objects, "get_items") as ntt_oi_mock, \
+                patch.object(ONUDevice.objects, "get_items") as onu_mock, \
+                patch.object(TechnologyProfile.objects, "get_items") as technologyProfile_mock, \
+                patch.object(NttWorkflowDriverServiceInstance, "save_changed_fields", autospec=True) as mock_save, \
+                patch.object(event_shards, "shards", 2):
+            ntt_si_mock.return_value = [si]
+            ntt_oi_mock.return_value = [oi]
+            onu_mock.return_value = [self.onu]
+            technologyProfile_mock.return_value = [self.technologyProfile]
+
+            self.event_step.process_event(self.event)
+            event_shards.join()
+
+            self.assertEqual(mock_save.call_count, 1)
+            self.assertEqual(si.oper_onu_status, "ENABLED")
+            self.assertEqual(sum(event_shards.get_stats()["processed"].values()), 1)
 
 
 if __name__ == '__main__':
@@ -12,109 +12,281 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import json
 from xossynchronizer.steps.syncstep import DeferredException
-import time
-import requests
-from requests.auth import HTTPBasicAuth
+from provisioner import ProvisioningScheduler
+from onos_dispatcher import OnosDispatcher
+from onos_client import get_onos_client
+from whitelist_index import whitelist_index
+from technology_profile import technology_profile_cache
+from olt_information_cache import olt_information_cache
+from onu_index import onu_index
+from admission_cache import admission_cache, AdmissionDecision
+from metrics import registry, validate_onu_latency, find_or_create_total, elided_writes_total
 
 class NttHelpers():
+    # ONOS subscriber additions are delayed to give the ONU time to come up,
+    # the scheduler fires them in background so that the callers never wait
+    provisioning_scheduler = ProvisioningScheduler(delay=180)
+    # the ONOS calls are sent in parallel, at most one call per subscriber at a time
+    onos_dispatcher = OnosDispatcher()
+    # the event steps don't save the models that an event leaves unchanged
+    elide_writes = True
+    # the admission decisions are remembered by the inputs they depend on
+    memoize_admission = True
+
     @staticmethod
+    @validate_onu_latency.timed()
     def validate_onu(model_accessor, log, ntt_si):
         """
         This method validate an ONU against the whitelist and set the appropriate state.
         It's expected that the deferred exception is managed in the caller method,
         for example a model_policy or a sync_step.
 
+        The decision is memoized (see AdmissionCache), a known decision is applied again
+        without looking up the whitelist and the service.
+
         :param ntt_si: NttWorkflowDriverServiceInstance
         :return: [boolean, string]
         """
-        tech_value = json.loads(model_accessor.TechnologyProfile.objects.get(profile_id=64).profile_value)
-        if tech_value["profile_type"] == "EPON":
-            tech = tech_value["epon_attribute"]["package_type"]
-        else:
-            tech = tech_value["profile_type"]
-              
+        # read first, a decision taken while the whitelist changes is remembered with the old generation
+        whitelist_generation = whitelist_index.get_generation(model_accessor, ntt_si.owner_id)
+        tech = NttHelpers.get_technology_package(model_accessor)
+
+        try:
+            onu = NttHelpers.get_onu(model_accessor, ntt_si.serial_number)
+        except IndexError:
+            # an unknown ONU is only deferred if it's whitelisted, the decision isn't remembered
+            onu = None
+
+        key = None
+        if onu is not None and NttHelpers.memoize_admission:
+            key = admission_cache.key(ntt_si, onu, tech, whitelist_generation)
+            decision = admission_cache.get(key)
+            if decision is not None:
+                return NttHelpers.apply_admission(model_accessor, log, ntt_si, decision)
+
+        decision = NttHelpers.decide_admission(model_accessor, log, ntt_si, tech, onu)
+        if key is not None:
+            admission_cache.put(key, decision)
+        return NttHelpers.apply_admission(model_accessor, log, ntt_si, decision)
+
+    @staticmethod
+    def decide_admission(model_accessor, log, ntt_si, tech, onu):
+        """
+        :param onu: the ONUDevice of the SI, None if it isn't known
+        :return: an AdmissionDecision
+        """
         oss_service = ntt_si.owner.leaf_model
 
         # See if there is a matching entry in the whitelist.
-        matching_entries = model_accessor.NttWorkflowDriverWhiteListEntry.objects.filter(
-            owner_id=oss_service.id,
-        )
-        
-        matching_entries = [e for e in matching_entries if e.mac_address.lower() == ntt_si.mac_address.lower()]
-        
+        matching_entries = whitelist_index.lookup(model_accessor, oss_service.id, ntt_si.mac_address)
+
         if len(matching_entries) == 0:
             log.warn("ONU not found in whitelist")
-            return [False, "ONU not found in whitelist"]
+            return AdmissionDecision(False, "ONU not found in whitelist")
 
-        whitelisted = matching_entries[0]
-        try:
-            onu = model_accessor.ONUDevice.objects.get(serial_number=ntt_si.serial_number.split("-")[0])
-            pon_port = onu.pon_port
-        except IndexError:
+        if onu is None:
             raise DeferredException("ONU device %s is not know to XOS yet" % ntt_si.serial_number)
+        pon_port = onu.pon_port
 
         if onu.admin_state == "ADMIN_DISABLED":
-            return [False, "ONU has been manually disabled"]
+            return AdmissionDecision(False, "ONU has been manually disabled")
 
-        if pon_port.port_no < whitelisted.pon_port_from or pon_port.port_no > whitelisted.pon_port_to:
+        # the ONU may be whitelisted on several PON port ranges
+        if not whitelist_index.is_port_admitted(model_accessor, oss_service.id, ntt_si.mac_address, pon_port.port_no):
             log.warn("PON port is not approved.")
-            return [False, "PON port is not approved."]
-        
+            return AdmissionDecision(False, "PON port is not approved.")
+
         if tech == "B":
             if ntt_si.authentication_state == "DENIED":
-                return [False, "IEEE802.1X authentication has not been denied."]
+                return AdmissionDecision(False, "IEEE802.1X authentication has not been denied.")
             elif ntt_si.authentication_state != "APPROVED":
-                return [True, "IEEE802.1X authentication has not been done yet."]
-        else:
+                return AdmissionDecision(True, "IEEE802.1X authentication has not been done yet.")
+            return AdmissionDecision(True, "ONU has been validated", provision=True)
+        return AdmissionDecision(True, "ONU has been validated", approve=True, provision=True)
+
+    @staticmethod
+    def apply_admission(model_accessor, log, ntt_si, decision):
+        """
+        Apply an AdmissionDecision to the SI: approve it and schedule its provisioning if needed
+
+        :return: [boolean, string]
+        """
+        if decision.approve:
             ntt_si.authentication_state = "APPROVED"
 
+        if decision.provision:
+            log.debug("Scheduling subscriber provisioning",
+                uni_port_id = ntt_si.uni_port_id,
+                dp_id = ntt_si.of_dpid
+            )
+
+            onos_client = get_onos_client(ntt_si.owner.leaf_model)
+            NttHelpers.schedule_add_subscriber(model_accessor, log, onos_client, ntt_si.of_dpid, ntt_si.uni_port_id)
+
+        return [decision.valid, decision.message]
+
+    @staticmethod
+    def get_onu(model_accessor, serial_number):
+        """
+        Return the ONUDevice for a serial number, ignoring the case and the "-<uni>" suffix.
+
+        :raises IndexError: if the ONUDevice doesn't exist
+        """
+        return onu_index.get_onu(model_accessor, serial_number)
+
+    @staticmethod
+    def get_technology_package(model_accessor):
+        """
+        Return the package type ("A", "B" for EPON or the profile type) of the TechnologyProfile,
+        the profile is only parsed again when it changes.
+        """
+        return technology_profile_cache.get_package(model_accessor)
+
+    @staticmethod
+    def subscriber_handle(of_dpid, uni_port_id):
+        return "%s/%s" % (of_dpid, uni_port_id)
+
+    @staticmethod
+    def schedule_add_subscriber(model_accessor, log, onos_client, of_dpid, uni_port_id, delay=None):
+        """
+        Record a "provision at T+delay" job for the subscriber and return immediately,
+        the ONOS call is dispatched by the provisioning scheduler once the job is due.
+        """
+        handle = NttHelpers.subscriber_handle(of_dpid, uni_port_id)
+        return NttHelpers.provisioning_scheduler.schedule(
+            handle,
+            lambda: NttHelpers.dispatch_add_subscriber(model_accessor, log, onos_client, of_dpid, uni_port_id),
+            log, delay=delay)
+
+    @staticmethod
+    def dispatch_add_subscriber(model_accessor, log, onos_client, of_dpid, uni_port_id):
+        """
+        Add the subscriber in ONOS in background and report the result in the status_message of the SI,
+        a failed call is scheduled again after the retry delay of the provisioning scheduler.
+        """
+        def done(response, error):
+            if error is None:
+                NttHelpers.report_subscriber_status(model_accessor, log, of_dpid, uni_port_id,
+                                                    "Subscriber has been provisioned in ONOS")
+                return
+            NttHelpers.report_subscriber_status(model_accessor, log, of_dpid, uni_port_id,
+                                                "Failed to provision the subscriber in ONOS: %s" % error)
+            NttHelpers.schedule_add_subscriber(model_accessor, log, onos_client, of_dpid, uni_port_id,
+                                               delay=NttHelpers.provisioning_scheduler.retry_delay)
+
+        NttHelpers.onos_dispatcher.submit(
+            NttHelpers.subscriber_handle(of_dpid, uni_port_id),
+            lambda: NttHelpers.add_subscriber(log, onos_client, of_dpid, uni_port_id),
+            log, done)
+
+    @staticmethod
+    def dispatch_remove_subscriber(model_accessor, log, onos_client, of_dpid, uni_port_id):
+        """
+        Remove the subscriber from ONOS in background and report the result in the status_message of the SI.
+        The removal runs after the calls already dispatched for the subscriber.
+        """
+        def remove():
+            # an add that failed in the meantime may have been scheduled again
+            NttHelpers.cancel_add_subscriber(of_dpid, uni_port_id)
+            return NttHelpers.remove_subscriber(log, onos_client, of_dpid, uni_port_id)
+
+        def done(response, error):
+            if error is None:
+                message = "Subscriber has been removed from ONOS"
+            else:
+                message = "Failed to remove the subscriber from ONOS: %s" % error
+            NttHelpers.report_subscriber_status(model_accessor, log, of_dpid, uni_port_id, message)
+
+        NttHelpers.onos_dispatcher.submit(NttHelpers.subscriber_handle(of_dpid, uni_port_id), remove, log, done)
+
+    @staticmethod
+    def report_subscriber_status(model_accessor, log, of_dpid, uni_port_id, message):
+        sis = model_accessor.NttWorkflowDriverServiceInstance.objects.filter(of_dpid=of_dpid, uni_port_id=uni_port_id)
+        for si in sis:
+            si.status_message = message
+            # without always_update_timestamp the model policy doesn't run again
+            si.save_changed_fields()
+        log.info("Reported the subscriber status", of_dpid=of_dpid, uni_port_id=uni_port_id, status_message=message)
+
+    @staticmethod
+    def cancel_add_subscriber(of_dpid, uni_port_id):
+        handle = NttHelpers.subscriber_handle(of_dpid, uni_port_id)
+        return NttHelpers.provisioning_scheduler.cancel(handle)
+
+    @staticmethod
+    def add_subscriber(log, onos_client, of_dpid, uni_port_id):
         log.debug("Adding subscriber with info",
-            uni_port_id = ntt_si.uni_port_id,
-            dp_id = ntt_si.of_dpid
+            uni_port_id = uni_port_id,
+            dp_id = of_dpid
         )
-        
-        time.sleep(180)
-
-        onos_voltha_basic_auth = HTTPBasicAuth("karaf", "karaf")
 
-        handle = "%s/%s" % (ntt_si.of_dpid, ntt_si.uni_port_id)
-        # TODO store URL and PORT in the vOLT Service model
-        full_url = "http://129.60.110.180:8181/onos/olt/oltapp/%s" % (handle)
+        log.info("Sending request to onos-voltha", url=onos_client.base_url)
+        response = onos_client.add_subscriber(of_dpid, uni_port_id)
+        log.info("Added Subscriber in onos voltha", response=response.text)
+        return response
 
-        log.info("Sending request to onos-voltha", url=full_url)
+    @staticmethod
+    def remove_subscriber(log, onos_client, of_dpid, uni_port_id):
+        log.debug("Removing subscriber with info",
+            uni_port_id = uni_port_id,
+            dp_id = of_dpid
+        )
 
-        request = requests.post(full_url, auth=onos_voltha_basic_auth)
+        log.info("Sending request to onos-voltha", url=onos_client.base_url)
+        response = onos_client.remove_subscriber(of_dpid, uni_port_id)
+        log.info("Removed Subscriber from onos voltha", response=response.text)
+        return response
 
-        if request.status_code != 200:
-            raise Exception("Failed to add subscriber in onos-voltha: %s" % request.text)
-        log.info("Added Subscriber in onos voltha", response=request.text)
+    @staticmethod
+    def save_event_changes(model, fields, run_policies=True):
+        """
+        Save a model updated by an event, with always_update_timestamp so that its policies run.
+        Unless the model is new, the save is skipped (and counted) if none of `fields` changed:
+        it would only trigger the policies and the watchers again.
 
-        return [True, "ONU has been validated"]
+        :param run_policies: False if the change doesn't concern the policies, the timestamp isn't updated
+        :return: True if the model has been saved
+        """
+        if NttHelpers.elide_writes and not model.is_new and not set(fields).intersection(model.changed_fields):
+            elided_writes_total.inc(model=model.leaf_model_name)
+            return False
+        if run_policies:
+            model.save_changed_fields(always_update_timestamp=True)
+        else:
+            # without always_update_timestamp the model policy doesn't run again
+            model.save_changed_fields()
+        return True
 
     @staticmethod
-    def find_or_create_ntt_si(model_accessor, log, event):
+    def find_or_create_ntt_si(model_accessor, log, event, known_sis=None):
+        """
+        :param known_sis: optional dict serial_number -> NttWorkflowDriverServiceInstance already
+                          fetched by the caller, the data model is only queried for missing serials
+        """
         try:
-            ntt_si = model_accessor.NttWorkflowDriverServiceInstance.objects.get(
-                serial_number=event["serialNumber"]
-            )
+            if known_sis is not None and event["serialNumber"] in known_sis:
+                ntt_si = known_sis[event["serialNumber"]]
+            else:
+                ntt_si = model_accessor.NttWorkflowDriverServiceInstance.objects.get(
+                    serial_number=event["serialNumber"]
+                )
             try:
-                onu = model_accessor.ONUDevice.objects.get(serial_number=event["serialNumber"].split("-")[0])
+                onu = NttHelpers.get_onu(model_accessor, event["serialNumber"])
                 ntt_si.mac_address = onu.mac_address
             except IndexError:
                 log.debug("NttHelpers: ONU has been deleted", si=ntt_si)
             log.debug("NttHelpers: Found existing NttWorkflowDriverServiceInstance", si=ntt_si)
+            find_or_create_total.inc(model="NttWorkflowDriverServiceInstance", result="found")
         except IndexError:
             # create an NttWorkflowDriverServiceInstance, the validation will be
             # triggered in the corresponding sync step
-            while True:
-                try:
-                    onu = model_accessor.ONUDevice.objects.get(serial_number=event["serialNumber"].split("-")[0])
-                    break
-                except IndexError:
-                    time.sleep(1)
-                    continue
+            try:
+                onu = NttHelpers.get_onu(model_accessor, event["serialNumber"])
+            except IndexError:
+                # the event is parked by the caller and replayed once the ONU is created
+                find_or_create_total.inc(model="NttWorkflowDriverServiceInstance", result="deferred")
+                raise DeferredException("ONU device %s is not know to XOS yet" % event["serialNumber"])
 
             ntt_si = model_accessor.NttWorkflowDriverServiceInstance(
                 serial_number=event["serialNumber"],
@@ -125,40 +297,51 @@ class NttHelpers():
                 owner=model_accessor.NttWorkflowDriverService.objects.first()
             )
             log.debug("NttHelpers: Created new NttWorkflowDriverServiceInstance", si=ntt_si)
+            find_or_create_total.inc(model="NttWorkflowDriverServiceInstance", result="created")
         return ntt_si
 
     @staticmethod
-    def find_or_create_ntt_oi(model_accessor, log, event):
+    def find_or_create_ntt_oi(model_accessor, log, event, known_ois=None):
+        """
+        The OLT information is cached once its PON port and package have been resolved,
+        the following events of the OLT don't query the data model.
+
+        :param known_ois: optional dict of_dpid -> NttWorkflowDriverOltInformation holding all the
+                          OLT information fetched by the caller, the data model is not queried
+        """
+        if known_ois is None:
+            ntt_oi = olt_information_cache.get(model_accessor, event["deviceId"])
+            if ntt_oi is not None:
+                find_or_create_total.inc(model="NttWorkflowDriverOltInformation", result="cached")
+                return ntt_oi
+
         try:
-            ntt_oi = model_accessor.NttWorkflowDriverOltInformation.objects.get(
-                of_dpid=event["deviceId"]
-            )
+            if known_ois is not None:
+                if event["deviceId"] not in known_ois:
+                    raise IndexError("No NttWorkflowDriverOltInformation for %s" % event["deviceId"])
+                ntt_oi = known_ois[event["deviceId"]]
+            else:
+                ntt_oi = model_accessor.NttWorkflowDriverOltInformation.objects.get(
+                    of_dpid=event["deviceId"]
+                )
             try:
-                onu = model_accessor.ONUDevice.objects.get(serial_number=event["serialNumber"].split("-")[0])
+                onu = NttHelpers.get_onu(model_accessor, event["serialNumber"])
                 ntt_oi.port_no = onu.pon_port.port_no
-                tech_value = json.loads(model_accessor.TechnologyProfile.objects.get(profile_id=64).profile_value)
-                if tech_value["profile_type"] == "EPON":
-                    tech = tech_value["epon_attribute"]["package_type"]
-                else:
-                    tech = tech_value["profile_type"]
-                ntt_oi.olt_package = tech
+                (ntt_oi.olt_package, generation) = technology_profile_cache.resolve(model_accessor)
+                olt_information_cache.put(ntt_oi, generation)
             except IndexError:
                 log.debug("NttHelpers: ONU has been deleted", oi=ntt_oi)
             log.debug("NttHelpers: Found existing NttWorkflowDriverOltInformation", oi=ntt_oi)
+            find_or_create_total.inc(model="NttWorkflowDriverOltInformation", result="found")
         except IndexError:
-            while True:
-                try:
-                    onu = model_accessor.ONUDevice.objects.get(serial_number=event["serialNumber"].split("-")[0])
-                    break
-                except IndexError:
-                    time.sleep(1)
-                    continue
-
-            tech_value = json.loads(model_accessor.TechnologyProfile.objects.get(profile_id=64).profile_value)
-            if tech_value["profile_type"] == "EPON":
-                tech = tech_value["epon_attribute"]["package_type"]
-            else:
-                tech = tech_value["profile_type"]
+            try:
+                onu = NttHelpers.get_onu(model_accessor, event["serialNumber"])
+            except IndexError:
+                # the event is parked by the caller and replayed once the ONU is created
+                find_or_create_total.inc(model="NttWorkflowDriverOltInformation", result="deferred")
+                raise DeferredException("ONU device %s is not know to XOS yet" % event["serialNumber"])
+
+            (tech, generation) = technology_profile_cache.resolve(model_accessor)
 
             pon_port = onu.pon_port
             ntt_oi = model_accessor.NttWorkflowDriverOltInformation(
@@ -167,5 +350,13 @@ class NttHelpers():
                 port_no=pon_port.port_no,
                 owner=model_accessor.NttWorkflowDriverService.objects.first()
             )
+            olt_information_cache.put(ntt_oi, generation)
             log.debug("NttHelpers: Created new NttWorkflowDriverOltInformation", oi=ntt_oi)
-        return ntt_oi
\ No newline at end of file
+            find_or_create_total.inc(model="NttWorkflowDriverOltInformation", result="created")
+        return ntt_oi
+
+
+registry.register_stats("ntt_onos_dispatcher", "ONOS calls dispatched in background",
+                        NttHelpers.onos_dispatcher.get_stats)
+registry.register_stats("ntt_provisioning", "Subscriber provisioning jobs",
+                        lambda: {"pending": NttHelpers.provisioning_scheduler.pending_count()})
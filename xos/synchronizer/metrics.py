@@ -0,0 +1,292 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Prometheus metrics of the synchronizer, in the text exposition format.
+
+The metrics are kept in memory by the module-level registry and served over HTTP by
+start_metrics_server(), on http://<host>:<port>/metrics (ntt_workflow_driver.metrics_port
+in the configuration, metrics_port by default).
+"""
+
+import threading
+import time
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from functools import wraps
+
+metrics_port = 8000
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{%s}" % ",".join('%s="%s"' % (k, escape_label(v)) for (k, v) in labels)
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric(object):
+    """
+    A metric with one value per set of label values, the subclasses update the values
+    """
+    type = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        # tuple of label values -> value(s)
+        self.values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError("%s expects the labels %s, got %s" % (self.name, self.labelnames, sorted(labels)))
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """
+        :return: the (name, labels, value) samples of the metric, one per set of label values
+        """
+        with self.lock:
+            values = sorted(self.values.items())
+        return [(self.name, zip(self.labelnames, key), value) for (key, value) in values]
+
+    def render(self):
+        lines = ["# HELP %s %s" % (self.name, self.documentation), "# TYPE %s %s" % (self.name, self.type)]
+        for (name, labels, value) in self.samples():
+            lines.append("%s%s %s" % (name, format_labels(labels), format_value(value)))
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                # [count per bucket (not cumulative), +Inf count, sum]
+                state = self.values[key] = [[0] * len(self.buckets), 0, 0.0]
+            for (i, bound) in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            else:
+                state[1] += 1
+            state[2] += value
+
+    def get_count(self, **labels):
+        with self.lock:
+            state = self.values.get(self._key(labels))
+            return sum(state[0]) + state[1] if state else 0
+
+    def time(self, **labels):
+        return HistogramTimer(self, labels)
+
+    def timed(self, **labels):
+        """
+        Decorator observing the duration of each call of the decorated function
+        """
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.time(**labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def samples(self):
+        with self.lock:
+            values = sorted((key, (list(state[0]), state[1], state[2])) for (key, state) in self.values.items())
+
+        samples = []
+        for (key, (counts, inf_count, total)) in values:
+            labels = zip(self.labelnames, key)
+            cumulative = 0
+            for (bound, count) in zip(self.buckets, counts):
+                cumulative += count
+                samples.append((self.name + "_bucket", labels + [("le", format_value(bound))], cumulative))
+            cumulative += inf_count
+            samples.append((self.name + "_bucket", labels + [("le", "+Inf")], cumulative))
+            samples.append((self.name + "_sum", labels, total))
+            samples.append((self.name + "_count", labels, cumulative))
+        return samples
+
+
+class HistogramTimer(object):
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(time.time() - self.start, **self.labels)
+
+
+def is_number(value):
+    return not isinstance(value, bool) and isinstance(value, (int, long, float))
+
+
+class StatsCollector(object):
+    """
+    Exposes the dict returned by a get_stats() function as gauges named <prefix>_<key>,
+    the non-numeric values are skipped.
+    With a `labelname`, the dict values are exposed as one gauge per item, labelled with the item key.
+    """
+
+    type = "gauge"
+
+    def __init__(self, prefix, documentation, get_stats, labelname=None):
+        self.name = prefix
+        self.prefix = prefix
+        self.documentation = documentation
+        self.get_stats = get_stats
+        self.labelname = labelname
+
+    def render(self):
+        lines = []
+        for (key, value) in sorted(self.get_stats().items()):
+            if self.labelname and isinstance(value, dict):
+                samples = [([(self.labelname, k)], v) for (k, v) in sorted(value.items()) if is_number(v)]
+            elif is_number(value):
+                samples = [([], value)]
+            else:
+                continue
+            name = "%s_%s" % (self.prefix, key)
+            lines.append("# HELP %s %s: %s" % (name, self.documentation, key))
+            lines.append("# TYPE %s %s" % (name, self.type))
+            for (labels, sample) in samples:
+                lines.append("%s%s %s" % (name, format_labels(labels), format_value(sample)))
+        return lines
+
+
+class MetricsRegistry(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = []
+
+    def register(self, metric):
+        with self.lock:
+            # registering a name again replaces the previous metric
+            self.metrics = [m for m in self.metrics if m.name != metric.name]
+            self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_stats(self, prefix, documentation, get_stats, labelname=None):
+        return self.register(StatsCollector(prefix, documentation, get_stats, labelname))
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics)
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+event_latency = registry.histogram(
+    "ntt_event_processing_seconds", "Time spent processing a Kafka event", ["topic"])
+validate_onu_latency = registry.histogram(
+    "ntt_validate_onu_seconds", "Time spent validating an ONU against the whitelist")
+find_or_create_total = registry.counter(
+    "ntt_find_or_create_total", "Models looked up for an event, by model and branch", ["model", "result"])
+elided_writes_total = registry.counter(
+    "ntt_elided_writes_total", "Saves skipped because the event didn't change the model", ["model"])
+policy_latency = registry.histogram(
+    "ntt_policy_handle_update_seconds", "Time spent in the handle_update of a model policy", ["model"])
+onos_latency = registry.histogram(
+    "ntt_onos_request_seconds", "Duration of the requests to the ONOS olt-app", ["operation"])
+onos_responses_total = registry.counter(
+    "ntt_onos_responses_total", "Responses of the ONOS olt-app, by status code", ["operation", "code"])
+reconcile_latency = registry.histogram(
+    "ntt_reconcile_seconds", "Duration of a reconciliation of the subscribers with the ONOS olt-app",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0))
+reconcile_corrections_total = registry.counter(
+    "ntt_reconcile_corrections_total", "Subscribers added or removed by the reconciliation, by result",
+    ["operation", "result"])
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry = registry
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # scrapes are frequent, don't write them to stderr
+        pass
+
+
+def start_metrics_server(port=None, host="0.0.0.0"):
+    """
+    Serve the metrics from a daemon thread
+
+    :return: the HTTPServer
+    """
+    if port is None:
+        port = metrics_port
+    server = HTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="MetricsServer")
+    thread.daemon = True
+    thread.start()
+    return server
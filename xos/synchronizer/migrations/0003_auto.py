@@ -0,0 +1,50 @@
+# Copyright 2017-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.11 on 2020-12-07 10:12
+from __future__ import unicode_literals
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ntt-workflow-driver', '0002_auto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nttworkflowdriverservice',
+            name='onos_voltha_url',
+            field=models.CharField(default=b'129.60.110.180', help_text=b'The ONOS Voltha address', max_length=256),
+        ),
+        migrations.AddField(
+            model_name='nttworkflowdriverservice',
+            name='onos_voltha_port',
+            field=models.IntegerField(default=8181, help_text=b'The ONOS Voltha REST port', validators=[django.core.validators.MaxValueValidator(65535), django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AddField(
+            model_name='nttworkflowdriverservice',
+            name='onos_voltha_user',
+            field=models.CharField(default=b'karaf', help_text=b'The ONOS Voltha username', max_length=256),
+        ),
+        migrations.AddField(
+            model_name='nttworkflowdriverservice',
+            name='onos_voltha_pass',
+            field=models.CharField(default=b'karaf', help_text=b'The ONOS Voltha password', max_length=256),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from olt_information_cache import olt_information_cache
+from ownership import olt_ownership
+from xossynchronizer.model_policies.policy import Policy
+import os
+import sys
+
+sync_path = os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+sys.path.append(sync_path)
+
+
+class NttWorkflowDriverOltInformationPolicy(Policy):
+    model_name = "NttWorkflowDriverOltInformation"
+
+    # Keep the OLT information cached by the event steps current
+    def handle_create(self, oi):
+        self.handle_update(oi)
+
+    def handle_update(self, oi):
+        self.logger.debug("MODEL_POLICY: handle_update for NttWorkflowDriverOltInformation", oi=oi)
+        if olt_ownership.skip(oi.of_dpid):
+            # the OLT information is only used by the replica that owns the OLT
+            return
+        olt_information_cache.update(oi)
+
+    def handle_delete(self, oi):
+        self.logger.debug("MODEL_POLICY: handle_delete for NttWorkflowDriverOltInformation", oi=oi)
+        olt_information_cache.remove(oi)
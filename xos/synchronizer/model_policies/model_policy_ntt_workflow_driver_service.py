@@ -0,0 +1,51 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from whitelist_index import whitelist_index
+from service_instance_index import service_instance_index
+from ownership import olt_ownership
+from xossynchronizer.model_policies.policy import Policy
+import os
+import sys
+
+sync_path = os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+sys.path.append(sync_path)
+
+
+class NttWorkflowDriverServicePolicy(Policy):
+    model_name = "NttWorkflowDriverService"
+
+    # The bulk import of the whitelist (whitelist_import.py) saves the entries without running their
+    # policies, then saves the service: the service instances of the changed entries are validated here.
+    def handle_create(self, service):
+        self.handle_update(service)
+
+    def handle_update(self, service):
+        self.logger.debug("MODEL_POLICY: handle_update for NttWorkflowDriverService", service=service)
+
+        macs = whitelist_index.reload_owner(self.model_accessor, service.id)
+
+        revalidated = 0
+        for mac in sorted(macs):
+            if olt_ownership.enabled:
+                # the SIs of the OLTs of the other replicas are indexed by their own policies
+                service_instance_index.refresh(self.model_accessor, mac)
+            for si in service_instance_index.lookup(self.model_accessor, mac):
+                # the SI policy validates it, in the replica that owns its OLT
+                si.save(update_fields=["updated"], always_update_timestamp=True)
+                revalidated += 1
+
+        self.logger.info("MODEL_POLICY: validated again the service instances of the changed whitelist entries",
+                         service=service, macs=len(macs), service_instances=revalidated)
@@ -15,6 +15,10 @@
 
 
 from helpers import NttHelpers
+from service_instance_index import service_instance_index
+from whitelist_index import whitelist_index
+from ownership import olt_ownership
+from metrics import policy_latency
 from xossynchronizer.model_policies.policy import Policy
 
 import os
@@ -35,9 +39,18 @@ class NttWorkflowDriverServiceInstancePolicy(Policy):
         self.logger.debug("MODEL_POLICY: handle_create for NttWorkflowDriverServiceInstance %s " % si.id)
         self.handle_update(si)
 
+    @policy_latency.timed(model="NttWorkflowDriverServiceInstance")
     def handle_update(self, si):
         self.logger.debug("MODEL_POLICY: handle_update for NttWorkflowDriverServiceInstance %s " %
                           (si.id), onu_state=si.admin_onu_state, authentication_state=si.authentication_state)
+        service_instance_index.update(si)
+        if olt_ownership.skip(si.of_dpid):
+            # the SI is processed by the replica that owns its OLT (it's only fetched by that one,
+            # unless the OLTs have just been rebalanced)
+            return
+        if olt_ownership.enabled:
+            # the whitelist entries may have been policed by another replica
+            whitelist_index.refresh(self.model_accessor, si.owner_id, si.mac_address)
         self.process_onu_state(si)
         si.save_changed_fields()
 
@@ -56,8 +69,7 @@ class NttWorkflowDriverServiceInstancePolicy(Policy):
             si.authentication_state = "DENIED"
 
     def update_onu(self, serial_number, admin_state):
-        onu = [onu for onu in self.model_accessor.ONUDevice.objects.all()
-               if onu.serial_number.lower() == serial_number.lower().split('-')[0]][0]
+        onu = NttHelpers.get_onu(self.model_accessor, serial_number)
         if onu.admin_state == "ADMIN_DISABLED":
             self.logger.debug(
                 "MODEL_POLICY: ONUDevice [%s] has been manually disabled, not changing state to %s" %
@@ -73,4 +85,4 @@ class NttWorkflowDriverServiceInstancePolicy(Policy):
             onu.save_changed_fields(always_update_timestamp=True)
 
     def handle_delete(self, si):
-        pass
+        service_instance_index.remove(si)
@@ -14,6 +14,10 @@
 
 
 from helpers import NttHelpers
+from whitelist_index import whitelist_index, normalize_mac
+from service_instance_index import service_instance_index
+from ownership import olt_ownership
+from metrics import policy_latency
 from xossynchronizer.model_policies.policy import Policy
 import os
 import sys
@@ -31,6 +35,11 @@ class NttWorkflowDriverWhiteListEntryPolicy(Policy):
     # Update the SI if the onu_state has changed.
     # The SI model policy will take care of updating other state.
     def validate_onu_state(self, si):
+        if not olt_ownership.owns(si.of_dpid):
+            # validated (and provisioned) by the SI policy of the replica that owns its OLT, which runs once
+            # the timestamp is updated
+            si.save(update_fields=["updated"], always_update_timestamp=True)
+            return
         [valid, message] = NttHelpers.validate_onu(self.model_accessor, self.logger, si)
         if valid:
             si.admin_onu_state = "ENABLED"
@@ -46,22 +55,67 @@ class NttWorkflowDriverWhiteListEntryPolicy(Policy):
         si.status_message = message
         si.save_changed_fields(always_update_timestamp=True)
 
+    @policy_latency.timed(model="NttWorkflowDriverWhiteListEntry")
     def handle_update(self, whitelist):
         self.logger.debug("MODEL_POLICY: handle_update for NttWorkflowDriverWhiteListEntry", whitelist=whitelist)
 
-        sis = self.model_accessor.NttWorkflowDriverServiceInstance.objects.all()
+        snapshot = whitelist_index.get_snapshot(whitelist.id)
+        if snapshot is None or snapshot == (normalize_mac(whitelist.mac_address),
+                                            whitelist.pon_port_from, whitelist.pon_port_to):
+            # a new entry (or the entries of the owner haven't been indexed yet), or the index may already
+            # hold the updated entry (eg: it was loaded after the update): what changed isn't known
+            whitelist_index.update(whitelist)
 
-        for si in sis:
-
-            if si.mac_address.lower() != whitelist.mac_address.lower():
-                # NOTE we don't care about this SI as it has a different serial number
-                continue
+            # NOTE we only care about the SIs with the same MAC address
+            sis = self.lookup_service_instances(whitelist.mac_address)
 
-            self.validate_onu_state(si)
+            for si in sis:
+                self.validate_onu_state(si)
+        else:
+            self.revalidate_changes(whitelist, snapshot[0])
 
         whitelist.backend_need_delete_policy = True
         whitelist.save_changed_fields()
 
+    def revalidate_changes(self, whitelist, old_mac):
+        """
+        Validate again only the SIs whose admission changes with the update of an indexed entry:
+        the SIs of the old and new MAC whose PON port is admitted by the old ranges but not by the new ones,
+        or the other way around.
+        """
+        macs = set([old_mac, normalize_mac(whitelist.mac_address)])
+        before = dict((mac, whitelist_index.get_port_ranges(self.model_accessor, whitelist.owner_id, mac))
+                      for mac in macs)
+        whitelist_index.update(whitelist)
+        after = dict((mac, whitelist_index.get_port_ranges(self.model_accessor, whitelist.owner_id, mac))
+                     for mac in macs)
+
+        skipped = 0
+        for mac in macs:
+            if before[mac].intervals() == after[mac].intervals():
+                # the same ports are admitted (eg: the range is covered by another entry)
+                continue
+            for si in self.lookup_service_instances(mac):
+                try:
+                    port_no = NttHelpers.get_onu(self.model_accessor, si.serial_number).pon_port.port_no
+                except IndexError:
+                    # let the validation deal with the missing ONU
+                    self.validate_onu_state(si)
+                    continue
+
+                if before[mac].contains(port_no) == after[mac].contains(port_no):
+                    skipped += 1
+                    continue
+                self.validate_onu_state(si)
+
+        self.logger.debug("MODEL_POLICY: skipped the SIs whose admission didn't change", skipped=skipped)
+
+    def lookup_service_instances(self, mac_address):
+        if olt_ownership.enabled:
+            # the SIs of the OLTs of the other replicas are indexed by their own policies
+            service_instance_index.refresh(self.model_accessor, mac_address)
+        return service_instance_index.lookup(self.model_accessor, mac_address)
+
     def handle_delete(self, whitelist):
         self.logger.debug(
             "MODEL_POLICY: handle_delete for NttWorkflowDriverWhiteListEntry")
@@ -70,8 +124,9 @@ class NttWorkflowDriverWhiteListEntryPolicy(Policy):
 
         assert(whitelist.owner)
 
-        sis = self.model_accessor.NttWorkflowDriverServiceInstance.objects.all()
-        sis = [si for si in sis if si.mac_address.lower() == whitelist.mac_address.lower()]
+        whitelist_index.remove(whitelist)
+
+        sis = self.lookup_service_instances(whitelist.mac_address)
 
         for si in sis:
             self.validate_onu_state(si)
@@ -0,0 +1,111 @@
+
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+from mock import Mock, patch
+
+import os
+import sys
+
+test_path = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class TestModelPolicyNttWorkflowDriverOltInformation(unittest.TestCase):
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        config = os.path.join(test_path, "../test_config.yaml")
+        from xosconfig import Config
+        Config.clear()
+        Config.init(config, 'synchronizer-config-schema.yaml')
+
+        from xossynchronizer.mock_modelaccessor_build import mock_modelaccessor_config
+        mock_modelaccessor_config(test_path, [("ntt-workflow-driver", "ntt-workflow-driver.xproto"),
+                                              ("olt-service", "volt.xproto"),
+                                              ("rcord", "rcord.xproto")])
+
+        import xossynchronizer.modelaccessor
+        import mock_modelaccessor
+        reload(mock_modelaccessor)  # in case nose2 loaded it in a previous test
+        reload(xossynchronizer.modelaccessor)      # in case nose2 loaded it in a previous test
+
+        from xossynchronizer.modelaccessor import model_accessor
+        from model_policy_ntt_workflow_driver_oltinformation import NttWorkflowDriverOltInformationPolicy, \
+            olt_information_cache
+        from technology_profile import technology_profile_cache
+
+        self.olt_information_cache = olt_information_cache
+        self.olt_information_cache.clear()
+        self.technology_profile_cache = technology_profile_cache
+
+        # import all class names to globals
+        for (k, v) in model_accessor.all_model_classes.items():
+            globals()[k] = v
+
+        model_accessor.reset_all_object_stores()
+        self.model_accessor = model_accessor
+
+        self.policy = NttWorkflowDriverOltInformationPolicy(model_accessor=model_accessor)
+
+        self.oi = NttWorkflowDriverOltInformation(id=1, of_dpid="of:109299321", port_no=1234, olt_package="A")
+        self.technology_profile_cache.resolve = Mock(return_value=("A", 1))
+        self.olt_information_cache.put(self.oi, 1)
+
+    def tearDown(self):
+        del self.technology_profile_cache.resolve
+        self.olt_information_cache.clear()
+        sys.path = self.sys_path_save
+
+    def test_update_oi(self):
+        oi = NttWorkflowDriverOltInformation(id=1, of_dpid="of:109299321", port_no=5678, olt_package="B")
+
+        self.policy.handle_update(oi)
+
+        self.assertEqual(self.olt_information_cache.get(self.model_accessor, "of:109299321"), oi)
+
+    def test_update_of_dpid(self):
+        oi = NttWorkflowDriverOltInformation(id=1, of_dpid="of:2", port_no=1234, olt_package="A")
+
+        self.policy.handle_update(oi)
+
+        self.assertIsNone(self.olt_information_cache.get(self.model_accessor, "of:109299321"))
+        self.assertIsNone(self.olt_information_cache.get(self.model_accessor, "of:2"))
+
+    def test_update_other_replica(self):
+        from ownership import olt_ownership
+        oi = NttWorkflowDriverOltInformation(id=1, of_dpid="of:109299321", port_no=5678, olt_package="B")
+
+        with patch.object(olt_ownership, "owns", return_value=False):
+            self.policy.handle_update(oi)
+
+        # only used by the replica that owns the OLT
+        self.assertEqual(self.olt_information_cache.get(self.model_accessor, "of:109299321"), self.oi)
+
+    def test_create_oi(self):
+        # the package of a new OLT information hasn't been resolved, it is cached by the event steps
+        oi = NttWorkflowDriverOltInformation(id=2, of_dpid="of:2", port_no=1234, olt_package="A")
+
+        self.policy.handle_create(oi)
+
+        self.assertIsNone(self.olt_information_cache.get(self.model_accessor, "of:2"))
+        self.assertEqual(len(self.olt_information_cache), 1)
+
+    def test_delete_oi(self):
+        self.policy.handle_delete(self.oi)
+
+        self.assertIsNone(self.olt_information_cache.get(self.model_accessor, "of:109299321"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import unittest
+from mock import patch
+
+import os
+import sys
+
+test_path = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class TestModelPolicyNttWorkflowDriverService(unittest.TestCase):
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        config = os.path.join(test_path, "../test_config.yaml")
+        from xosconfig import Config
+        Config.clear()
+        Config.init(config, 'synchronizer-config-schema.yaml')
+
+        from xossynchronizer.mock_modelaccessor_build import mock_modelaccessor_config
+        mock_modelaccessor_config(test_path, [("ntt-workflow-driver", "ntt-workflow-driver.xproto"),
+                                              ("olt-service", "volt.xproto"),
+                                              ("rcord", "rcord.xproto")])
+
+        import xossynchronizer.modelaccessor
+        import mock_modelaccessor
+        reload(mock_modelaccessor)  # in case nose2 loaded it in a previous test
+        reload(xossynchronizer.modelaccessor)      # in case nose2 loaded it in a previous test
+
+        from xossynchronizer.modelaccessor import model_accessor
+        from model_policy_ntt_workflow_driver_service import NttWorkflowDriverServicePolicy
+
+        from service_instance_index import service_instance_index
+        self.service_instance_index = service_instance_index
+        self.service_instance_index.clear()
+
+        from whitelist_index import whitelist_index
+        self.whitelist_index = whitelist_index
+        self.whitelist_index.clear()
+
+        # import all class names to globals
+        for (k, v) in model_accessor.all_model_classes.items():
+            globals()[k] = v
+
+        model_accessor.reset_all_object_stores()
+
+        self.policy = NttWorkflowDriverServicePolicy(model_accessor=model_accessor)
+
+        self.service = NttWorkflowDriverService(id=5)
+
+    def tearDown(self):
+        sys.path = self.sys_path_save
+        self.service = None
+
+    def test_revalidate_changed_entries(self):
+        wle = NttWorkflowDriverWhiteListEntry(id=1, mac_address="0a0a0a", pon_port_from=1, pon_port_to=10,
+                                              owner_id=self.service.id, policed=1, updated=1)
+        other_wle = NttWorkflowDriverWhiteListEntry(id=2, mac_address="0b0b0b", pon_port_from=1, pon_port_to=10,
+                                                    owner_id=self.service.id, policed=1, updated=1)
+        self.whitelist_index.update(wle)
+        self.whitelist_index.update(other_wle)
+        self.whitelist_index.loaded_owners.add(self.service.id)
+
+        si = NttWorkflowDriverServiceInstance(id=1, serial_number="BRCM1", mac_address="0A0A0A",
+                                              owner_id=self.service.id)
+        other_si = NttWorkflowDriverServiceInstance(id=2, serial_number="BRCM2", mac_address="0b0b0b",
+                                                    owner_id=self.service.id)
+
+        # the range of the first entry was imported in bulk
+        imported_wle = NttWorkflowDriverWhiteListEntry(id=1, mac_address="0a0a0a", pon_port_from=1, pon_port_to=20,
+                                                       owner_id=self.service.id, policed=2, updated=2)
+        with patch.object(NttWorkflowDriverWhiteListEntry.objects, "get_items") as wle_items, \
+                patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as oss_si_items, \
+                patch.object(si, "save") as save_si, \
+                patch.object(other_si, "save") as save_other_si:
+            wle_items.return_value = [imported_wle, other_wle]
+            oss_si_items.return_value = [si, other_si]
+
+            self.policy.handle_update(self.service)
+
+            # a single pass over the SIs of the changed MAC, their policy validates them
+            save_si.assert_called_once_with(update_fields=["updated"], always_update_timestamp=True)
+            save_other_si.assert_not_called()
+
+            self.assertEqual(self.whitelist_index.lookup(self.policy.model_accessor, self.service.id, "0a0a0a"),
+                             [imported_wle])
+
+    def test_nothing_changed(self):
+        wle = NttWorkflowDriverWhiteListEntry(id=1, mac_address="0a0a0a", pon_port_from=1, pon_port_to=10,
+                                              owner_id=self.service.id, policed=1, updated=1)
+        self.whitelist_index.update(wle)
+        self.whitelist_index.loaded_owners.add(self.service.id)
+
+        with patch.object(NttWorkflowDriverWhiteListEntry.objects, "get_items") as wle_items, \
+                patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as oss_si_items:
+            wle_items.return_value = [wle]
+
+            self.policy.handle_update(self.service)
+
+            oss_si_items.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
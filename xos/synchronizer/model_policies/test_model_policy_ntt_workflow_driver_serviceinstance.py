@@ -15,14 +15,29 @@
 
 
 import unittest
-from mock import patch
+from mock import patch, Mock
 
 import os
 import sys
+import shutil
+import tempfile
 
 test_path = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
 
 
+def mock_filter(items):
+    # the mock object stores don't support the "__iexact" lookups
+    def filter(**kwargs):
+        result = items
+        for (k, v) in kwargs.items():
+            if k.endswith("__iexact"):
+                result = [x for x in result if getattr(x, k[:-8]).lower() == v.lower()]
+            else:
+                result = [x for x in result if getattr(x, k) == v]
+        return result
+    return filter
+
+
 class TestModelPolicyNttWorkflowDriverServiceInstance(unittest.TestCase):
     def setUp(self):
 
@@ -47,6 +62,15 @@ class TestModelPolicyNttWorkflowDriverServiceInstance(unittest.TestCase):
         from model_policy_ntt_workflow_driver_serviceinstance import NttWorkflowDriverServiceInstancePolicy, NttHelpers
         self.NttHelpers = NttHelpers
 
+        from service_instance_index import service_instance_index
+        self.service_instance_index = service_instance_index
+        self.service_instance_index.clear()
+
+        from onu_index import onu_index
+        onu_index.clear()
+        from admission_cache import admission_cache
+        admission_cache.clear()
+
         # import all class names to globals
         for (k, v) in model_accessor.all_model_classes.items():
             globals()[k] = v
@@ -69,9 +93,9 @@ class TestModelPolicyNttWorkflowDriverServiceInstance(unittest.TestCase):
             serial_number="BRCM1234",
             admin_state="ENABLED"
         )
-        with patch.object(ONUDevice.objects, "get_items") as get_onu, \
+        with patch.object(ONUDevice.objects, "filter") as filter_onu, \
                 patch.object(onu, "save") as onu_save:
-            get_onu.return_value = [onu]
+            filter_onu.side_effect = mock_filter([onu])
 
             self.policy.update_onu("brcm1234", "ENABLED")
             onu_save.assert_not_called()
@@ -119,6 +143,7 @@ class TestModelPolicyNttWorkflowDriverServiceInstance(unittest.TestCase):
             self.si.oper_onu_status = "AWAITING"
             self.policy.handle_update(self.si)
             process_onu_state.assert_called_with(self.si)
+            self.assertEqual(len(self.service_instance_index), 1)
 
             self.si.admin_onu_state = "ENABLED"
             self.si.oper_onu_status = "ENABLED"
@@ -130,6 +155,87 @@ class TestModelPolicyNttWorkflowDriverServiceInstance(unittest.TestCase):
             self.policy.handle_update(self.si)
             process_onu_state.assert_called_with(self.si)
 
+    def test_handle_update_other_replica(self):
+        from ownership import olt_ownership
+
+        with patch.object(self.policy, "process_onu_state") as process_onu_state, \
+                patch.object(self.si, "save_changed_fields") as save_si, \
+                patch.object(olt_ownership, "owns", return_value=False):
+            self.si.of_dpid = "of:109299321"
+            self.policy.handle_update(self.si)
+
+            # the SI is indexed but only processed by the replica that owns its OLT
+            self.assertEqual(len(self.service_instance_index), 1)
+            process_onu_state.assert_not_called()
+            save_si.assert_not_called()
+
+    def test_replicas_sharing_the_data_model(self):
+        from ownership import OltOwnership
+        from xossynchronizer.model_policy_loop import XOSPolicyEngine
+
+        lease_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, lease_dir)
+        replicas = []
+        for name in ["ntt-0", "ntt-1"]:
+            replica = OltOwnership()
+            replica.start(name, Mock(), lease_dir=lease_dir)
+            self.addCleanup(replica.stop)
+            replicas.append(replica)
+        replicas[0].refresh()
+
+        # an OLT of the second replica
+        self.si.of_dpid = [olt for olt in ("of:%016x" % i for i in range(100)) if replicas[1].owns(olt)][0]
+        self.si.updated = 10
+        self.si.changed_by_step = 0
+
+        # the shared data model: the SI is to be policed until its policies ran
+        def fetch_policies(main_objs, deletion=False):
+            if deletion:
+                return []
+            return [si for si in [self.si] if not si.policed or si.policed < si.updated]
+
+        # the policy engine of each replica, with the fetch_policies of the replica
+        engines = []
+        for replica in replicas:
+            engine = XOSPolicyEngine.__new__(XOSPolicyEngine)
+            engine.log = Mock()
+            engine.model_accessor = Mock()
+            engine.model_accessor.fetch_policies = replica.filter_policies(fetch_policies)
+            engine.policies_by_class = {NttWorkflowDriverServiceInstance: [type(self.policy)]}
+            engine.policies_by_name = {"NttWorkflowDriverServiceInstance": [type(self.policy)]}
+            engines.append(engine)
+        policy_module = sys.modules[type(self.policy).__module__]
+
+        with patch.object(type(self.policy), "process_onu_state") as process_onu_state, \
+                patch.object(policy_module.whitelist_index, "refresh"), \
+                patch.object(self.si, "save") as save_si:
+            # the first replica runs its policies first, the SI is left untouched
+            with patch.object(policy_module, "olt_ownership", replicas[0]):
+                engines[0].run_policy_once()
+            process_onu_state.assert_not_called()
+            save_si.assert_not_called()
+            self.assertFalse(self.si.policed)
+
+            # the replica that owns the OLT polices it
+            with patch.object(policy_module, "olt_ownership", replicas[1]):
+                engines[1].run_policy_once()
+            process_onu_state.assert_called_once_with(self.si)
+            self.assertEqual(self.si.policed, 10)
+            self.assertEqual(self.si.policy_code, 1)
+
+            with patch.object(policy_module, "olt_ownership", replicas[0]):
+                engines[0].run_policy_once()
+            process_onu_state.assert_called_once_with(self.si)
+            self.assertEqual(self.si.policy_code, 1)
+
+    def test_handle_delete(self):
+        self.si.mac_address = "0a0a0a"
+        self.service_instance_index.update(self.si)
+
+        self.policy.handle_delete(self.si)
+
+        self.assertEqual(len(self.service_instance_index), 0)
+
 if __name__ == '__main__':
     sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
     unittest.main()
@@ -15,7 +15,7 @@
 
 
 import unittest
-from mock import patch
+from mock import patch, Mock
 
 import os
 import sys
@@ -46,6 +46,14 @@ class TestModelPolicyNttWorkflowDriverWhiteListEntry(unittest.TestCase):
         from model_policy_ntt_workflow_driver_whitelistentry import NttWorkflowDriverWhiteListEntryPolicy, NttHelpers
         self.NttHelpers = NttHelpers
 
+        from service_instance_index import service_instance_index
+        self.service_instance_index = service_instance_index
+        self.service_instance_index.clear()
+
+        from whitelist_index import whitelist_index
+        self.whitelist_index = whitelist_index
+        self.whitelist_index.clear()
+
         from mock_modelaccessor import MockObjectList
         self.MockObjectList = MockObjectList
 
@@ -102,14 +110,171 @@ class TestModelPolicyNttWorkflowDriverWhiteListEntry(unittest.TestCase):
             self.policy.handle_update(wle)
 
             validate_onu_state.assert_called_with(si)
+            self.assertEqual(self.whitelist_index.lookup(self.policy.model_accessor, self.service.id, "0A0A0A"), [wle])
             self.assertTrue(wle.backend_need_delete_policy)
             wle_save.assert_called_with(
                 always_update_timestamp=False, update_fields=[
                     'backend_need_delete_policy', 'mac_address', 'owner'])
 
+    def test_whitelist_update_other_replica(self):
+        from ownership import olt_ownership
+        # the SI of an OLT owned by another replica, indexed by that replica
+        si = NttWorkflowDriverServiceInstance(id=1, of_dpid="of:109299321", mac_address="0A0A0A",
+                                              owner_id=self.service.id)
+        wle = NttWorkflowDriverWhiteListEntry(mac_address="0a0a0a", owner_id=self.service.id, owner=self.service)
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as oss_si_items, \
+                patch.object(NttWorkflowDriverServiceInstance.objects, "filter") as filter_si, \
+                patch.object(olt_ownership, "leases", Mock()), \
+                patch.object(olt_ownership, "owns", return_value=False), \
+                patch.object(self.NttHelpers, "validate_onu") as validate_onu, \
+                patch.object(si, "save") as save_si, \
+                patch.object(wle, "save"):
+            oss_si_items.return_value = [si]
+            filter_si.return_value = [si]
+            self.service_instance_index.loaded = True
+            validate_onu.return_value = [True, "valid onu"]
+
+            self.policy.handle_update(wle)
+
+            # the SI is saved for the policy of the replica that owns its OLT, which validates it
+            filter_si.assert_any_call(mac_address__iexact="0a0a0a")
+            validate_onu.assert_not_called()
+            save_si.assert_called_once_with(update_fields=["updated"], always_update_timestamp=True)
+
+    def test_whitelist_update_only_matching_mac(self):
+        si = NttWorkflowDriverServiceInstance(id=1, mac_address="0A0A0A", owner_id=self.service.id)
+        other_si = NttWorkflowDriverServiceInstance(id=2, mac_address="0b0b0b", owner_id=self.service.id)
+        wle = NttWorkflowDriverWhiteListEntry(mac_address="0a0a0a", owner_id=self.service.id, owner=self.service)
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as oss_si_items, \
+                patch.object(self.policy, "validate_onu_state") as validate_onu_state, \
+                patch.object(wle, "save") as wle_save:
+            oss_si_items.return_value = [si, other_si]
+
+            self.policy.handle_update(wle)
+
+            validate_onu_state.assert_called_once_with(si)
+
+    def test_whitelist_range_change(self):
+        si_inside = NttWorkflowDriverServiceInstance(id=1, serial_number="BRCM1", mac_address="0a0a0a",
+                                                     owner_id=self.service.id)
+        si_outside = NttWorkflowDriverServiceInstance(id=2, serial_number="BRCM2", mac_address="0a0a0a",
+                                                      owner_id=self.service.id)
+        wle = NttWorkflowDriverWhiteListEntry(id=1, mac_address="0a0a0a", pon_port_from=1, pon_port_to=10,
+                                              owner_id=self.service.id, owner=self.service)
+        self.whitelist_index.update(wle)
+        self.whitelist_index.loaded_owners.add(self.service.id)
+
+        onus = {"BRCM1": Mock(pon_port=Mock(port_no=5)), "BRCM2": Mock(pon_port=Mock(port_no=12))}
+
+        updated_wle = NttWorkflowDriverWhiteListEntry(id=1, mac_address="0a0a0a", pon_port_from=3, pon_port_to=12,
+                                                      owner_id=self.service.id, owner=self.service)
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as oss_si_items, \
+                patch.object(self.NttHelpers, "get_onu") as get_onu, \
+                patch.object(self.policy, "validate_onu_state") as validate_onu_state, \
+                patch.object(updated_wle, "save"):
+            oss_si_items.return_value = [si_inside, si_outside]
+            get_onu.side_effect = lambda model_accessor, serial_number: onus[serial_number]
+
+            self.policy.handle_update(updated_wle)
+
+            # port 5 is admitted by both ranges, only the SI on port 12 changes
+            validate_onu_state.assert_called_once_with(si_outside)
+            self.assertEqual(self.whitelist_index.get_port_ranges(
+                self.policy.model_accessor, self.service.id, "0a0a0a").intervals(), [(3, 12)])
+
+    def test_whitelist_unchanged_range(self):
+        si = NttWorkflowDriverServiceInstance(id=1, serial_number="BRCM1", mac_address="0a0a0a",
+                                              owner_id=self.service.id)
+        wle = NttWorkflowDriverWhiteListEntry(id=1, mac_address="0a0a0a", pon_port_from=1, pon_port_to=10,
+                                              owner_id=self.service.id, owner=self.service)
+        self.whitelist_index.update(wle)
+        self.whitelist_index.loaded_owners.add(self.service.id)
+
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as oss_si_items, \
+                patch.object(self.NttHelpers, "get_onu") as get_onu, \
+                patch.object(self.policy, "validate_onu_state") as validate_onu_state, \
+                patch.object(wle, "save"):
+            oss_si_items.return_value = [si]
+
+            self.policy.handle_update(wle)
+
+            # the index may have been loaded with the updated entry, the SIs of the MAC are validated again
+            validate_onu_state.assert_called_once_with(si)
+            get_onu.assert_not_called()
+
+    def test_whitelist_index_loaded_after_update(self):
+        si_inside = NttWorkflowDriverServiceInstance(id=1, serial_number="BRCM1", mac_address="0a0a0a",
+                                                     owner_id=self.service.id)
+        si_outside = NttWorkflowDriverServiceInstance(id=2, serial_number="BRCM2", mac_address="0a0a0a",
+                                                      owner_id=self.service.id)
+        # the range changed from 1-10 to 3-12 before the entries were loaded in the index
+        updated_wle = NttWorkflowDriverWhiteListEntry(id=1, mac_address="0a0a0a", pon_port_from=3, pon_port_to=12,
+                                                      owner_id=self.service.id, owner=self.service)
+        with patch.object(NttWorkflowDriverWhiteListEntry.objects, "get_items") as wle_items, \
+                patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as oss_si_items, \
+                patch.object(self.policy, "validate_onu_state") as validate_onu_state, \
+                patch.object(updated_wle, "save"):
+            wle_items.return_value = [updated_wle]
+            oss_si_items.return_value = [si_inside, si_outside]
+            self.whitelist_index.load_owner(self.policy.model_accessor, self.service.id)
+
+            self.policy.handle_update(updated_wle)
+
+            self.assertEqual(sorted([c[0][0].id for c in validate_onu_state.call_args_list]), [1, 2])
+
+    def test_whitelist_range_covered_by_other_entry(self):
+        si = NttWorkflowDriverServiceInstance(id=1, serial_number="BRCM1", mac_address="0a0a0a",
+                                              owner_id=self.service.id)
+        wle = NttWorkflowDriverWhiteListEntry(id=1, mac_address="0a0a0a", pon_port_from=1, pon_port_to=10,
+                                              owner_id=self.service.id, owner=self.service)
+        other_wle = NttWorkflowDriverWhiteListEntry(id=2, mac_address="0a0a0a", pon_port_from=1, pon_port_to=20,
+                                                    owner_id=self.service.id, owner=self.service)
+        self.whitelist_index.update(wle)
+        self.whitelist_index.update(other_wle)
+        self.whitelist_index.loaded_owners.add(self.service.id)
+
+        updated_wle = NttWorkflowDriverWhiteListEntry(id=1, mac_address="0a0a0a", pon_port_from=5, pon_port_to=15,
+                                                      owner_id=self.service.id, owner=self.service)
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as oss_si_items, \
+                patch.object(self.NttHelpers, "get_onu") as get_onu, \
+                patch.object(self.policy, "validate_onu_state") as validate_onu_state, \
+                patch.object(updated_wle, "save"):
+            oss_si_items.return_value = [si]
+
+            self.policy.handle_update(updated_wle)
+
+            # the other entry still admits ports 1-20
+            validate_onu_state.assert_not_called()
+            get_onu.assert_not_called()
+
+    def test_whitelist_mac_change(self):
+        old_si = NttWorkflowDriverServiceInstance(id=1, serial_number="BRCM1", mac_address="0a0a0a",
+                                                  owner_id=self.service.id)
+        new_si = NttWorkflowDriverServiceInstance(id=2, serial_number="BRCM2", mac_address="0b0b0b",
+                                                  owner_id=self.service.id)
+        wle = NttWorkflowDriverWhiteListEntry(id=1, mac_address="0a0a0a", pon_port_from=1, pon_port_to=10,
+                                              owner_id=self.service.id, owner=self.service)
+        self.whitelist_index.update(wle)
+        self.whitelist_index.loaded_owners.add(self.service.id)
+
+        updated_wle = NttWorkflowDriverWhiteListEntry(id=1, mac_address="0b0b0b", pon_port_from=1, pon_port_to=10,
+                                                      owner_id=self.service.id, owner=self.service)
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as oss_si_items, \
+                patch.object(self.NttHelpers, "get_onu") as get_onu, \
+                patch.object(self.policy, "validate_onu_state") as validate_onu_state, \
+                patch.object(updated_wle, "save"):
+            oss_si_items.return_value = [old_si, new_si]
+            get_onu.return_value = Mock(pon_port=Mock(port_no=5))
+
+            self.policy.handle_update(updated_wle)
+
+            # the ONU of the old MAC isn't admitted anymore, the one of the new MAC is
+            self.assertEqual(sorted([c[0][0].id for c in validate_onu_state.call_args_list]), [1, 2])
+
     def test_whitelist_delete(self):
         si = NttWorkflowDriverServiceInstance(mac_address="0a0a0a", owner_id=self.service.id)
         wle = NttWorkflowDriverWhiteListEntry(mac_address="0a0a0a", owner_id=self.service.id, owner=self.service)
+        self.whitelist_index.update(wle)
         with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as oss_si_items, \
                 patch.object(self.policy, "validate_onu_state") as validate_onu_state, \
                 patch.object(wle, "save") as wle_save:
@@ -118,6 +283,7 @@ class TestModelPolicyNttWorkflowDriverWhiteListEntry(unittest.TestCase):
             self.policy.handle_delete(wle)
 
             validate_onu_state.assert_called_with(si)
+            self.assertEqual(len(self.whitelist_index), 0)
             self.assertTrue(wle.backend_need_reap)
             wle_save.assert_called_with(
                 always_update_timestamp=False, update_fields=[
@@ -17,16 +17,111 @@
 # This imports and runs ../../xos-observer.py
 
 import os
+import socket
+import confluent_kafka
 from xossynchronizer import Synchronizer
+from xossynchronizer.event_engine import XOSEventEngine, XOSKafkaThread
 from xosconfig import Config
+from metrics import start_metrics_server
+from ownership import olt_ownership, OltOwnership
+from olt_information_cache import olt_information_cache
+from onos_dispatcher import OnosDispatcher
+from event_shards import ShardedExecutor
 
 
 base_config_file = os.path.abspath(os.path.dirname(os.path.realpath(__file__)) + '/config.yaml')
 mounted_config_file = os.path.abspath(os.path.dirname(os.path.realpath(__file__)) + '/mounted_config.yaml')
+# the schema of xosconfig with the settings of the driver
+config_schema = os.path.abspath(os.path.dirname(os.path.realpath(__file__)) + '/ntt-workflow-driver-config-schema.yaml')
 
 if os.path.isfile(mounted_config_file):
-    Config.init(base_config_file, 'synchronizer-config-schema.yaml', mounted_config_file)
+    Config.init(base_config_file, config_schema, mounted_config_file)
 else:
-    Config.init(base_config_file, 'synchronizer-config-schema.yaml')
+    Config.init(base_config_file, config_schema)
 
-Synchronizer().run()
+# the ONOS calls are sent by NttHelpers.onos_dispatcher, its workers are only started by the first call
+if Config.get("ntt_workflow_driver.onos_max_workers"):
+    OnosDispatcher.max_workers = Config.get("ntt_workflow_driver.onos_max_workers")
+
+# the events of different OLTs are processed in parallel by the shards
+if Config.get("ntt_workflow_driver.shards") is not None:
+    ShardedExecutor.shards = Config.get("ntt_workflow_driver.shards")
+
+# several replicas share the OLTs if they share a lease directory
+if Config.get("ntt_workflow_driver.lease_dir"):
+    OltOwnership.lease_dir = Config.get("ntt_workflow_driver.lease_dir")
+if Config.get("ntt_workflow_driver.lease_renew_interval"):
+    OltOwnership.renew_interval = Config.get("ntt_workflow_driver.lease_renew_interval")
+if Config.get("ntt_workflow_driver.lease_ttl"):
+    OltOwnership.lease_ttl = Config.get("ntt_workflow_driver.lease_ttl")
+
+
+def driver_setting(key):
+    # Config.get returns None for the false values, the switches are read from the section of the driver
+    return (Config.get("ntt_workflow_driver") or {}).get(key)
+
+
+def configure_event_steps(load_event_step_modules):
+    # the event engine loads the event steps from their files, which defines their classes again:
+    # they are configured once loaded
+    def load(engine, event_step_dir):
+        load_event_step_modules(engine, event_step_dir)
+        for step in engine.event_steps:
+            if step.__name__ == "ONUEventStep" and Config.get("ntt_workflow_driver.batch_size") is not None:
+                step.batch_size = Config.get("ntt_workflow_driver.batch_size")
+    return load
+
+
+XOSEventEngine.load_event_step_modules = configure_event_steps(XOSEventEngine.load_event_step_modules)
+
+
+def replica_id():
+    # the replicas share the name of the synchronizer, eg: the pods of a deployment
+    return Config.get("ntt_workflow_driver.replica_id") or os.environ.get("POD_NAME") or socket.gethostname()
+
+
+def create_kafka_consumer(thread):
+    # every replica consumes all the events, in its own consumer group
+    consumer_config = {
+        "group.id": olt_ownership.consumer_group(Config.get("name")),
+        "bootstrap.servers": ",".join(thread.bootstrap_servers),
+        "default.topic.config": {"auto.offset.reset": "smallest"},
+    }
+
+    return confluent_kafka.Consumer(**consumer_config)
+
+
+class NttWorkflowDriverSynchronizer(Synchronizer):
+    def wait_for_ready(self):
+        super(NttWorkflowDriverSynchronizer, self).wait_for_ready()
+
+        # with several replicas, each one only processes the events and the policies of its OLTs
+        if olt_ownership.lease_dir:
+            # the information of the OLTs taken over from another replica may be stale
+            olt_ownership.on_rebalance(olt_information_cache.clear)
+            olt_ownership.start(replica_id(), self.log)
+            # the models of the OLTs of the other replicas are left to them by the policy engine
+            self.model_accessor.fetch_policies = olt_ownership.filter_policies(self.model_accessor.fetch_policies)
+            XOSKafkaThread.create_kafka_consumer = create_kafka_consumer
+
+        # the helpers are shared by the event steps and the model policies
+        from helpers import NttHelpers
+        if driver_setting("elide_writes") is not None:
+            NttHelpers.elide_writes = driver_setting("elide_writes")
+        if driver_setting("memoize_admission") is not None:
+            NttHelpers.memoize_admission = driver_setting("memoize_admission")
+
+        # the caches are filled before the events are consumed
+        from warm_start import warm_start, WarmStart
+        if driver_setting("warm_start") is not None:
+            WarmStart.enabled = driver_setting("warm_start")
+        warm_start(self.model_accessor, self.log)
+
+        # the reconciler uses the data model, it can only be started once the model accessor is ready
+        from reconciler import start_reconciler
+        start_reconciler(self.model_accessor, self.log)
+
+
+start_metrics_server(Config.get("ntt_workflow_driver.metrics_port"))
+
+NttWorkflowDriverSynchronizer().run()
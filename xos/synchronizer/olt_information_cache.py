@@ -0,0 +1,103 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from technology_profile import technology_profile_cache
+from metrics import registry
+
+
+class OltInformationCache(object):
+    """
+    Caches the NttWorkflowDriverOltInformation of each OLT, keyed by of_dpid, once its PON port
+    and technology package have been resolved, so that the ONU events of a known OLT don't
+    query the OLT information, the ONUDevice or the TechnologyProfile.
+
+    The entries are refreshed by the NttWorkflowDriverOltInformation model policy when the model
+    changes, and they are resolved again when the TechnologyProfile changes.
+    """
+
+    def __init__(self, technology_profile=technology_profile_cache):
+        self.technology_profile = technology_profile
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            # of_dpid -> (NttWorkflowDriverOltInformation, technology profile generation)
+            self.entries = {}
+            self.hits = 0
+            self.misses = 0
+
+    def get(self, model_accessor, of_dpid):
+        """
+        :return: the cached NttWorkflowDriverOltInformation, or None if it has to be resolved again
+        """
+        with self.lock:
+            cached = of_dpid in self.entries
+        generation = None
+        if cached:
+            # detects the changes of the TechnologyProfile (without querying it more than every check_interval)
+            generation = self.technology_profile.resolve(model_accessor)[1]
+        with self.lock:
+            entry = self.entries.get(of_dpid)
+            if entry is None or entry[1] != generation:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, oi, generation):
+        """
+        Cache an NttWorkflowDriverOltInformation whose PON port and package have been resolved
+
+        :param generation: the generation of the TechnologyProfile the package has been resolved from
+        """
+        with self.lock:
+            self.entries[oi.of_dpid] = (oi, generation)
+
+    def update(self, oi):
+        """
+        Replace the cached model of an OLT with a newer version, its package is resolved again if it
+        wasn't resolved with the current TechnologyProfile
+        """
+        with self.lock:
+            for (of_dpid, entry) in list(self.entries.items()):
+                if entry[0].id == oi.id and of_dpid != oi.of_dpid:
+                    # the of_dpid has been changed
+                    del self.entries[of_dpid]
+            entry = self.entries.get(oi.of_dpid)
+            if entry is not None:
+                self.entries[oi.of_dpid] = (oi, entry[1])
+
+    def remove(self, oi):
+        with self.lock:
+            entry = self.entries.get(oi.of_dpid)
+            if entry is not None and entry[0].id == oi.id:
+                del self.entries[oi.of_dpid]
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+
+olt_information_cache = OltInformationCache()
+registry.register_stats("ntt_olt_information_cache", "Cached OLT information", olt_information_cache.get_stats)
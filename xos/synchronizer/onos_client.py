@@ -0,0 +1,196 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from metrics import registry, onos_latency, onos_responses_total
+
+
+class OnosCallStats(object):
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.status_codes = {}
+
+    def record(self, elapsed, status_code=None):
+        self.count += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        if status_code is None:
+            self.failures += 1
+        else:
+            self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "total_time": self.total_time,
+            "max_time": self.max_time,
+            "avg_time": self.total_time / self.count if self.count else 0.0,
+            "status_codes": dict(self.status_codes),
+        }
+
+
+class OnosClient(object):
+    """
+    REST client for the ONOS olt-app.
+
+    All the calls share a keep-alive session, so subsequent subscriber additions and
+    removals reuse the same TCP connections, and are bounded by connect and read timeouts.
+    The calls go through a circuit breaker: when ONOS is down or failing (connection errors,
+    timeouts and 5xx responses) they are rejected with a CircuitOpenError instead of waiting
+    for the timeouts.
+    """
+
+    connect_timeout = 5
+    read_timeout = 30
+    pool_size = 10
+
+    def __init__(self, url, port, username, password, connect_timeout=None, read_timeout=None, pool_size=None):
+        if not url.startswith("http"):
+            url = "http://" + url
+        self.base_url = "%s:%s" % (url.rstrip("/"), port)
+
+        if connect_timeout is not None:
+            self.connect_timeout = connect_timeout
+        if read_timeout is not None:
+            self.read_timeout = read_timeout
+        if pool_size is not None:
+            self.pool_size = pool_size
+
+        self.session = requests.Session()
+        self.session.auth = HTTPBasicAuth(username, password)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+        self.breaker = CircuitBreaker()
+
+    def _record(self, operation, elapsed, status_code=None):
+        with self.stats_lock:
+            if operation not in self.stats:
+                self.stats[operation] = OnosCallStats()
+            self.stats[operation].record(elapsed, status_code)
+        onos_latency.observe(elapsed, operation=operation)
+        # connection errors and timeouts have no status code
+        onos_responses_total.inc(operation=operation, code=status_code if status_code is not None else "error")
+
+    def get_stats(self):
+        with self.stats_lock:
+            return dict((operation, stats.to_dict()) for (operation, stats) in self.stats.items())
+
+    def request(self, operation, method, path, **kwargs):
+        """
+        Execute a request against ONOS and record its latency under `operation`.
+        Connection errors and timeouts are counted as failures and re-raised.
+
+        :raises CircuitOpenError: if ONOS is failing, the request isn't sent
+        """
+        if not self.breaker.allow():
+            retry_in = self.breaker.retry_in()
+            raise CircuitOpenError("ONOS is unavailable, retrying in %.1f seconds" % retry_in, retry_in)
+
+        url = "%s%s" % (self.base_url, path)
+        start = time.time()
+        response = None
+        try:
+            response = self.session.request(method, url, timeout=(self.connect_timeout, self.read_timeout), **kwargs)
+        except requests.exceptions.RequestException:
+            self._record(operation, time.time() - start)
+            self.breaker.record_failure()
+            raise
+        finally:
+            if response is None:
+                # the probe of a half-open breaker must not stay in flight forever
+                self.breaker.release()
+        self._record(operation, time.time() - start, response.status_code)
+        # a 4xx is an answer of ONOS about the request itself
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    @staticmethod
+    def subscriber_path(of_dpid, uni_port_id):
+        return "/onos/olt/oltapp/%s/%s" % (of_dpid, uni_port_id)
+
+    def add_subscriber(self, of_dpid, uni_port_id):
+        response = self.request("add_subscriber", "POST", self.subscriber_path(of_dpid, uni_port_id))
+        if response.status_code != 200:
+            raise Exception("Failed to add subscriber in onos-voltha: %s" % response.text)
+        return response
+
+    def get_subscribers(self, of_dpid):
+        """
+        :return: the set of UNI ports programmed in the olt-app for an OLT
+        """
+        response = self.request("get_subscribers", "GET", "/onos/olt/oltapp/programmed-subscribers",
+                                params={"deviceId": of_dpid})
+        if response.status_code != 200:
+            raise Exception("Failed to get the subscribers from onos-voltha: %s" % response.text)
+        ports = set()
+        for entry in response.json().get("entries", []):
+            # the location is the connect point of the subscriber: "<of_dpid>/<uni_port_id>"
+            (device_id, port) = entry["location"].rsplit("/", 1)
+            if device_id == of_dpid:
+                ports.add(long(port))
+        return ports
+
+    def remove_subscriber(self, of_dpid, uni_port_id):
+        response = self.request("remove_subscriber", "DELETE", self.subscriber_path(of_dpid, uni_port_id))
+        if response.status_code != 204:
+            raise Exception("Failed to remove subscriber from onos-voltha: %s" % response.text)
+        return response
+
+
+clients = {}
+clients_lock = threading.Lock()
+
+
+def get_onos_client(service):
+    """
+    Return the shared OnosClient for the ONOS instance configured in the NttWorkflowDriverService,
+    a new client (and connection pool) is only created when the endpoint or the credentials change.
+    """
+    key = (service.onos_voltha_url, service.onos_voltha_port, service.onos_voltha_user, service.onos_voltha_pass)
+    with clients_lock:
+        client = clients.get(key)
+        if client is None:
+            client = OnosClient(*key)
+            clients[key] = client
+        return client
+
+
+def get_breaker_stats():
+    """ The circuit breakers of all the ONOS clients """
+    with clients_lock:
+        breakers = [client.breaker.get_stats() for client in clients.values()]
+    return {
+        "open": sum(b["open"] for b in breakers),
+        "opened": sum(b["opened"] for b in breakers),
+        "rejected": sum(b["rejected"] for b in breakers),
+    }
+
+
+registry.register_stats("ntt_onos_breaker", "Circuit breakers of the ONOS clients", get_breaker_stats)
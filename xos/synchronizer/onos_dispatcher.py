@@ -0,0 +1,197 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from collections import deque
+from Queue import Queue
+from circuit_breaker import CircuitOpenError
+
+
+class OnosOperation(object):
+    def __init__(self, key, call, callback, log):
+        self.key = key
+        self.call = call
+        self.callback = callback
+        self.log = log
+        # sent alone to check if ONOS is available again
+        self.probe = False
+
+
+class OnosDispatcher(object):
+    """
+    Runs the ONOS olt-app calls on a pool of `max_workers` threads, so that the calls for
+    different subscribers are sent in parallel.
+
+    Calls are keyed by subscriber (eg: "<of_dpid>/<uni_port_id>"): at most one call per key is
+    in flight and the calls for a key run in the order they were submitted.
+
+    A call rejected by the circuit breaker of the ONOS client (CircuitOpenError) is held instead of
+    failing. When the breaker lets a call through again, the oldest held call is sent alone to probe
+    ONOS, the other ones are sent once a call succeeds: during an ONOS outage the operations are
+    queued without keeping the workers busy.
+    """
+
+    # how often the held calls are tried again while the breaker is probing ONOS
+    hold_poll = 0.5
+    # the workers are started on the first call, the limit can be changed until then
+    # (ntt_workflow_driver.onos_max_workers in the configuration)
+    max_workers = 8
+
+    def __init__(self, max_workers=None):
+        if max_workers is not None:
+            self.max_workers = max_workers
+
+        self.queue = Queue()
+        self.workers = []
+        self.condition = threading.Condition()
+        # key -> deque of the operations waiting for the one in flight
+        self.waiting = {}
+        # the calls rejected by a circuit breaker, they keep their key busy
+        self.held = []
+        self.release_timer = None
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, key, call, log, callback=None):
+        """
+        Run `call()` in background, then `callback(result, error)` with its result or the exception it raised
+        """
+        operation = OnosOperation(key, call, callback, log)
+        with self.condition:
+            self.pending += 1
+            if key in self.waiting:
+                self.waiting[key].append(operation)
+            else:
+                self.waiting[key] = deque()
+                self.queue.put(operation)
+            self._ensure_workers()
+
+    def _execute(self, operation):
+        result = None
+        error = None
+        try:
+            result = operation.call()
+        except CircuitOpenError as e:
+            self._hold(operation, e.retry_in)
+            return
+        except Exception as e:
+            error = e
+            operation.log.exception("ONOS call failed", key=operation.key, e=e)
+            with self.condition:
+                if self.held:
+                    # the probe may have failed, the held calls are tried again once the breaker allows it
+                    self._arm_release(self.hold_poll)
+
+        if operation.callback:
+            try:
+                operation.callback(result, error)
+            except Exception as e:
+                operation.log.exception("Failed to report the result of an ONOS call", key=operation.key, e=e)
+
+        with self.condition:
+            waiting = self.waiting[operation.key]
+            if waiting:
+                self.queue.put(waiting.popleft())
+            else:
+                del self.waiting[operation.key]
+
+            self.pending -= 1
+            if error is None:
+                self.completed += 1
+                # ONOS is back
+                self._release()
+            else:
+                self.failed += 1
+            self.condition.notify_all()
+
+    def _hold(self, operation, retry_in):
+        with self.condition:
+            if operation.probe:
+                # still rejected, the probe keeps its place
+                operation.probe = False
+                self.held.insert(0, operation)
+            else:
+                self.held.append(operation)
+            self._arm_release(retry_in)
+
+    def _arm_release(self, retry_in):
+        # must be called with the condition held
+        if self.release_timer is None:
+            self.release_timer = threading.Timer(max(retry_in, self.hold_poll), self._release_probe)
+            self.release_timer.daemon = True
+            self.release_timer.start()
+
+    def _release_probe(self):
+        with self.condition:
+            self.release_timer = None
+            if self.held:
+                operation = self.held.pop(0)
+                operation.probe = True
+                self.queue.put(operation)
+
+    def _release(self):
+        # must be called with the condition held
+        for operation in self.held:
+            self.queue.put(operation)
+        self.held = []
+
+    def is_active(self, key):
+        """
+        :return: True if a call for the key is in flight or waiting
+        """
+        with self.condition:
+            return key in self.waiting
+
+    def join(self, timeout=None):
+        """
+        Wait until all the submitted calls have been executed
+
+        :return: False if the timeout expired first
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self.condition:
+            while self.pending:
+                if deadline is None:
+                    self.condition.wait()
+                    continue
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+            return True
+
+    def get_stats(self):
+        with self.condition:
+            return {
+                "pending": self.pending,
+                "active_subscribers": len(self.waiting),
+                "held": len(self.held),
+                "completed": self.completed,
+                "failed": self.failed,
+                "workers": len(self.workers),
+            }
+
+    def _ensure_workers(self):
+        self.workers = [w for w in self.workers if w.is_alive()]
+        while len(self.workers) < self.max_workers:
+            worker = threading.Thread(target=self._run, name="OnosDispatcher-%s" % len(self.workers))
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+
+    def _run(self):
+        while True:
+            self._execute(self.queue.get())
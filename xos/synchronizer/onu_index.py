@@ -0,0 +1,78 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+
+def normalize_serial(serial_number):
+    """
+    Return the lowercase base serial number of an ONU,
+    Voltha 2.x appends the UNI port to the serial number ("BRCM1234-1")
+    """
+    return serial_number.split("-")[0].lower()
+
+
+class OnuIndex(object):
+    """
+    Maps normalized serial numbers to ONUDevice ids.
+
+    ONUDevices are owned by the vOLT service, so the index can't be kept current by a model policy:
+    it only remembers where an ONU was found and every hit is verified by a lookup on the id.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.ids = {}
+
+    def update(self, onu):
+        with self.lock:
+            self.ids[normalize_serial(onu.serial_number)] = onu.id
+
+    def remove(self, serial_number):
+        with self.lock:
+            self.ids.pop(normalize_serial(serial_number), None)
+
+    def get_onu(self, model_accessor, serial_number):
+        """
+        Return the ONUDevice with the given serial number (case insensitive, without the UNI suffix).
+
+        :raises IndexError: if the ONUDevice doesn't exist
+        """
+        serial = normalize_serial(serial_number)
+        with self.lock:
+            onu_id = self.ids.get(serial)
+
+        if onu_id is not None:
+            # filtered rather than got by id: the API raises a NOT_FOUND error for a deleted ONU
+            onus = model_accessor.ONUDevice.objects.filter(id=onu_id)
+            if onus and normalize_serial(onus[0].serial_number) == serial:
+                return onus[0]
+            self.remove(serial)
+
+        base_serial = serial_number.split("-")[0]
+        onus = model_accessor.ONUDevice.objects.filter(serial_number=base_serial)
+        if not onus:
+            onus = model_accessor.ONUDevice.objects.filter(serial_number__iexact=base_serial)
+        if not onus:
+            raise IndexError("No ONUDevice with serial number %s" % base_serial)
+
+        self.update(onus[0])
+        return onus[0]
+
+
+onu_index = OnuIndex()
@@ -0,0 +1,242 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Partitions the OLTs between the replicas of the synchronizer.
+
+Each replica renews a lease, a file named after the replica in a directory shared by all the replicas.
+The replicas whose lease is current own the OLTs: an of_dpid is owned by the replica with the highest
+rendezvous hash of (replica, of_dpid), so every replica computes the same owner without coordination and
+only the OLTs of a replica that joins or leaves change owner.
+
+The replicas share the `name` of the configuration (the models of the service are registered under it)
+and are told apart by their replica id. Each replica consumes the events in its own Kafka consumer group
+(see consumer_group), so it receives all the events and only processes those of its OLTs.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from metrics import registry
+
+
+def rendezvous_owner(replicas, key):
+    """ The replica with the highest hash of (replica, key) """
+    return max(replicas, key=lambda replica: hashlib.md5(("%s/%s" % (replica, key)).encode("utf-8")).digest())
+
+
+class LeaseDirectory(object):
+    """
+    The leases of the replicas, one JSON file per replica holding the time it was last renewed
+    """
+
+    suffix = ".lease"
+
+    def __init__(self, path, ttl=30, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+
+    def lease_path(self, replica):
+        return os.path.join(self.path, replica + self.suffix)
+
+    def renew(self, replica):
+        # written to a temporary file and renamed, the other replicas never read a partial lease
+        path = self.lease_path(replica)
+        tmp_path = "%s.%s.tmp" % (path, os.getpid())
+        with open(tmp_path, "w") as f:
+            json.dump({"replica": replica, "renewed": self.clock()}, f)
+        os.rename(tmp_path, path)
+
+    def release(self, replica):
+        try:
+            os.remove(self.lease_path(replica))
+        except OSError:
+            pass
+
+    def replicas(self):
+        """
+        :return: the sorted names of the replicas whose lease hasn't expired
+        """
+        now = self.clock()
+        replicas = []
+        for name in os.listdir(self.path):
+            if not name.endswith(self.suffix):
+                continue
+            try:
+                with open(os.path.join(self.path, name)) as f:
+                    lease = json.load(f)
+            except (IOError, ValueError):
+                # released or being replaced
+                continue
+            if now - lease["renewed"] <= self.ttl:
+                replicas.append(lease["replica"])
+        return sorted(replicas)
+
+
+class OltOwnership(object):
+    """
+    Tells whether this replica owns an OLT. Every OLT is owned until start() is called: the OLTs are
+    partitioned only if `lease_dir` is set (a directory shared by the replicas, eg: a volume).
+
+    The lease is renewed every `renew_interval` seconds, the OLTs are rebalanced when the set of replicas
+    with a current lease changes, and the `on_rebalance` listeners are called.
+    """
+
+    lease_dir = None
+    renew_interval = 10
+    lease_ttl = 30
+
+    # the models whose policies only run in the replica that owns their OLT (`of_dpid`)
+    owned_models = ["NttWorkflowDriverServiceInstance", "NttWorkflowDriverOltInformation"]
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.leases = None
+        self.replica = None
+        self.replicas = []
+        self.owners = {}
+        self.listeners = []
+        self.stopped = threading.Event()
+        self.worker = None
+        self.log = None
+        self.rebalances = 0
+        self.skipped = 0
+
+    @property
+    def enabled(self):
+        return self.leases is not None
+
+    def owns(self, of_dpid):
+        if self.leases is None:
+            return True
+        with self.lock:
+            owner = self.owners.get(of_dpid)
+            if owner is None:
+                owner = self.owners[of_dpid] = rendezvous_owner(self.replicas, of_dpid)
+            return owner == self.replica
+
+    def skip(self, of_dpid):
+        """
+        :return: True (and count it) if the OLT belongs to another replica
+        """
+        if self.owns(of_dpid):
+            return False
+        with self.lock:
+            self.skipped += 1
+        return True
+
+    def consumer_group(self, name):
+        """
+        :return: the Kafka consumer group of the replica, each replica receives all the events
+        """
+        if self.leases is None:
+            return name
+        return "%s-%s" % (name, self.replica)
+
+    def filter_policies(self, fetch_policies):
+        """
+        Wrap the `fetch_policies` of the model accessor so that the policy engine only fetches the owned models
+        of the OLTs of this replica: the other replicas leave them untouched (the engine marks any model it runs
+        the policies of as policed) until the replica that owns the OLT polices them.
+        """
+        def fetch(main_objs, deletion=False):
+            objs = fetch_policies(main_objs, deletion)
+            if self.leases is None:
+                return objs
+            return [o for o in objs
+                    if getattr(o, "model_name", o.__class__.__name__) not in self.owned_models or self.owns(o.of_dpid)]
+        return fetch
+
+    def on_rebalance(self, listener):
+        self.listeners.append(listener)
+
+    def refresh(self):
+        """
+        Renew the lease of the replica and rebalance the OLTs if other replicas joined or left
+
+        :return: True if the OLTs have been rebalanced
+        """
+        self.leases.renew(self.replica)
+        replicas = self.leases.replicas()
+        if self.replica not in replicas:
+            # our own lease is always current
+            replicas = sorted(replicas + [self.replica])
+
+        with self.lock:
+            if replicas == self.replicas:
+                return False
+            previous = self.replicas
+            self.replicas = replicas
+            self.owners = {}
+            self.rebalances += 1
+
+        self.log.info("Rebalanced the OLTs between the replicas", replica=self.replica, replicas=replicas,
+                      previous=previous)
+        for listener in self.listeners:
+            try:
+                listener()
+            except Exception as e:
+                self.log.exception("Failed to notify the rebalancing of the OLTs", e=e)
+        return True
+
+    def start(self, replica, log, lease_dir=None):
+        """
+        Join the replicas, the ownership is known when this returns
+        """
+        if lease_dir is None:
+            lease_dir = self.lease_dir
+        if not os.path.isdir(lease_dir):
+            os.makedirs(lease_dir)
+        self.leases = LeaseDirectory(lease_dir, ttl=self.lease_ttl)
+        self.replica = replica
+        self.log = log
+        self.refresh()
+
+        self.stopped.clear()
+        self.worker = threading.Thread(target=self._run, name="OltOwnership")
+        self.worker.daemon = True
+        self.worker.start()
+
+    def stop(self):
+        """
+        Leave the replicas, the others take over the OLTs of this replica at their next renewal
+        """
+        self.stopped.set()
+        if self.worker is not None:
+            self.worker.join()
+        if self.leases is not None:
+            self.leases.release(self.replica)
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "replicas": len(self.replicas),
+                "rebalances": self.rebalances,
+                "skipped_events": self.skipped,
+            }
+
+    def _run(self):
+        while not self.stopped.wait(self.renew_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # keep the worker alive, the lease expires only after lease_ttl
+                self.log.exception("Failed to renew the lease of the replica", e=e)
+
+
+olt_ownership = OltOwnership()
+registry.register_stats("ntt_olt_ownership", "Partitioning of the OLTs between the replicas", olt_ownership.get_stats)
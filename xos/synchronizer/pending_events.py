@@ -0,0 +1,221 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from contextlib import contextmanager
+from xossynchronizer.steps.syncstep import DeferredException
+from onu_index import onu_index, normalize_serial
+from event_shards import shard_key
+from metrics import registry
+
+
+class PendingEvent(object):
+    def __init__(self, serial_number, handler, value, log, parked_at):
+        self.serial_number = serial_number
+        self.handler = handler
+        self.value = value
+        self.log = log
+        self.parked_at = parked_at
+
+
+class PendingEventStore(object):
+    """
+    Parks the events received for an ONU that is not known to XOS yet, keyed by serial number.
+
+    A worker thread checks every `recheck_interval` seconds whether the ONUDevices of the parked
+    events have been created, and replays their events in the order they were received.
+    Events still waiting after `ttl` seconds are dropped.
+
+    The handlers share the cached models of an OLT: the events with the same key (see shard_key) are
+    handled one at a time, whether they are replayed by the worker or processed by the event steps.
+    """
+
+    ttl = 600
+    recheck_interval = 2
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.worker = None
+        self.model_accessor = None
+        self.log = None
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            # serial -> [PendingEvent], a serial stays in the dict while its events are replayed
+            self.events = {}
+            # event key -> RLock held while the events with that key are handled
+            self.event_locks = {}
+            self.parked_total = 0
+            self.replayed_total = 0
+            self.expired_total = 0
+
+    def _park(self, serial_number, handler, value, log):
+        event = PendingEvent(serial_number, handler, value, log, self.clock())
+        self.events.setdefault(normalize_serial(serial_number), []).append(event)
+        self.parked_total += 1
+
+    def process(self, model_accessor, log, serial_number, handler, value):
+        """
+        Call `handler(value)`, the event is parked instead if the ONU is not known yet
+        (the handler raised a DeferredException) or if older events for the same ONU are still parked.
+
+        :return: True if the event has been processed, False if it has been parked
+        """
+        serial = normalize_serial(serial_number)
+        with self.lock:
+            if serial in self.events:
+                # keep the order of the events already waiting for this ONU
+                self._park(serial_number, handler, value, log)
+                return False
+
+        try:
+            with self.event_lock(value):
+                handler(value)
+            return True
+        except DeferredException as e:
+            log.info("Parking event until the ONU is known to XOS", serial_number=serial_number, reason=str(e))
+            with self.lock:
+                self.model_accessor = model_accessor
+                self.log = log
+                self._park(serial_number, handler, value, log)
+                self._ensure_worker()
+            return False
+
+    def replay(self, serial_number):
+        """
+        Replay the events parked for an ONU, in order. If the ONU turns out to be still unknown
+        the remaining events stay parked.
+
+        :return: the number of replayed events
+        """
+        serial = normalize_serial(serial_number)
+        replayed = 0
+        while True:
+            with self.lock:
+                events = self.events.get(serial)
+                if not events:
+                    self.events.pop(serial, None)
+                    return replayed
+                event = events[0]
+
+            try:
+                with self.event_lock(event.value):
+                    event.handler(event.value)
+            except DeferredException:
+                return replayed
+            except Exception as e:
+                event.log.exception("Failed to replay parked event", value=event.value, e=e)
+
+            with self.lock:
+                events = self.events.get(serial)
+                # the event may have expired while it was replayed
+                if events and events[0] is event:
+                    events.pop(0)
+                self.replayed_total += 1
+            replayed += 1
+
+    def event_lock(self, value):
+        """
+        Return the lock held while the events with the key of `value` are handled
+        """
+        with self.lock:
+            return self.event_locks.setdefault(shard_key(value), threading.RLock())
+
+    @contextmanager
+    def serialized(self, values):
+        """
+        Hold the locks of the events `values` (eg: a batch applied at once), the parked events with the
+        same keys aren't replayed meanwhile
+        """
+        locks = dict((shard_key(value), self.event_lock(value)) for value in values)
+        # always taken in the same order
+        keys = sorted(locks)
+        for key in keys:
+            locks[key].acquire()
+        try:
+            yield
+        finally:
+            for key in reversed(keys):
+                locks[key].release()
+
+    def expire(self, now=None):
+        if now is None:
+            now = self.clock()
+
+        expired = []
+        with self.lock:
+            for (serial, events) in list(self.events.items()):
+                while events and now - events[0].parked_at > self.ttl:
+                    expired.append(events.pop(0))
+                if not events:
+                    del self.events[serial]
+            self.expired_total += len(expired)
+
+        for event in expired:
+            event.log.warn("Dropping parked event, the ONU is still not known to XOS", value=event.value)
+        return len(expired)
+
+    def check(self, model_accessor):
+        """
+        Replay the events of the parked ONUs that are now known to XOS
+        """
+        self.expire()
+        with self.lock:
+            serials = [events[0].serial_number for events in self.events.values() if events]
+
+        for serial_number in serials:
+            try:
+                onu_index.get_onu(model_accessor, serial_number)
+            except IndexError:
+                continue
+            self.replay(serial_number)
+
+    def is_parked(self, serial_number):
+        with self.lock:
+            return normalize_serial(serial_number) in self.events
+
+    def get_stats(self):
+        now = self.clock()
+        with self.lock:
+            parked = [e for events in self.events.values() for e in events]
+            return {
+                "parked": len(parked),
+                "parked_onus": len(self.events),
+                "oldest_age": max([now - e.parked_at for e in parked] or [0]),
+                "parked_total": self.parked_total,
+                "replayed_total": self.replayed_total,
+                "expired_total": self.expired_total,
+            }
+
+    def _ensure_worker(self):
+        if self.worker is None or not self.worker.is_alive():
+            self.worker = threading.Thread(target=self._run, name="PendingEventStore")
+            self.worker.daemon = True
+            self.worker.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.recheck_interval)
+            try:
+                self.check(self.model_accessor)
+            except Exception as e:
+                # keep the worker alive, the next check will retry
+                self.log.exception("Failed to check the parked events", e=e)
+
+
+pending_events = PendingEventStore()
+registry.register_stats("ntt_pending_events", "Events parked for unknown ONUs", pending_events.get_stats)
@@ -0,0 +1,75 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from bisect import bisect_right
+
+
+class PonPortRanges(object):
+    """
+    The PON port ranges of the whitelist entries of a MAC address.
+
+    The ranges of the entries may overlap, they are merged into sorted disjoint intervals
+    so that checking a port costs O(log k) for k entries. Entries are added and removed
+    one at a time, only the intervals of this MAC address are merged again.
+    """
+
+    def __init__(self):
+        # entry_id -> (pon_port_from, pon_port_to)
+        self.ranges = {}
+        self.starts = []
+        self.ends = []
+
+    def _merge(self):
+        starts = []
+        ends = []
+        for (pon_port_from, pon_port_to) in sorted(self.ranges.values()):
+            if pon_port_from is None or pon_port_to is None or pon_port_from > pon_port_to:
+                # an incomplete or empty range doesn't admit any port
+                continue
+            if ends and pon_port_from <= ends[-1] + 1:
+                # overlapping or adjacent, the port numbers are integers
+                ends[-1] = max(ends[-1], pon_port_to)
+            else:
+                starts.append(pon_port_from)
+                ends.append(pon_port_to)
+        self.starts = starts
+        self.ends = ends
+
+    def add(self, entry_id, pon_port_from, pon_port_to):
+        self.ranges[entry_id] = (pon_port_from, pon_port_to)
+        self._merge()
+
+    def remove(self, entry_id):
+        if self.ranges.pop(entry_id, None) is not None:
+            self._merge()
+
+    def contains(self, port_no):
+        i = bisect_right(self.starts, port_no) - 1
+        return i >= 0 and port_no <= self.ends[i]
+
+    def intervals(self):
+        """
+        Return the merged (pon_port_from, pon_port_to) intervals, sorted
+        """
+        return list(zip(self.starts, self.ends))
+
+    def copy(self):
+        ranges = PonPortRanges()
+        ranges.ranges = dict(self.ranges)
+        ranges.starts = list(self.starts)
+        ranges.ends = list(self.ends)
+        return ranges
+
+    def __len__(self):
+        return len(self.ranges)
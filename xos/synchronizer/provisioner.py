@@ -0,0 +1,161 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import heapq
+import threading
+import time
+
+
+class ProvisioningJob(object):
+    def __init__(self, key, action, due, log):
+        self.key = key
+        self.action = action
+        self.due = due
+        self.log = log
+        self.attempts = 0
+        self.cancelled = False
+
+
+class ProvisioningScheduler(object):
+    """
+    Holds the delayed ONOS provisioning jobs and fires them from a single worker thread.
+
+    Jobs are keyed (eg: by "<of_dpid>/<uni_port_id>"), scheduling a key that is already
+    pending keeps the original due time so that repeated policy runs don't postpone it.
+    """
+
+    def __init__(self, delay=180, retry_delay=30, clock=time.time):
+        self.delay = delay
+        self.retry_delay = retry_delay
+        self.clock = clock
+
+        self.jobs = {}
+        # the jobs whose action is running, they can still be cancelled
+        self.running = {}
+        self.queue = []
+        self.condition = threading.Condition()
+        self.worker = None
+
+    def schedule(self, key, action, log, delay=None):
+        """
+        Record a job that will call `action()` once `delay` seconds have elapsed.
+
+        :return: the due time of the job
+        """
+        if delay is None:
+            delay = self.delay
+
+        with self.condition:
+            job = self.jobs.get(key)
+            if job:
+                # refresh the action in case the subscriber information changed
+                job.action = action
+                return job.due
+
+            job = ProvisioningJob(key, action, self.clock() + delay, log)
+            self.jobs[key] = job
+            heapq.heappush(self.queue, (job.due, key))
+            self._ensure_worker()
+            self.condition.notify()
+
+        log.debug("Scheduled subscriber provisioning", key=key, due=job.due)
+        return job.due
+
+    def cancel(self, key):
+        """
+        Cancel the job of `key`, a job whose action is running isn't retried if the action fails
+
+        :return: True if a job has been cancelled
+        """
+        with self.condition:
+            cancelled = False
+            for job in [self.jobs.pop(key, None), self.running.get(key)]:
+                if job is not None and not job.cancelled:
+                    job.cancelled = True
+                    cancelled = True
+            return cancelled
+
+    def is_pending(self, key):
+        with self.condition:
+            return key in self.jobs
+
+    def pending_count(self):
+        with self.condition:
+            return len(self.jobs)
+
+    def _pop_due(self, now):
+        due_jobs = []
+        with self.condition:
+            while self.queue and self.queue[0][0] <= now:
+                (due, key) = heapq.heappop(self.queue)
+                job = self.jobs.get(key)
+                # the job may have been cancelled or re-scheduled in the meantime
+                if job and job.due == due:
+                    del self.jobs[key]
+                    self.running[key] = job
+                    due_jobs.append(job)
+        return due_jobs
+
+    def _done(self, job):
+        with self.condition:
+            if self.running.get(job.key) is job:
+                del self.running[job.key]
+
+    def _reschedule(self, job):
+        with self.condition:
+            if job.cancelled or job.key in self.jobs:
+                # cancelled, or a newer job has been scheduled while this one was running
+                return
+            job.due = self.clock() + self.retry_delay
+            self.jobs[job.key] = job
+            heapq.heappush(self.queue, (job.due, job.key))
+            self.condition.notify()
+
+    def run_pending(self, now=None):
+        """
+        Fire all the jobs that are due, failing jobs are retried after `retry_delay` seconds.
+
+        :return: the number of jobs that have been executed
+        """
+        if now is None:
+            now = self.clock()
+
+        due_jobs = self._pop_due(now)
+        for job in due_jobs:
+            job.attempts += 1
+            try:
+                job.action()
+            except Exception as e:
+                job.log.exception("Subscriber provisioning failed, retrying", key=job.key,
+                                  attempts=job.attempts, e=e)
+                self._reschedule(job)
+            finally:
+                self._done(job)
+        return len(due_jobs)
+
+    def _ensure_worker(self):
+        if self.worker is None or not self.worker.is_alive():
+            self.worker = threading.Thread(target=self._run, name="ProvisioningScheduler")
+            self.worker.daemon = True
+            self.worker.start()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.queue:
+                    self.condition.wait()
+                timeout = self.queue[0][0] - self.clock()
+                if timeout > 0:
+                    self.condition.wait(timeout)
+            self.run_pending()
@@ -0,0 +1,277 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from circuit_breaker import CircuitOpenError
+from helpers import NttHelpers
+from onos_client import get_onos_client
+from ownership import olt_ownership
+from metrics import registry, reconcile_latency, reconcile_corrections_total
+
+
+class BatchLatch(object):
+    """ Counts down the ONOS calls of a batch """
+
+    def __init__(self, count):
+        self.count = count
+        self.failed = 0
+        self.condition = threading.Condition()
+
+    def done(self, error):
+        with self.condition:
+            self.count -= 1
+            if error is not None:
+                self.failed += 1
+            self.condition.notify_all()
+
+    def wait(self, timeout=None):
+        """
+        :return: (failed, pending), the calls that failed and the ones not completed when the timeout expired
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self.condition:
+            while self.count:
+                if deadline is None:
+                    self.condition.wait()
+                    continue
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            return (self.failed, self.count)
+
+
+class SubscriberReconciler(object):
+    """
+    Periodically brings the subscribers of the ONOS olt-app in line with the NttWorkflowDriverServiceInstances,
+    so that a failed ONOS call or a restart of the synchronizer doesn't leave them out of sync until the next event.
+
+    The subscribers programmed in the olt-app are fetched with one request per OLT and compared with the enabled
+    service instances (see desired_subscribers): only the missing subscribers are added and the stale ones removed.
+    A subscriber is only removed if it is on the port of a service instance of the driver, the subscribers
+    provisioned in the olt-app by someone else are left alone.
+    The corrections are sent by the ONOS dispatcher in batches of `batch_size`, a batch is sent once the previous
+    one has completed. The subscribers with a pending provisioning job or an ONOS call in flight are skipped.
+    The cycle is skipped while the circuit breaker of the ONOS client is open. If the calls of a batch don't
+    complete within `batch_timeout` seconds (e.g. the breaker opened and the dispatcher holds them), the rest of
+    the cycle is deferred: the held calls are sent by the dispatcher once ONOS is back.
+    Only the OLTs owned by the replica are reconciled, a cycle is run when the OLTs are rebalanced.
+    """
+
+    interval = 600
+    batch_size = 50
+    batch_timeout = 60
+
+    def __init__(self, model_accessor, log, interval=None, batch_size=None, clock=time.time):
+        self.model_accessor = model_accessor
+        self.log = log
+        if interval is not None:
+            self.interval = interval
+        if batch_size is not None:
+            self.batch_size = batch_size
+        self.clock = clock
+
+        self.stopped = threading.Event()
+        self.wakeup = threading.Event()
+        self.worker = None
+        self.lock = threading.Lock()
+        self.cycles = 0
+        self.last_cycle = {}
+
+    def desired_subscribers(self):
+        """
+        The subscribers are provisioned like validate_onu does: enabled ONUs, once authenticated with package B.
+        They are kept like the event steps do: a subscriber authenticating again is not removed, only the
+        subscribers of disabled or denied ONUs are.
+
+        :return: (provisioned, kept, managed), dicts of_dpid -> set of the UNI ports that should be programmed
+                 in the olt-app, that can stay programmed in the olt-app and that have a service instance,
+                 managed includes kept which includes provisioned
+        """
+        try:
+            package = NttHelpers.get_technology_package(self.model_accessor)
+        except IndexError:
+            # without TechnologyProfile nothing is validated, only the subscribers authenticated before are added
+            package = None
+
+        provisioned = {}
+        kept = {}
+        managed = {}
+        for si in self.model_accessor.NttWorkflowDriverServiceInstance.objects.all():
+            if not si.of_dpid or si.uni_port_id is None or not olt_ownership.owns(si.of_dpid):
+                continue
+            managed.setdefault(si.of_dpid, set()).add(long(si.uni_port_id))
+            if si.admin_onu_state != "ENABLED" or si.oper_onu_status != "ENABLED" or \
+                    si.authentication_state == "DENIED":
+                continue
+            kept.setdefault(si.of_dpid, set()).add(long(si.uni_port_id))
+            if si.authentication_state == "APPROVED" or package not in ["B", None]:
+                provisioned.setdefault(si.of_dpid, set()).add(long(si.uni_port_id))
+        return (provisioned, kept, managed)
+
+    def is_busy(self, of_dpid, uni_port_id):
+        handle = NttHelpers.subscriber_handle(of_dpid, uni_port_id)
+        return NttHelpers.provisioning_scheduler.is_pending(handle) or NttHelpers.onos_dispatcher.is_active(handle)
+
+    def reconcile(self):
+        """
+        Run a reconciliation cycle
+
+        :return: a dict with the number of OLTs, of subscribers added, removed, skipped (busy), of
+                 failed calls and of corrections deferred (ONOS stopped responding), whether ONOS was
+                 unavailable and the duration of the cycle
+        """
+        start = self.clock()
+        onos_client = get_onos_client(self.model_accessor.NttWorkflowDriverService.objects.first())
+
+        (provisioned, kept, managed) = self.desired_subscribers()
+        # nothing is added to or removed from the OLTs without service instance
+        olts = set(managed)
+
+        corrections = []
+        skipped = 0
+        failed = 0
+        unavailable = False
+        for of_dpid in sorted(olts):
+            try:
+                programmed = onos_client.get_subscribers(of_dpid)
+            except CircuitOpenError as e:
+                self.log.warn("Reconciliation: ONOS is unavailable, skipping the cycle", e=e)
+                unavailable = True
+                corrections = []
+                break
+            except Exception as e:
+                self.log.exception("Reconciliation: failed to get the subscribers of the OLT", of_dpid=of_dpid, e=e)
+                failed += 1
+                continue
+
+            added = provisioned.get(of_dpid, set()) - programmed
+            removed = (programmed & managed[of_dpid]) - kept.get(of_dpid, set())
+            for (operation, ports) in [("add", added), ("remove", removed)]:
+                for uni_port_id in sorted(ports):
+                    if self.is_busy(of_dpid, uni_port_id):
+                        skipped += 1
+                        continue
+                    corrections.append((operation, of_dpid, uni_port_id))
+
+        deferred = 0
+        for i in range(0, len(corrections), self.batch_size):
+            (batch_failed, pending) = self.apply(onos_client, corrections[i:i + self.batch_size])
+            failed += batch_failed
+            if pending:
+                deferred = pending + max(0, len(corrections) - i - self.batch_size)
+                self.log.warn("Reconciliation: the ONOS calls are not completing, deferring the rest of the cycle",
+                              pending=pending, deferred=deferred)
+                corrections = corrections[:i + self.batch_size]
+                break
+
+        elapsed = self.clock() - start
+        reconcile_latency.observe(elapsed)
+        stats = {
+            "olts": len(olts),
+            "added": len([c for c in corrections if c[0] == "add"]),
+            "removed": len([c for c in corrections if c[0] == "remove"]),
+            "skipped": skipped,
+            "failed": failed,
+            "deferred": deferred,
+            "unavailable": int(unavailable),
+            "seconds": elapsed,
+        }
+        with self.lock:
+            self.cycles += 1
+            self.last_cycle = stats
+        self.log.info("Reconciled the subscribers with ONOS", **stats)
+        return stats
+
+    def apply(self, onos_client, batch):
+        """
+        Send a batch of corrections and wait for their completion, at most `batch_timeout` seconds
+
+        :return: (failed, pending), the number of failed calls and of calls still pending after the timeout
+        """
+        latch = BatchLatch(len(batch))
+        for (operation, of_dpid, uni_port_id) in batch:
+            if operation == "add":
+                call = self.add_call(onos_client, of_dpid, uni_port_id)
+            else:
+                call = self.remove_call(onos_client, of_dpid, uni_port_id)
+            NttHelpers.onos_dispatcher.submit(NttHelpers.subscriber_handle(of_dpid, uni_port_id), call, self.log,
+                                              self.callback(operation, of_dpid, uni_port_id, latch))
+        return latch.wait(self.batch_timeout)
+
+    def add_call(self, onos_client, of_dpid, uni_port_id):
+        return lambda: NttHelpers.add_subscriber(self.log, onos_client, of_dpid, uni_port_id)
+
+    def remove_call(self, onos_client, of_dpid, uni_port_id):
+        return lambda: NttHelpers.remove_subscriber(self.log, onos_client, of_dpid, uni_port_id)
+
+    def callback(self, operation, of_dpid, uni_port_id, latch):
+        def done(response, error):
+            try:
+                reconcile_corrections_total.inc(operation=operation, result="failure" if error else "success")
+                if operation == "add":
+                    message = "Subscriber has been provisioned in ONOS" if error is None else \
+                        "Failed to provision the subscriber in ONOS: %s" % error
+                else:
+                    message = "Subscriber has been removed from ONOS" if error is None else \
+                        "Failed to remove the subscriber from ONOS: %s" % error
+                NttHelpers.report_subscriber_status(self.model_accessor, self.log, of_dpid, uni_port_id, message)
+            finally:
+                latch.done(error)
+        return done
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(("last_%s" % k, v) for (k, v) in self.last_cycle.items())
+            stats["cycles"] = self.cycles
+            return stats
+
+    def start(self):
+        if self.worker is None or not self.worker.is_alive():
+            self.stopped.clear()
+            self.worker = threading.Thread(target=self._run, name="SubscriberReconciler")
+            self.worker.daemon = True
+            self.worker.start()
+
+    def wake(self):
+        """ Run a cycle now """
+        self.wakeup.set()
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.wakeup.clear()
+            try:
+                self.reconcile()
+            except Exception as e:
+                self.log.exception("Failed to reconcile the subscribers with ONOS", e=e)
+            self.wakeup.wait(self.interval)
+
+
+def start_reconciler(model_accessor, log):
+    """
+    Reconcile the subscribers with ONOS every SubscriberReconciler.interval seconds, from a daemon thread
+
+    :return: the SubscriberReconciler
+    """
+    reconciler = SubscriberReconciler(model_accessor, log)
+    registry.register_stats("ntt_reconcile", "Reconciliation of the subscribers with ONOS", reconciler.get_stats)
+    # the replica takes over the ONOS subscribers of the OLTs it gets
+    olt_ownership.on_rebalance(reconciler.wake)
+    reconciler.start()
+    return reconciler
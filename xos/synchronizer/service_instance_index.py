@@ -0,0 +1,117 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from whitelist_index import normalize_mac
+
+
+class ServiceInstanceIndex(object):
+    """
+    Reverse index from normalized MAC address to the ids of the NttWorkflowDriverServiceInstances.
+
+    The index is loaded from the data model on first use and kept current by the
+    NttWorkflowDriverServiceInstance model policy. Only ids are stored, the service
+    instances are always fetched fresh when they are looked up.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            # mac -> set of si ids
+            self.ids = {}
+            # si id -> mac
+            self.macs = {}
+            self.loaded = False
+
+    def _add(self, si_id, mac_address):
+        self._remove(si_id)
+        mac = normalize_mac(mac_address)
+        self.ids.setdefault(mac, set()).add(si_id)
+        self.macs[si_id] = mac
+
+    def _remove(self, si_id):
+        mac = self.macs.pop(si_id, None)
+        if mac is None:
+            return
+        ids = self.ids.get(mac)
+        ids.discard(si_id)
+        if not ids:
+            del self.ids[mac]
+
+    def load(self, model_accessor):
+        sis = model_accessor.NttWorkflowDriverServiceInstance.objects.all()
+        with self.lock:
+            for si in sis:
+                self._add(si.id, si.mac_address)
+            self.loaded = True
+
+    def refresh(self, model_accessor, mac_address):
+        """
+        Index the NttWorkflowDriverServiceInstances with the given MAC address as found in the data model
+        """
+        sis = model_accessor.NttWorkflowDriverServiceInstance.objects.filter(
+            mac_address__iexact=normalize_mac(mac_address))
+        with self.lock:
+            for si in sis:
+                self._add(si.id, si.mac_address)
+
+    def update(self, si):
+        with self.lock:
+            self._add(si.id, si.mac_address)
+
+    def remove(self, si):
+        with self.lock:
+            self._remove(si.id)
+
+    def lookup_ids(self, model_accessor, mac_address):
+        with self.lock:
+            loaded = self.loaded
+        if not loaded:
+            self.load(model_accessor)
+
+        with self.lock:
+            return sorted(self.ids.get(normalize_mac(mac_address), []))
+
+    def lookup(self, model_accessor, mac_address):
+        """
+        Return the NttWorkflowDriverServiceInstances with the given MAC address.
+        Ids that don't match anymore (the SI has been deleted or its MAC changed) are dropped from the index.
+        """
+        mac = normalize_mac(mac_address)
+        sis = []
+        for si_id in self.lookup_ids(model_accessor, mac):
+            # filtered rather than got by id: the API raises a NOT_FOUND error for a deleted SI
+            found = model_accessor.NttWorkflowDriverServiceInstance.objects.filter(id=si_id)
+            if not found:
+                with self.lock:
+                    self._remove(si_id)
+                continue
+
+            si = found[0]
+            if normalize_mac(si.mac_address) != mac:
+                self.update(si)
+                continue
+
+            sis.append(si)
+        return sis
+
+    def __len__(self):
+        with self.lock:
+            return len(self.macs)
+
+
+service_instance_index = ServiceInstanceIndex()
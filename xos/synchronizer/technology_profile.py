@@ -0,0 +1,91 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import threading
+import time
+
+
+def parse_package(profile_value):
+    """
+    Return the package type described by a TechnologyProfile value:
+    the SIEPON package ("A" or "B") for EPON profiles, the profile type otherwise.
+    """
+    tech_value = json.loads(profile_value)
+    if tech_value["profile_type"] == "EPON":
+        return tech_value["epon_attribute"]["package_type"]
+    return tech_value["profile_type"]
+
+
+class TechnologyProfileCache(object):
+    """
+    Caches the package type resolved from the TechnologyProfile.
+
+    The profile is parsed once and the result is reused until the TechnologyProfile changes,
+    the profile is re-read at most every `check_interval` seconds to detect the changes: a change is
+    only seen up to `check_interval` seconds later. The TechnologyProfile belongs to the vOLT service,
+    the driver doesn't police it and can't invalidate the cache when it is updated.
+    `generation` changes whenever the profile is parsed again, so that the values derived
+    from the package can be invalidated.
+    """
+
+    profile_id = 64
+    check_interval = 10
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.profile_key = None
+            self.package = None
+            self.checked = None
+
+    def update(self, profile):
+        """
+        Refresh the cache from a TechnologyProfile, the value is only parsed if the profile changed.
+
+        :return: True if the package has been (re)parsed
+        """
+        key = (profile.id, profile.profile_value)
+        with self.lock:
+            self.checked = self.clock()
+            if key == self.profile_key:
+                return False
+            self.package = parse_package(profile.profile_value)
+            self.profile_key = key
+            self.generation += 1
+            return True
+
+    def get_package(self, model_accessor):
+        return self.resolve(model_accessor)[0]
+
+    def resolve(self, model_accessor):
+        """
+        :return: (package, generation), the generation the package has been parsed in
+        """
+        with self.lock:
+            if self.checked is not None and self.clock() - self.checked < self.check_interval:
+                return (self.package, self.generation)
+
+        self.update(model_accessor.TechnologyProfile.objects.get(profile_id=self.profile_id))
+        with self.lock:
+            return (self.package, self.generation)
+
+
+technology_profile_cache = TechnologyProfileCache()
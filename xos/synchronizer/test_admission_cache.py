@@ -0,0 +1,85 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+from mock import Mock, patch
+
+import os, sys
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class TestAdmissionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        import admission_cache
+        self.admission_cache = admission_cache
+        self.cache = admission_cache.AdmissionCache()
+
+        self.ntt_si = Mock(owner_id=1, mac_address="0A0A0A", authentication_state="AWAITING")
+        self.onu = Mock(admin_state="ENABLED")
+        self.onu.pon_port.port_no = 1234
+
+    def tearDown(self):
+        sys.path = self.sys_path_save
+
+    def key(self, generation=1):
+        return self.cache.key(self.ntt_si, self.onu, "A", generation)
+
+    def test_hit(self):
+        decision = self.admission_cache.AdmissionDecision(True, "ONU has been validated", approve=True, provision=True)
+        self.assertIsNone(self.cache.get(self.key()))
+        self.cache.put(self.key(), decision)
+
+        self.assertIs(self.cache.get(self.key()), decision)
+        self.assertEqual(self.cache.get_stats(), {"entries": 1, "hits": 1, "misses": 1})
+
+    def test_key(self):
+        key = self.key()
+        self.ntt_si.mac_address = "0a0a0a"
+        # the MAC addresses are compared like in the whitelist
+        self.assertEqual(self.key(), key)
+
+        self.assertNotEqual(self.key(generation=2), key)
+        self.ntt_si.authentication_state = "APPROVED"
+        self.assertNotEqual(self.key(), key)
+        self.ntt_si.authentication_state = "AWAITING"
+        self.onu.pon_port.port_no = 666
+        self.assertNotEqual(self.key(), key)
+        self.onu.pon_port.port_no = 1234
+        self.onu.admin_state = "ADMIN_DISABLED"
+        self.assertNotEqual(self.key(), key)
+
+    def test_least_recently_used(self):
+        with patch.object(self.cache, "max_entries", 2):
+            for generation in [1, 2]:
+                self.cache.put(self.key(generation), Mock())
+            self.cache.get(self.key(1))
+            self.cache.put(self.key(3), Mock())
+
+            self.assertEqual(len(self.cache), 2)
+            self.assertIsNotNone(self.cache.get(self.key(1)))
+            self.assertIsNone(self.cache.get(self.key(2)))
+
+    def test_clear(self):
+        self.cache.put(self.key(), Mock())
+        self.cache.get(self.key())
+        self.cache.clear()
+
+        self.assertEqual(self.cache.get_stats(), {"entries": 0, "hits": 0, "misses": 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import os, sys
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        import circuit_breaker
+        self.circuit_breaker = circuit_breaker
+
+        self.clock = FakeClock()
+        self.jitter = 0.0
+        self.breaker = circuit_breaker.CircuitBreaker(failure_threshold=3, base_delay=1.0, max_delay=8.0,
+                                                      clock=self.clock, random=lambda: self.jitter)
+
+    def tearDown(self):
+        sys.path = self.sys_path_save
+
+    def fail(self, count=1):
+        for i in range(count):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record_failure()
+
+    def test_closed(self):
+        self.fail(2)
+        self.breaker.record_success()
+        self.fail(2)
+
+        self.assertEqual(self.breaker.state, self.circuit_breaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.retry_in(), 0.0)
+
+    def test_open_after_consecutive_failures(self):
+        self.fail(3)
+
+        self.assertEqual(self.breaker.state, self.circuit_breaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.retry_in(), 1.0)
+        self.assertEqual(self.breaker.get_stats()["rejected"], 1)
+        self.assertEqual(self.breaker.get_stats()["open"], 1)
+
+    def test_half_open_single_probe(self):
+        self.fail(3)
+        self.clock.now += 1.0
+
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, self.circuit_breaker.HALF_OPEN)
+        # only one call probes ONOS
+        self.assertFalse(self.breaker.allow())
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, self.circuit_breaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+        self.assertTrue(self.breaker.allow())
+
+    def test_released_probe(self):
+        self.fail(3)
+        self.clock.now += 1.0
+
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+
+        # the probe raised an unexpected error, another call can probe
+        self.breaker.release()
+        self.assertEqual(self.breaker.state, self.circuit_breaker.HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+
+    def test_exponential_backoff(self):
+        self.fail(3)
+        delays = [self.breaker.retry_in()]
+        for i in range(5):
+            self.clock.now += self.breaker.retry_in()
+            # the probe fails
+            self.fail()
+            delays.append(self.breaker.retry_in())
+
+        self.assertEqual(delays, [1.0, 2.0, 4.0, 8.0, 8.0, 8.0])
+        self.assertEqual(self.breaker.get_stats()["opened"], 6)
+
+    def test_backoff_reset_when_closed(self):
+        self.fail(3)
+        self.clock.now += 1.0
+        self.fail()
+        self.assertEqual(self.breaker.retry_in(), 2.0)
+
+        self.clock.now += 2.0
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_success()
+        self.fail(3)
+
+        self.assertEqual(self.breaker.retry_in(), 1.0)
+
+    def test_jitter(self):
+        self.jitter = 0.5
+        self.fail(3)
+
+        self.assertEqual(self.breaker.retry_in(), 0.75)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+import shutil
+import tempfile
+
+import os, sys
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class TestConfigSchema(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+        self.tmpdir = tempfile.mkdtemp()
+        self.schema = os.path.join(test_path, "ntt-workflow-driver-config-schema.yaml")
+
+    def tearDown(self):
+        from xosconfig import Config
+        Config.clear()
+        shutil.rmtree(self.tmpdir)
+        sys.path = self.sys_path_save
+
+    def init(self, settings):
+        from xosconfig import Config
+        path = os.path.join(self.tmpdir, "config.yaml")
+        with open(os.path.join(test_path, "config.yaml")) as f:
+            config = f.read()
+        with open(path, "w") as f:
+            f.write(config + settings)
+        Config.clear()
+        Config.init(path, self.schema)
+        return Config
+
+    def test_default_config(self):
+        Config = self.init("")
+        self.assertEqual(Config.get("name"), "ntt-workflow-driver")
+        self.assertIsNone(Config.get("ntt_workflow_driver.onos_max_workers"))
+
+    def test_driver_settings(self):
+        Config = self.init("ntt_workflow_driver:\n  onos_max_workers: 16\n  metrics_port: 9100\n")
+        self.assertEqual(Config.get("ntt_workflow_driver.onos_max_workers"), 16)
+        self.assertEqual(Config.get("ntt_workflow_driver.metrics_port"), 9100)
+
+    def test_replica_settings(self):
+        Config = self.init("ntt_workflow_driver:\n  replica_id: ntt-0\n  lease_dir: /var/run/ntt\n"
+                           "  lease_renew_interval: 5\n  lease_ttl: 15\n")
+        self.assertEqual(Config.get("name"), "ntt-workflow-driver")
+        self.assertEqual(Config.get("ntt_workflow_driver.replica_id"), "ntt-0")
+        self.assertEqual(Config.get("ntt_workflow_driver.lease_dir"), "/var/run/ntt")
+        self.assertEqual(Config.get("ntt_workflow_driver.lease_renew_interval"), 5)
+        self.assertEqual(Config.get("ntt_workflow_driver.lease_ttl"), 15)
+
+    def test_batch_settings(self):
+        Config = self.init("ntt_workflow_driver:\n  batch_size: 50\n  shards: 4\n")
+        self.assertEqual(Config.get("ntt_workflow_driver.batch_size"), 50)
+        self.assertEqual(Config.get("ntt_workflow_driver.shards"), 4)
+
+    def test_helpers_settings(self):
+        Config = self.init("ntt_workflow_driver:\n  elide_writes: false\n  memoize_admission: true\n")
+        # Config.get returns None for false, the synchronizer reads it from the section
+        self.assertIsNone(Config.get("ntt_workflow_driver.elide_writes"))
+        self.assertIs(Config.get("ntt_workflow_driver")["elide_writes"], False)
+        self.assertIs(Config.get("ntt_workflow_driver")["memoize_admission"], True)
+
+    def test_warm_start_setting(self):
+        Config = self.init("ntt_workflow_driver:\n  warm_start: false\n")
+        self.assertIs(Config.get("ntt_workflow_driver")["warm_start"], False)
+
+    def test_invalid_setting(self):
+        with self.assertRaises(Exception) as e:
+            self.init("ntt_workflow_driver:\n  onos_max_workers: many\n")
+        self.assertIn("The config format is wrong", str(e.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from mock import Mock
+import threading
+
+import os
+import sys
+
+test_path = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class TestEventBatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        from event_batch import EventBatcher
+
+        self.batches = []
+        self.log = Mock()
+        self.batcher = EventBatcher(self.batches.append, 3, 60, self.log)
+
+    def tearDown(self):
+        if self.batcher.timer is not None:
+            self.batcher.timer.cancel()
+        sys.path = self.sys_path_save
+
+    def test_flush_when_full(self):
+        for i in range(7):
+            self.batcher.add(i)
+
+        self.assertEqual(self.batches, [[0, 1, 2], [3, 4, 5]])
+        self.assertEqual(len(self.batcher), 1)
+        self.assertIsNotNone(self.batcher.timer)
+
+        self.assertEqual(self.batcher.flush(), 1)
+        self.assertEqual(self.batches, [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertIsNone(self.batcher.timer)
+
+    def test_flush_after_wait(self):
+        done = threading.Event()
+        batches = []
+
+        def flush(events):
+            batches.append(events)
+            done.set()
+
+        from event_batch import EventBatcher
+        self.batcher = EventBatcher(flush, 100, 0.01, self.log)
+
+        self.batcher.add("a")
+        self.batcher.add("b")
+
+        self.assertTrue(done.wait(5))
+        self.assertEqual(batches, [["a", "b"]])
+
+    def test_flush_empty(self):
+        self.assertEqual(self.batcher.flush(), 0)
+        self.assertEqual(self.batches, [])
+
+    def test_flush_error(self):
+        from event_batch import EventBatcher
+        self.batcher = EventBatcher(Mock(side_effect=Exception("boom")), 1, 60, self.log)
+
+        self.batcher.add("a")
+
+        self.assertEqual(self.log.exception.call_count, 1)
+        self.assertEqual(len(self.batcher), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
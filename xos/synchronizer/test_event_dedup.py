@@ -0,0 +1,118 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from mock import Mock
+
+import os
+import sys
+
+test_path = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestEventDeduplicator(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        from event_dedup import EventDeduplicator
+
+        self.clock = FakeClock()
+        self.dedup = EventDeduplicator(clock=self.clock)
+
+    def tearDown(self):
+        sys.path = self.sys_path_save
+
+    def message(self, value, timestamp=1580000000000, topic="onu.events"):
+        event = Mock()
+        event.topic = topic
+        event.key = None
+        event.timestamp = timestamp
+        event.value = value
+        return event
+
+    def receive(self, serial_number, event):
+        # the event steps record the messages they have processed
+        duplicate = self.dedup.is_duplicate(serial_number, event)
+        if not duplicate:
+            self.dedup.record(serial_number, event)
+        return duplicate
+
+    def test_redelivered_message(self):
+        self.assertFalse(self.receive("BRCM1234", self.message('{"status": "activated"}')))
+        self.assertTrue(self.receive("BRCM1234", self.message('{"status": "activated"}')))
+
+        self.assertEqual(self.dedup.get_stats(), {"hits": 1, "misses": 1, "entries": 1})
+
+    def test_same_value_new_message(self):
+        # an ONU going up again sends the same event with a new timestamp
+        self.assertFalse(self.receive("BRCM1234", self.message('{"status": "activated"}', 1)))
+        self.assertFalse(self.receive("BRCM1234", self.message('{"status": "disabled"}', 2)))
+        self.assertFalse(self.receive("BRCM1234", self.message('{"status": "activated"}', 3)))
+
+        # a replay of the whole sequence is dropped
+        self.assertTrue(self.receive("BRCM1234", self.message('{"status": "activated"}', 1)))
+        self.assertTrue(self.receive("BRCM1234", self.message('{"status": "disabled"}', 2)))
+        self.assertTrue(self.receive("BRCM1234", self.message('{"status": "activated"}', 3)))
+
+    def test_topics(self):
+        self.assertFalse(self.receive("BRCM1234", self.message("{}", topic="onu.events")))
+        self.assertFalse(self.receive("BRCM1234", self.message("{}", topic="authentication.events")))
+
+    def test_without_timestamp(self):
+        self.assertFalse(self.receive("BRCM1234", self.message('{"status": "activated"}', None)))
+        self.assertTrue(self.receive("brcm1234-1", self.message('{"status": "activated"}', None)))
+        self.assertFalse(self.receive("BRCM1234", self.message('{"status": "disabled"}', None)))
+        self.assertFalse(self.receive("BRCM1234", self.message('{"status": "activated"}', None)))
+
+        # other ONUs don't interfere
+        self.assertFalse(self.receive("BRCM5678", self.message('{"status": "activated"}', None)))
+
+    def test_window(self):
+        self.assertFalse(self.receive("BRCM1234", self.message("{}")))
+
+        self.clock.now += self.dedup.window + 1
+        self.assertFalse(self.receive("BRCM1234", self.message("{}")))
+        self.assertEqual(self.dedup.get_stats()["entries"], 1)
+
+    def test_max_entries(self):
+        self.dedup.max_entries = 10
+
+        for i in range(20):
+            self.assertFalse(self.receive("BRCM%s" % i, self.message("{}", i)))
+
+        self.assertLessEqual(self.dedup.get_stats()["entries"], 11)
+        # the oldest messages have been forgotten, the newest are still known
+        self.assertFalse(self.receive("BRCM0", self.message("{}", 0)))
+        self.assertTrue(self.receive("BRCM19", self.message("{}", 19)))
+
+    def test_failed_message(self):
+        # the message isn't recorded if its processing failed
+        self.assertFalse(self.dedup.is_duplicate("BRCM1234", self.message('{"status": "activated"}')))
+        self.assertFalse(self.dedup.is_duplicate("BRCM1234", self.message('{"status": "activated"}')))
+
+        self.dedup.record("BRCM1234", self.message('{"status": "activated"}'))
+        self.assertTrue(self.dedup.is_duplicate("BRCM1234", self.message('{"status": "activated"}')))
+
+
+if __name__ == '__main__':
+    unittest.main()
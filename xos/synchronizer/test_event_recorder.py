@@ -0,0 +1,145 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from mock import Mock
+import json
+import shutil
+import tempfile
+
+import os, sys
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestEventRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        import event_recorder
+        self.event_recorder = event_recorder
+
+        self.tmpdir = tempfile.mkdtemp()
+        self.clock = FakeClock()
+
+        self.onu_event = {"status": "activated", "serialNumber": "BRCM1234", "deviceId": "of:109299321",
+                          "portNumber": "16"}
+        self.auth_event = {"authenticationState": "APPROVED", "serialNumber": "BRCM1234", "deviceId": "of:109299321",
+                           "portNumber": "16"}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        sys.path = self.sys_path_save
+
+    def message(self, topic, value, timestamp):
+        return Mock(topic=topic, key=None, value=json.dumps(value), timestamp=timestamp)
+
+    def record(self, name):
+        path = os.path.join(self.tmpdir, name)
+        with self.event_recorder.EventRecorder(path, clock=self.clock) as recorder:
+            recorder.record(self.message("onu.events", self.onu_event, 1))
+            self.clock.now += 2.5
+            recorder.record(self.message("authentication.events", self.auth_event, 2))
+            self.clock.now += 0.5
+            recorder.record(self.message("dhcp.events", {}, 3))
+        return path
+
+    def test_record_and_read(self):
+        for name in ["events.jsonl", "events.jsonl.gz"]:
+            events = list(self.event_recorder.read_events(self.record(name)))
+
+            self.assertEqual([e.topic for e in events], ["onu.events", "authentication.events", "dhcp.events"])
+            self.assertEqual([e.offset for e in events], [0, 2.5, 3.0])
+            self.assertEqual([e.timestamp for e in events], [1, 2, 3])
+            self.assertEqual(json.loads(events[0].value), self.onu_event)
+            self.assertEqual(json.loads(events[1].value), self.auth_event)
+            self.assertIsNone(events[0].key)
+            self.assertIsInstance(events[0].value, str)
+
+    def test_read_invalid_file(self):
+        path = os.path.join(self.tmpdir, "events.jsonl")
+        with open(path, "w") as f:
+            f.write("not a recording\n")
+
+        with self.assertRaises(ValueError) as e:
+            list(self.event_recorder.read_events(path))
+        self.assertIn("is not a recording of events", str(e.exception))
+
+    def test_read_invalid_record(self):
+        path = self.record("events.jsonl")
+        with open(path, "a") as f:
+            f.write("[1, 2\n")
+
+        with self.assertRaises(ValueError) as e:
+            list(self.event_recorder.read_events(path))
+        self.assertIn("events.jsonl:5: invalid record", str(e.exception))
+
+    def replay(self, speed):
+        onu_step = Mock()
+        auth_step = Mock()
+        steps = {"onu.events": onu_step, "authentication.events": auth_step}
+        path = self.record("events.jsonl")
+        self.clock.now = 0.0
+        replayer = self.event_recorder.EventReplayer(Mock(), Mock(), steps, speed=speed,
+                                                     clock=self.clock, sleep=self.clock.sleep)
+
+        times = []
+        onu_step.return_value.process_event.side_effect = lambda event: times.append(self.clock.now)
+        auth_step.return_value.process_event.side_effect = lambda event: times.append(self.clock.now)
+
+        stats = replayer.replay(self.event_recorder.read_events(path))
+
+        self.assertEqual(json.loads(onu_step.return_value.process_event.call_args[0][0].value), self.onu_event)
+        self.assertEqual(json.loads(auth_step.return_value.process_event.call_args[0][0].value), self.auth_event)
+        self.assertEqual(stats["events"], 2)
+        self.assertEqual(stats["skipped"], 1)
+        self.assertEqual(stats["failed"], 0)
+        return times
+
+    def test_replay_original_speed(self):
+        self.assertEqual(self.replay(1.0), [0.0, 2.5])
+
+    def test_replay_faster(self):
+        self.assertEqual(self.replay(10), [0.0, 0.25])
+
+    def test_replay_max_speed(self):
+        self.assertEqual(self.replay(None), [0.0, 0.0])
+
+    def test_replay_step_failure(self):
+        onu_step = Mock()
+        onu_step.return_value.process_event.side_effect = Exception("boom")
+        log = Mock()
+        replayer = self.event_recorder.EventReplayer(Mock(), log, {"onu.events": onu_step}, speed=None)
+
+        stats = replayer.replay(self.event_recorder.read_events(self.record("events.jsonl")))
+
+        self.assertEqual(stats["events"], 1)
+        self.assertEqual(stats["failed"], 1)
+        log.exception.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
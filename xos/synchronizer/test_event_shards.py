@@ -0,0 +1,117 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from mock import Mock
+import threading
+
+import os, sys
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class TestShardedExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        import event_shards
+        self.event_shards = event_shards
+
+        self.log = Mock()
+        self.executor = event_shards.ShardedExecutor(shards=4)
+
+    def tearDown(self):
+        sys.path = self.sys_path_save
+
+    def test_shard_key(self):
+        self.assertEqual(self.event_shards.shard_key({"deviceId": "of:1", "serialNumber": "BRCM1234-1"}), "of:1")
+        self.assertEqual(self.event_shards.shard_key({"serialNumber": "BRCM1234-1"}), "brcm1234")
+
+    def test_disabled_by_default(self):
+        self.assertEqual(self.event_shards.ShardedExecutor().shards, 0)
+
+    def test_order_per_key(self):
+        handled = []
+        lock = threading.Lock()
+
+        def handler(value):
+            with lock:
+                handled.append(value)
+
+        for i in range(100):
+            for olt in ["of:1", "of:2", "of:3"]:
+                self.executor.submit(olt, handler, (olt, i), self.log)
+        self.executor.join()
+
+        for olt in ["of:1", "of:2", "of:3"]:
+            self.assertEqual([i for (o, i) in handled if o == olt], range(100))
+
+    def test_parallel_keys(self):
+        # the handlers block until all of them have started, this only completes if they run in parallel
+        olts = ["of:%s" % i for i in range(20)]
+        shards = set(self.executor.shard(olt) for olt in olts)
+        started = threading.Semaphore(0)
+        release = threading.Event()
+
+        def handler(value):
+            started.release()
+            release.wait(5)
+
+        for olt in olts:
+            self.executor.submit(olt, handler, olt, self.log)
+        for i in range(len(shards)):
+            started.acquire()
+        release.set()
+        self.executor.join()
+
+        self.assertEqual(len(shards), 4)
+
+    def test_queue_depth(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocking(value):
+            started.set()
+            release.wait(5)
+
+        self.executor.submit("of:1", blocking, None, self.log)
+        for i in range(3):
+            self.executor.submit("of:1", lambda value: None, None, self.log)
+        started.wait(5)
+
+        shard = str(self.executor.shard("of:1"))
+        stats = self.executor.get_stats()
+        self.assertEqual(stats["shards"], 4)
+        # the first event is being handled
+        self.assertEqual(stats["queue_depth"][shard], 3)
+
+        release.set()
+        self.executor.join()
+        stats = self.executor.get_stats()
+        self.assertEqual(stats["queue_depth"][shard], 0)
+        self.assertEqual(stats["processed"][shard], 4)
+
+    def test_handler_failure(self):
+        handled = []
+        self.executor.submit("of:1", Mock(side_effect=Exception("boom")), None, self.log)
+        self.executor.submit("of:1", handled.append, "next", self.log)
+        self.executor.join()
+
+        self.log.exception.assert_called_once()
+        self.assertEqual(handled, ["next"])
+
+
+if __name__ == '__main__':
+    unittest.main()
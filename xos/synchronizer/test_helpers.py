@@ -57,6 +57,22 @@ class TestNttHelpers(unittest.TestCase):
         self.helpers = NttHelpers
         self.model_accessor = model_accessor
 
+        from whitelist_index import whitelist_index
+        whitelist_index.clear()
+        from technology_profile import technology_profile_cache
+        technology_profile_cache.clear()
+        from olt_information_cache import olt_information_cache
+        self.olt_information_cache = olt_information_cache
+        self.olt_information_cache.clear()
+        from onu_index import onu_index
+        onu_index.clear()
+        from admission_cache import admission_cache
+        self.admission_cache = admission_cache
+        self.admission_cache.clear()
+
+        self.schedule_patcher = patch.object(NttHelpers.provisioning_scheduler, "schedule")
+        self.schedule_mock = self.schedule_patcher.start()
+
         self._volt = VOLTService()
         self._volt.id = 1
 
@@ -94,6 +110,7 @@ class TestNttHelpers(unittest.TestCase):
 
 
     def tearDown(self):
+        self.schedule_patcher.stop()
         sys.path = self.sys_path_save
 
     def test_not_in_whitelist(self):
@@ -122,6 +139,29 @@ class TestNttHelpers(unittest.TestCase):
             self.assertFalse(res)
             self.assertEqual(message, "PON port is not approved.")
 
+    def test_validating_onu_multiple_ranges(self):
+        self.pon_port.port_no = 666
+        self.whitelist_entry.id = 1
+        other_entry = NttWorkflowDriverWhiteListEntry(
+            id=2,
+            mac_address="0a0a0a",
+            owner=self.volt,
+            owner_id=self.volt.id,
+            pon_port_from=600,
+            pon_port_to=700,
+        )
+        with patch.object(NttWorkflowDriverWhiteListEntry.objects, "get_items") as whitelist_mock, \
+            patch.object(ONUDevice.objects, "get_items") as onu_mock, \
+            patch.object(TechnologyProfile.objects, "get_items") as technologyProfile_mock:
+            whitelist_mock.return_value = [self.whitelist_entry, other_entry]
+            onu_mock.return_value = [self.onu]
+            technologyProfile_mock.return_value = [self.technologyProfile]
+
+            [res, message] = self.helpers.validate_onu(self.model_accessor, self.log, self.ntt_si)
+
+            self.assertTrue(res)
+            self.assertEqual(message, "ONU has been validated")
+
     def test_deferred_validation(self):
         with patch.object(NttWorkflowDriverWhiteListEntry.objects, "get_items") as whitelist_mock, \
             patch.object(ONUDevice.objects, "get_items") as onu_mock, \
@@ -148,6 +188,133 @@ class TestNttHelpers(unittest.TestCase):
             self.assertTrue(res)
             self.assertEqual(message, "ONU has been validated")
 
+    def test_validating_onu_schedules_provisioning(self):
+        self.ntt_si.uni_port_id = 16
+        with patch.object(NttWorkflowDriverWhiteListEntry.objects, "get_items") as whitelist_mock, \
+            patch.object(ONUDevice.objects, "get_items") as onu_mock, \
+            patch.object(TechnologyProfile.objects, "get_items") as technologyProfile_mock:
+            whitelist_mock.return_value = [self.whitelist_entry]
+            onu_mock.return_value = [self.onu]
+            technologyProfile_mock.return_value = [self.technologyProfile]
+
+            self.helpers.validate_onu(self.model_accessor, self.log, self.ntt_si)
+
+            self.schedule_mock.assert_called_once()
+            self.assertEqual(self.schedule_mock.call_args[0][0], "of:1234/16")
+
+    def test_memoized_admission(self):
+        self.ntt_si.uni_port_id = 16
+        with patch.object(NttWorkflowDriverWhiteListEntry.objects, "get_items") as whitelist_mock, \
+            patch.object(ONUDevice.objects, "get_items") as onu_mock, \
+            patch.object(TechnologyProfile.objects, "get_items") as technologyProfile_mock, \
+            patch.object(self.helpers, "decide_admission", wraps=self.helpers.decide_admission) as decide_mock:
+            whitelist_mock.return_value = [self.whitelist_entry]
+            onu_mock.return_value = [self.onu]
+            technologyProfile_mock.return_value = [self.technologyProfile]
+
+            self.ntt_si.authentication_state = "AWAITING"
+            self.helpers.validate_onu(self.model_accessor, self.log, self.ntt_si)
+            # a new event resets the state of the SI
+            self.ntt_si.authentication_state = "AWAITING"
+            self.schedule_mock.reset_mock()
+            [res, message] = self.helpers.validate_onu(self.model_accessor, self.log, self.ntt_si)
+
+            decide_mock.assert_called_once()
+            self.assertTrue(res)
+            self.assertEqual(message, "ONU has been validated")
+            # the decision is applied again
+            self.assertEqual(self.ntt_si.authentication_state, "APPROVED")
+            self.schedule_mock.assert_called_once()
+            self.assertEqual(self.admission_cache.get_stats()["hits"], 1)
+
+    def test_memoized_admission_whitelist_change(self):
+        with patch.object(NttWorkflowDriverWhiteListEntry.objects, "get_items") as whitelist_mock, \
+            patch.object(ONUDevice.objects, "get_items") as onu_mock, \
+            patch.object(TechnologyProfile.objects, "get_items") as technologyProfile_mock:
+            self.whitelist_entry.id = 1
+            whitelist_mock.return_value = [self.whitelist_entry]
+            onu_mock.return_value = [self.onu]
+            technologyProfile_mock.return_value = [self.technologyProfile]
+
+            [res, message] = self.helpers.validate_onu(self.model_accessor, self.log, self.ntt_si)
+            self.assertTrue(res)
+
+            from whitelist_index import whitelist_index
+            self.whitelist_entry.pon_port_from = 1
+            self.whitelist_entry.pon_port_to = 2
+            whitelist_index.update(self.whitelist_entry)
+
+            [res, message] = self.helpers.validate_onu(self.model_accessor, self.log, self.ntt_si)
+
+            self.assertFalse(res)
+            self.assertEqual(message, "PON port is not approved.")
+
+    def test_memoized_admission_onu_change(self):
+        with patch.object(NttWorkflowDriverWhiteListEntry.objects, "get_items") as whitelist_mock, \
+            patch.object(ONUDevice.objects, "get_items") as onu_mock, \
+            patch.object(TechnologyProfile.objects, "get_items") as technologyProfile_mock:
+            whitelist_mock.return_value = [self.whitelist_entry]
+            onu_mock.return_value = [self.onu]
+            technologyProfile_mock.return_value = [self.technologyProfile]
+
+            self.helpers.validate_onu(self.model_accessor, self.log, self.ntt_si)
+            self.onu.admin_state = "ADMIN_DISABLED"
+            [res, message] = self.helpers.validate_onu(self.model_accessor, self.log, self.ntt_si)
+
+            self.assertFalse(res)
+            self.assertEqual(message, "ONU has been manually disabled")
+
+    def test_admission_not_memoized(self):
+        with patch.object(NttWorkflowDriverWhiteListEntry.objects, "get_items") as whitelist_mock, \
+            patch.object(ONUDevice.objects, "get_items") as onu_mock, \
+            patch.object(TechnologyProfile.objects, "get_items") as technologyProfile_mock, \
+            patch.object(self.helpers, "memoize_admission", False):
+            whitelist_mock.return_value = [self.whitelist_entry]
+            onu_mock.return_value = [self.onu]
+            technologyProfile_mock.return_value = [self.technologyProfile]
+
+            self.helpers.validate_onu(self.model_accessor, self.log, self.ntt_si)
+
+            self.assertEqual(len(self.admission_cache), 0)
+
+    def test_dispatch_add_subscriber(self):
+        self.ntt_si.of_dpid = "of:1234"
+        self.ntt_si.uni_port_id = 16
+        onos_client = Mock()
+
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as si_mock, \
+            patch.object(NttWorkflowDriverServiceInstance, "save_changed_fields") as save_mock:
+            si_mock.return_value = [self.ntt_si]
+
+            self.helpers.dispatch_add_subscriber(self.model_accessor, self.log, onos_client, "of:1234", 16)
+            self.assertTrue(self.helpers.onos_dispatcher.join(5))
+
+            onos_client.add_subscriber.assert_called_with("of:1234", 16)
+            self.assertEqual(self.ntt_si.status_message, "Subscriber has been provisioned in ONOS")
+            save_mock.assert_called_once_with()
+            self.schedule_mock.assert_not_called()
+
+    def test_dispatch_add_subscriber_failure(self):
+        self.ntt_si.of_dpid = "of:1234"
+        self.ntt_si.uni_port_id = 16
+        onos_client = Mock()
+        onos_client.add_subscriber.side_effect = Exception("Failed to add subscriber in onos-voltha: 500")
+
+        with patch.object(NttWorkflowDriverServiceInstance.objects, "get_items") as si_mock, \
+            patch.object(NttWorkflowDriverServiceInstance, "save_changed_fields"):
+            si_mock.return_value = [self.ntt_si]
+
+            self.helpers.dispatch_add_subscriber(self.model_accessor, self.log, onos_client, "of:1234", 16)
+            self.assertTrue(self.helpers.onos_dispatcher.join(5))
+
+            self.assertEqual(self.ntt_si.status_message,
+                             "Failed to provision the subscriber in ONOS: Failed to add subscriber in onos-voltha: 500")
+            # the subscriber is provisioned again later
+            self.schedule_mock.assert_called_once()
+            self.assertEqual(self.schedule_mock.call_args[0][0], "of:1234/16")
+            self.assertEqual(self.schedule_mock.call_args[1]["delay"],
+                             self.helpers.provisioning_scheduler.retry_delay)
+
     def test_validating_onu_uppercase(self):
         self.whitelist_entry.mac_address = "0A0A0A"
         with patch.object(NttWorkflowDriverWhiteListEntry.objects, "get_items") as whitelist_mock, \
@@ -0,0 +1,150 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import urllib2
+
+import os, sys
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        import metrics
+        self.metrics = metrics
+        self.registry = metrics.MetricsRegistry()
+
+    def tearDown(self):
+        sys.path = self.sys_path_save
+
+    def test_counter(self):
+        counter = self.registry.counter("test_total", "A counter", ["model", "result"])
+        counter.inc(model="SI", result="found")
+        counter.inc(model="SI", result="found")
+        counter.inc(3, model="SI", result="created")
+
+        self.assertEqual(counter.get(model="SI", result="found"), 2)
+        self.assertEqual(self.registry.render(),
+                         '# HELP test_total A counter\n'
+                         '# TYPE test_total counter\n'
+                         'test_total{model="SI",result="created"} 3.0\n'
+                         'test_total{model="SI",result="found"} 2.0\n')
+
+    def test_metric(self):
+        metric = self.registry.register(self.metrics.Metric("test_value", "A value", ["olt"]))
+        metric.values[("of:1",)] = 4
+
+        self.assertEqual(self.registry.render(),
+                         '# HELP test_value A value\n'
+                         '# TYPE test_value untyped\n'
+                         'test_value{olt="of:1"} 4.0\n')
+
+    def test_wrong_labels(self):
+        counter = self.registry.counter("test_total", "A counter", ["model"])
+        with self.assertRaises(ValueError):
+            counter.inc(result="found")
+
+    def test_histogram(self):
+        histogram = self.registry.histogram("test_seconds", "A histogram", ["topic"], buckets=(0.1, 1.0))
+        histogram.observe(0.05, topic="onu.events")
+        histogram.observe(0.5, topic="onu.events")
+        histogram.observe(5, topic="onu.events")
+
+        self.assertEqual(histogram.get_count(topic="onu.events"), 3)
+        self.assertEqual(self.registry.render(),
+                         '# HELP test_seconds A histogram\n'
+                         '# TYPE test_seconds histogram\n'
+                         'test_seconds_bucket{topic="onu.events",le="0.1"} 1.0\n'
+                         'test_seconds_bucket{topic="onu.events",le="1.0"} 2.0\n'
+                         'test_seconds_bucket{topic="onu.events",le="+Inf"} 3.0\n'
+                         'test_seconds_sum{topic="onu.events"} 5.55\n'
+                         'test_seconds_count{topic="onu.events"} 3.0\n')
+
+    def test_timed(self):
+        histogram = self.registry.histogram("test_seconds", "A histogram", ["topic"])
+
+        @histogram.timed(topic="onu.events")
+        def process(value):
+            if value is None:
+                raise ValueError()
+            return value
+
+        self.assertEqual(process(42), 42)
+        with self.assertRaises(ValueError):
+            process(None)
+        # failed calls are measured too
+        self.assertEqual(histogram.get_count(topic="onu.events"), 2)
+
+    def test_stats(self):
+        self.registry.register_stats("test_pending", "Pending events",
+                                     lambda: {"parked": 2, "oldest_age": 1.5, "name": "skipped"})
+
+        self.assertEqual(self.registry.render(),
+                         '# HELP test_pending_oldest_age Pending events: oldest_age\n'
+                         '# TYPE test_pending_oldest_age gauge\n'
+                         'test_pending_oldest_age 1.5\n'
+                         '# HELP test_pending_parked Pending events: parked\n'
+                         '# TYPE test_pending_parked gauge\n'
+                         'test_pending_parked 2.0\n')
+
+    def test_labelled_stats(self):
+        self.registry.register_stats("test_shards", "Event shards",
+                                     lambda: {"queue_depth": {"0": 3, "1": 0}, "shards": 2}, labelname="shard")
+
+        self.assertEqual(self.registry.render(),
+                         '# HELP test_shards_queue_depth Event shards: queue_depth\n'
+                         '# TYPE test_shards_queue_depth gauge\n'
+                         'test_shards_queue_depth{shard="0"} 3.0\n'
+                         'test_shards_queue_depth{shard="1"} 0.0\n'
+                         '# HELP test_shards_shards Event shards: shards\n'
+                         '# TYPE test_shards_shards gauge\n'
+                         'test_shards_shards 2.0\n')
+
+    def test_escape_labels(self):
+        counter = self.registry.counter("test_total", "A counter", ["serial"])
+        counter.inc(serial='a"b\\c')
+
+        self.assertIn('test_total{serial="a\\"b\\\\c"} 1.0', self.registry.render())
+
+    def test_register_again(self):
+        self.registry.counter("test_total", "A counter")
+        counter = self.registry.counter("test_total", "A counter")
+        counter.inc()
+
+        self.assertEqual(self.registry.render().count("# TYPE test_total"), 1)
+
+    def test_server(self):
+        self.metrics.MetricsHandler.registry = self.registry
+        self.registry.counter("test_total", "A counter").inc()
+        server = self.metrics.start_metrics_server(port=0, host="127.0.0.1")
+        try:
+            url = "http://127.0.0.1:%s" % server.server_port
+            response = urllib2.urlopen(url + "/metrics")
+            self.assertTrue(response.info()["Content-Type"].startswith("text/plain; version=0.0.4"))
+            self.assertIn("test_total 1.0", response.read())
+
+            with self.assertRaises(urllib2.HTTPError):
+                urllib2.urlopen(url + "/other")
+        finally:
+            server.shutdown()
+            server.server_close()
+            self.metrics.MetricsHandler.registry = self.metrics.registry
+
+
+if __name__ == '__main__':
+    unittest.main()
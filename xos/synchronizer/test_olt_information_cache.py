@@ -0,0 +1,122 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from mock import Mock
+
+import os, sys
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestOltInformationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        import technology_profile
+        import olt_information_cache
+
+        self.clock = FakeClock()
+        self.technology_profile = technology_profile.TechnologyProfileCache(clock=self.clock)
+        self.cache = olt_information_cache.OltInformationCache(technology_profile=self.technology_profile)
+
+        self.profile = Mock(id=1, profile_id=64,
+                            profile_value='{"profile_type": "EPON","epon_attribute": {"package_type": "A"}}')
+        self.model_accessor = Mock()
+        self.model_accessor.TechnologyProfile.objects.get.return_value = self.profile
+
+        self.oi = Mock(id=1, of_dpid="of:109299321", port_no=1234, olt_package="A")
+
+    def tearDown(self):
+        sys.path = self.sys_path_save
+
+    def put(self, oi):
+        self.cache.put(oi, self.technology_profile.resolve(self.model_accessor)[1])
+
+    def test_miss(self):
+        self.assertIsNone(self.cache.get(self.model_accessor, "of:109299321"))
+        self.assertEqual(self.cache.get_stats(), {"entries": 0, "hits": 0, "misses": 1})
+        # an unknown OLT doesn't query the TechnologyProfile
+        self.model_accessor.TechnologyProfile.objects.get.assert_not_called()
+
+    def test_hit(self):
+        self.put(self.oi)
+
+        for i in range(3):
+            self.assertEqual(self.cache.get(self.model_accessor, "of:109299321"), self.oi)
+        self.assertIsNone(self.cache.get(self.model_accessor, "of:2"))
+
+        self.assertEqual(self.cache.get_stats(), {"entries": 1, "hits": 3, "misses": 1})
+        self.assertEqual(self.model_accessor.TechnologyProfile.objects.get.call_count, 1)
+
+    def test_invalidated_by_technology_profile_change(self):
+        self.put(self.oi)
+
+        self.profile.profile_value = '{"profile_type": "EPON","epon_attribute": {"package_type": "B"}}'
+        self.clock.now += self.technology_profile.check_interval
+
+        self.assertIsNone(self.cache.get(self.model_accessor, "of:109299321"))
+
+    def test_not_invalidated_by_unchanged_technology_profile(self):
+        self.put(self.oi)
+        self.clock.now += self.technology_profile.check_interval
+
+        self.assertEqual(self.cache.get(self.model_accessor, "of:109299321"), self.oi)
+
+    def test_put_with_previous_generation(self):
+        generation = self.technology_profile.generation
+        self.technology_profile.resolve(self.model_accessor)
+        self.cache.put(self.oi, generation)
+
+        self.assertIsNone(self.cache.get(self.model_accessor, "of:109299321"))
+
+    def test_update(self):
+        self.put(self.oi)
+
+        newer = Mock(id=1, of_dpid="of:109299321", port_no=5678, olt_package="A")
+        self.cache.update(newer)
+        self.assertEqual(self.cache.get(self.model_accessor, "of:109299321"), newer)
+
+        # an OLT that isn't cached isn't added, its package hasn't been resolved
+        self.cache.update(Mock(id=2, of_dpid="of:2"))
+        self.assertEqual(len(self.cache), 1)
+
+    def test_update_of_dpid(self):
+        self.put(self.oi)
+
+        self.cache.update(Mock(id=1, of_dpid="of:2"))
+
+        self.assertEqual(len(self.cache), 0)
+
+    def test_remove(self):
+        self.put(self.oi)
+
+        self.cache.remove(Mock(id=2, of_dpid="of:109299321"))
+        self.assertEqual(len(self.cache), 1)
+
+        self.cache.remove(self.oi)
+        self.assertEqual(len(self.cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,241 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from mock import Mock
+import base64
+import json
+import threading
+import time
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+
+import os, sys
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class StubOnosHandler(BaseHTTPRequestHandler):
+    # keep-alive needs HTTP/1.1 and a Content-Length on every response
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body=""):
+        self.server.requests.append((self.command, self.path, self.headers.get("Authorization")))
+        self.server.client_ports.add(self.client_address[1])
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.reply(self.server.post_status, "ok")
+
+    def do_DELETE(self):
+        self.reply(self.server.delete_status)
+
+    def do_GET(self):
+        self.reply(self.server.get_status, self.server.get_body)
+
+
+class StubOnosServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), StubOnosHandler)
+        self.requests = []
+        self.client_ports = set()
+        self.delay = 0
+        self.post_status = 200
+        self.delete_status = 204
+        self.get_status = 200
+        self.get_body = '{"entries": []}'
+
+    def handle_error(self, request, client_address):
+        # the client going away on a read timeout is expected
+        pass
+
+
+class TestOnosClient(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        self.server = StubOnosServer()
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+
+        import onos_client
+        self.onos_client = onos_client
+        self.client = onos_client.OnosClient("127.0.0.1", self.server.server_address[1], "karaf", "karaf",
+                                             connect_timeout=1, read_timeout=0.5)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        sys.path = self.sys_path_save
+
+    def test_add_subscriber(self):
+        self.client.add_subscriber("of:1234", 16)
+
+        (method, path, auth) = self.server.requests[0]
+        self.assertEqual(method, "POST")
+        self.assertEqual(path, "/onos/olt/oltapp/of:1234/16")
+        self.assertEqual(auth, "Basic %s" % base64.b64encode("karaf:karaf"))
+
+    def test_add_subscriber_failure(self):
+        self.server.post_status = 500
+
+        with self.assertRaises(Exception) as e:
+            self.client.add_subscriber("of:1234", 16)
+
+        self.assertEqual(e.exception.message, "Failed to add subscriber in onos-voltha: ok")
+
+    def test_remove_subscriber(self):
+        self.client.remove_subscriber("of:1234", 16)
+
+        (method, path, auth) = self.server.requests[0]
+        self.assertEqual(method, "DELETE")
+        self.assertEqual(path, "/onos/olt/oltapp/of:1234/16")
+
+    def test_get_subscribers(self):
+        self.server.get_body = json.dumps({"entries": [
+            {"location": "of:1234/16", "tagInfo": {}},
+            {"location": "of:1234/17", "tagInfo": {}},
+            {"location": "of:5678/16", "tagInfo": {}},
+        ]})
+
+        self.assertEqual(self.client.get_subscribers("of:1234"), set([16, 17]))
+
+        (method, path, auth) = self.server.requests[0]
+        self.assertEqual(method, "GET")
+        self.assertEqual(path, "/onos/olt/oltapp/programmed-subscribers?deviceId=of%3A1234")
+
+    def test_get_subscribers_failure(self):
+        self.server.get_status = 404
+        self.server.get_body = "not found"
+
+        with self.assertRaises(Exception) as e:
+            self.client.get_subscribers("of:1234")
+
+        self.assertEqual(e.exception.message, "Failed to get the subscribers from onos-voltha: not found")
+
+    def test_connection_reuse(self):
+        for i in range(10):
+            self.client.add_subscriber("of:1234", i)
+            self.client.remove_subscriber("of:1234", i)
+
+        self.assertEqual(len(self.server.requests), 20)
+        self.assertEqual(len(self.server.client_ports), 1)
+
+    def test_read_timeout(self):
+        import requests
+        self.server.delay = 1
+
+        with self.assertRaises(requests.exceptions.Timeout):
+            self.client.add_subscriber("of:1234", 16)
+
+        stats = self.client.get_stats()["add_subscriber"]
+        self.assertEqual(stats["count"], 1)
+        self.assertEqual(stats["failures"], 1)
+
+    def test_latency_counters(self):
+        from metrics import onos_latency, onos_responses_total
+        requests_count = onos_latency.get_count(operation="add_subscriber")
+        not_found = onos_responses_total.get(operation="remove_subscriber", code=404)
+
+        self.client.add_subscriber("of:1234", 16)
+        self.client.add_subscriber("of:1234", 17)
+        self.server.delete_status = 404
+        with self.assertRaises(Exception):
+            self.client.remove_subscriber("of:1234", 16)
+
+        stats = self.client.get_stats()
+        self.assertEqual(stats["add_subscriber"]["count"], 2)
+        self.assertEqual(stats["add_subscriber"]["status_codes"], {200: 2})
+        self.assertEqual(stats["remove_subscriber"]["status_codes"], {404: 1})
+        self.assertTrue(stats["add_subscriber"]["max_time"] > 0)
+
+        # the same requests are exposed as Prometheus metrics
+        self.assertEqual(onos_latency.get_count(operation="add_subscriber"), requests_count + 2)
+        self.assertEqual(onos_responses_total.get(operation="remove_subscriber", code=404), not_found + 1)
+
+    def test_circuit_breaker(self):
+        from circuit_breaker import CircuitOpenError
+        self.server.post_status = 503
+
+        for i in range(self.client.breaker.failure_threshold):
+            with self.assertRaises(Exception):
+                self.client.add_subscriber("of:1234", 16)
+
+        # ONOS isn't called while the breaker is open
+        with self.assertRaises(CircuitOpenError) as e:
+            self.client.add_subscriber("of:1234", 16)
+        self.assertTrue(e.exception.retry_in > 0)
+        self.assertEqual(len(self.server.requests), self.client.breaker.failure_threshold)
+
+        # the probe succeeds once ONOS is back
+        self.server.post_status = 200
+        self.client.breaker.retry_at = 0
+        self.client.add_subscriber("of:1234", 16)
+        self.client.add_subscriber("of:1234", 17)
+        self.assertEqual(self.client.breaker.get_stats()["state"], "closed")
+
+    def test_unexpected_error_releases_the_probe(self):
+        self.server.post_status = 503
+        for i in range(self.client.breaker.failure_threshold):
+            with self.assertRaises(Exception):
+                self.client.add_subscriber("of:1234", 16)
+        self.client.breaker.retry_at = 0
+
+        # the probe fails with an error that isn't a RequestException
+        request = self.client.session.request
+        self.client.session.request = Mock(side_effect=ValueError("boom"))
+        with self.assertRaises(ValueError):
+            self.client.add_subscriber("of:1234", 16)
+        self.client.session.request = request
+
+        # the next call probes ONOS
+        self.server.post_status = 200
+        self.client.add_subscriber("of:1234", 16)
+        self.assertEqual(self.client.breaker.get_stats()["state"], "closed")
+
+    def test_client_errors_dont_open_the_breaker(self):
+        self.server.delete_status = 404
+
+        for i in range(self.client.breaker.failure_threshold + 1):
+            with self.assertRaises(Exception):
+                self.client.remove_subscriber("of:1234", 16)
+
+        self.assertEqual(self.client.breaker.get_stats()["state"], "closed")
+
+    def test_get_onos_client(self):
+        service = Mock(onos_voltha_url="onos", onos_voltha_port=8181,
+                       onos_voltha_user="karaf", onos_voltha_pass="karaf")
+
+        client = self.onos_client.get_onos_client(service)
+        self.assertEqual(client.base_url, "http://onos:8181")
+        self.assertIs(self.onos_client.get_onos_client(service), client)
+
+        service.onos_voltha_pass = "rocks"
+        self.assertIsNot(self.onos_client.get_onos_client(service), client)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from mock import Mock, patch
+import threading
+
+import os, sys
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class TestOnosDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        from onos_dispatcher import OnosDispatcher
+
+        self.log = Mock()
+        self.dispatcher = OnosDispatcher(max_workers=4)
+
+    def tearDown(self):
+        sys.path = self.sys_path_save
+
+    def test_max_workers_setting(self):
+        from onos_dispatcher import OnosDispatcher
+
+        # the limit is read when the workers are started
+        dispatcher = OnosDispatcher()
+        with patch.object(OnosDispatcher, "max_workers", 2):
+            dispatcher.submit("of:1234/16", lambda: "response", self.log)
+            self.assertTrue(dispatcher.join(5))
+        self.assertEqual(len(dispatcher.workers), 2)
+
+    def test_callback(self):
+        callback = Mock()
+        self.dispatcher.submit("of:1234/16", lambda: "response", self.log, callback)
+
+        self.assertTrue(self.dispatcher.join(5))
+        callback.assert_called_once_with("response", None)
+        self.assertEqual(self.dispatcher.get_stats()["completed"], 1)
+
+    def test_failure(self):
+        error = Exception("boom")
+        callback = Mock()
+        self.dispatcher.submit("of:1234/16", Mock(side_effect=error), self.log, callback)
+
+        self.assertTrue(self.dispatcher.join(5))
+        callback.assert_called_once_with(None, error)
+        self.assertEqual(self.dispatcher.get_stats()["failed"], 1)
+
+    def test_is_active(self):
+        release = threading.Event()
+        self.dispatcher.submit("of:1234/16", release.wait, self.log)
+
+        self.assertTrue(self.dispatcher.is_active("of:1234/16"))
+        self.assertFalse(self.dispatcher.is_active("of:1234/17"))
+
+        release.set()
+        self.assertTrue(self.dispatcher.join(5))
+        self.assertFalse(self.dispatcher.is_active("of:1234/16"))
+
+    def test_hold_while_breaker_open(self):
+        from circuit_breaker import CircuitOpenError
+        self.dispatcher.hold_poll = 0.01
+        available = threading.Event()
+        calls = []
+
+        def call(name):
+            def onos_call():
+                if not available.is_set():
+                    raise CircuitOpenError("ONOS is unavailable", 0.01)
+                calls.append(name)
+            return onos_call
+
+        callback = Mock()
+        self.dispatcher.submit("of:1234/16", call("add"), self.log, callback)
+        self.dispatcher.submit("of:1234/16", call("remove"), self.log, callback)
+        # the calls that don't go to ONOS keep flowing
+        other = Mock()
+        self.dispatcher.submit("of:1234/17", lambda: "other", self.log, other)
+
+        self.assertFalse(self.dispatcher.join(0.1))
+        other.assert_called_once_with("other", None)
+        callback.assert_not_called()
+        self.assertEqual(self.dispatcher.get_stats()["held"], 1)
+
+        available.set()
+        self.assertTrue(self.dispatcher.join(5))
+        # the held calls are not reported as failures and keep their order
+        self.assertEqual(calls, ["add", "remove"])
+        self.assertEqual(callback.call_count, 2)
+        self.assertEqual(self.dispatcher.get_stats()["failed"], 0)
+        self.log.exception.assert_not_called()
+
+    def test_probe_held_calls(self):
+        from circuit_breaker import CircuitOpenError
+        self.dispatcher.hold_poll = 0.01
+        available = threading.Event()
+        attempts = []
+
+        def call():
+            attempts.append(1)
+            if not available.is_set():
+                raise CircuitOpenError("ONOS is unavailable", 0.01)
+
+        for i in range(100):
+            self.dispatcher.submit("of:1234/%s" % i, call, self.log)
+        self.assertFalse(self.dispatcher.join(0.3))
+
+        # a single call is sent to probe ONOS at a time, the held calls aren't all tried again
+        self.assertEqual(self.dispatcher.get_stats()["held"], 100)
+        self.assertLess(len(attempts), 100 + 60)
+
+        available.set()
+        self.assertTrue(self.dispatcher.join(5))
+        self.assertEqual(self.dispatcher.get_stats()["completed"], 100)
+
+    def test_failed_probe(self):
+        from circuit_breaker import CircuitOpenError
+        self.dispatcher.hold_poll = 0.01
+        held = threading.Event()
+        results = [CircuitOpenError("ONOS is unavailable", 0.01), CircuitOpenError("ONOS is unavailable", 0.01),
+                   Exception("ONOS is down")]
+        callback = Mock()
+
+        def call(name):
+            def onos_call():
+                held.wait()
+                if results:
+                    raise results.pop(0)
+                return name
+            return onos_call
+
+        self.dispatcher.submit("of:1234/16", call("first"), self.log, callback)
+        self.dispatcher.submit("of:1234/17", call("second"), self.log, callback)
+        held.set()
+
+        # the first call probes ONOS and fails, the second one is still sent
+        self.assertTrue(self.dispatcher.join(5))
+        self.assertEqual(callback.call_count, 2)
+        self.assertEqual(len([c for c in callback.call_args_list if c[0][1] is None]), 1)
+        self.assertEqual(self.dispatcher.get_stats()["held"], 0)
+
+    def test_parallel_calls(self):
+        # all the calls block until every worker is busy, this only completes if they run in parallel
+        barrier = threading.Semaphore(0)
+        started = []
+        lock = threading.Lock()
+
+        def call():
+            with lock:
+                started.append(1)
+                if len(started) == 4:
+                    for _ in range(4):
+                        barrier.release()
+            barrier.acquire()
+
+        for i in range(4):
+            self.dispatcher.submit("of:1234/%s" % i, call, self.log)
+
+        self.assertTrue(self.dispatcher.join(5))
+        self.assertEqual(self.dispatcher.get_stats()["completed"], 4)
+
+    def test_one_call_per_subscriber(self):
+        calls = []
+        in_flight = []
+        lock = threading.Lock()
+
+        def call(name):
+            def run():
+                with lock:
+                    in_flight.append(name)
+                    self.assertEqual(len(in_flight), 1)
+                calls.append(name)
+                with lock:
+                    in_flight.remove(name)
+            return run
+
+        for name in ["add", "remove", "add", "remove", "add"]:
+            self.dispatcher.submit("of:1234/16", call(name), self.log)
+
+        self.assertTrue(self.dispatcher.join(5))
+        self.assertEqual(calls, ["add", "remove", "add", "remove", "add"])
+        self.assertEqual(self.dispatcher.get_stats()["active_subscribers"], 0)
+
+    def test_join_timeout(self):
+        release = threading.Event()
+        self.dispatcher.submit("of:1234/16", release.wait, self.log)
+
+        self.assertFalse(self.dispatcher.join(0.05))
+        self.assertEqual(self.dispatcher.get_stats()["pending"], 1)
+
+        release.set()
+        self.assertTrue(self.dispatcher.join(5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from mock import Mock
+
+import os, sys
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class TestOnuIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        from onu_index import OnuIndex, normalize_serial
+        self.index = OnuIndex()
+        self.normalize_serial = normalize_serial
+
+        self.onus = [Mock(id=1, serial_number="BRCM1234"), Mock(id=2, serial_number="ALPHe3d1cfde")]
+
+        def filter(**kwargs):
+            if "id" in kwargs:
+                return [o for o in self.onus if o.id == kwargs["id"]]
+            if "serial_number" in kwargs:
+                return [o for o in self.onus if o.serial_number == kwargs["serial_number"]]
+            return [o for o in self.onus if o.serial_number.lower() == kwargs["serial_number__iexact"].lower()]
+
+        self.model_accessor = Mock()
+        self.objects = self.model_accessor.ONUDevice.objects
+        self.objects.filter.side_effect = filter
+        # the API raises a NOT_FOUND error for the unknown ids
+        self.objects.get.side_effect = Exception("NOT_FOUND")
+
+    def tearDown(self):
+        sys.path = self.sys_path_save
+
+    def test_normalize_serial(self):
+        self.assertEqual(self.normalize_serial("BRCM1234-1"), "brcm1234")
+        self.assertEqual(self.normalize_serial("BRCM1234"), "brcm1234")
+
+    def test_exact_match(self):
+        self.assertEqual(self.index.get_onu(self.model_accessor, "BRCM1234-1"), self.onus[0])
+        self.objects.filter.assert_called_once_with(serial_number="BRCM1234")
+
+    def test_case_insensitive_match(self):
+        self.assertEqual(self.index.get_onu(self.model_accessor, "alphE3D1CFDE"), self.onus[1])
+
+    def test_cached_lookup_by_id(self):
+        self.index.get_onu(self.model_accessor, "brcm1234")
+        self.objects.filter.reset_mock()
+
+        self.assertEqual(self.index.get_onu(self.model_accessor, "BRCM1234-1"), self.onus[0])
+        self.objects.filter.assert_called_once_with(id=1)
+
+    def test_deleted_onu(self):
+        self.index.get_onu(self.model_accessor, "BRCM1234")
+        del self.onus[0]
+
+        with self.assertRaises(IndexError):
+            self.index.get_onu(self.model_accessor, "BRCM1234")
+
+        # an ONU that comes back with a new id is found again
+        self.onus.append(Mock(id=3, serial_number="BRCM1234"))
+        self.assertEqual(self.index.get_onu(self.model_accessor, "BRCM1234").id, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from mock import Mock
+import os, sys
+import shutil
+import tempfile
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestOltOwnership(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        import ownership
+        self.ownership = ownership
+
+        self.tmpdir = tempfile.mkdtemp()
+        self.log = Mock()
+        self.olts = ["of:%016x" % i for i in range(300)]
+        self.replicas = []
+
+    def tearDown(self):
+        for replica in self.replicas:
+            replica.stop()
+        shutil.rmtree(self.tmpdir)
+        sys.path = self.sys_path_save
+
+    def start(self, name):
+        replica = self.ownership.OltOwnership()
+        replica.start(name, self.log, lease_dir=self.tmpdir)
+        self.replicas.append(replica)
+        return replica
+
+    def owned(self, replica):
+        return set(olt for olt in self.olts if replica.owns(olt))
+
+    def test_rendezvous_owner(self):
+        replicas = ["ntt-0", "ntt-1", "ntt-2"]
+        owners = dict((olt, self.ownership.rendezvous_owner(replicas, olt)) for olt in self.olts)
+
+        # the OLTs are spread over the replicas
+        for replica in replicas:
+            self.assertTrue(60 < owners.values().count(replica) < 140)
+
+        # only the OLTs of the new replica change owner
+        for olt in self.olts:
+            owner = self.ownership.rendezvous_owner(replicas + ["ntt-3"], olt)
+            self.assertIn(owner, [owners[olt], "ntt-3"])
+
+    def test_lease_directory(self):
+        clock = FakeClock()
+        leases = self.ownership.LeaseDirectory(self.tmpdir, ttl=30, clock=clock)
+        leases.renew("ntt-0")
+        leases.renew("ntt-1")
+        self.assertEqual(leases.replicas(), ["ntt-0", "ntt-1"])
+
+        clock.now += 20
+        leases.renew("ntt-1")
+        clock.now += 20
+        # the lease of ntt-0 expired
+        self.assertEqual(leases.replicas(), ["ntt-1"])
+
+        leases.release("ntt-1")
+        self.assertEqual(leases.replicas(), [])
+
+    def test_disabled(self):
+        ownership = self.ownership.OltOwnership()
+
+        self.assertFalse(ownership.enabled)
+        self.assertEqual(self.owned(ownership), set(self.olts))
+        self.assertFalse(ownership.skip("of:1"))
+        self.assertEqual(ownership.consumer_group("ntt-workflow-driver"), "ntt-workflow-driver")
+        fetch_policies = Mock(return_value=[Mock(model_name="NttWorkflowDriverServiceInstance")])
+        self.assertEqual(ownership.filter_policies(fetch_policies)([]), fetch_policies.return_value)
+
+    def test_partition(self):
+        first = self.start("ntt-0")
+        self.assertEqual(self.owned(first), set(self.olts))
+
+        second = self.start("ntt-1")
+        first.refresh()
+
+        self.assertEqual(first.get_stats()["replicas"], 2)
+        self.assertFalse(self.owned(first) & self.owned(second))
+        self.assertEqual(self.owned(first) | self.owned(second), set(self.olts))
+
+        self.assertEqual(first.consumer_group("ntt-workflow-driver"), "ntt-workflow-driver-ntt-0")
+        self.assertEqual(second.consumer_group("ntt-workflow-driver"), "ntt-workflow-driver-ntt-1")
+
+    def test_filter_policies(self):
+        first = self.start("ntt-0")
+        second = self.start("ntt-1")
+        first.refresh()
+
+        olt = sorted(self.owned(second))[0]
+        models = [Mock(model_name="NttWorkflowDriverServiceInstance", of_dpid=olt),
+                  Mock(model_name="NttWorkflowDriverOltInformation", of_dpid=olt),
+                  Mock(model_name="NttWorkflowDriverWhiteListEntry")]
+        fetch_policies = Mock(return_value=models)
+
+        # the models of the OLT are only policed by its owner, the whitelist entries by any replica
+        self.assertEqual(first.filter_policies(fetch_policies)(["models"], True), models[2:])
+        fetch_policies.assert_called_with(["models"], True)
+        self.assertEqual(second.filter_policies(fetch_policies)(["models"]), models)
+
+    def test_rebalance(self):
+        first = self.start("ntt-0")
+        listener = Mock()
+        first.on_rebalance(listener)
+
+        second = self.start("ntt-1")
+        self.assertTrue(first.refresh())
+        listener.assert_called_once()
+        self.assertFalse(first.refresh())
+
+        owned = self.owned(first)
+        self.assertTrue(first.skip(list(self.owned(second))[0]))
+        self.assertEqual(first.get_stats()["skipped_events"], 1)
+
+        # the OLTs of a replica that leaves are taken over
+        second.stop()
+        self.assertTrue(first.refresh())
+        self.assertEqual(listener.call_count, 2)
+        self.assertEqual(self.owned(first), set(self.olts))
+        self.assertTrue(owned < self.owned(first))
+
+
+if __name__ == '__main__':
+    unittest.main()
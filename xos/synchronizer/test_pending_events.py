@@ -0,0 +1,186 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import unittest
+from mock import Mock, patch
+
+import os, sys
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPendingEventStore(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        from xossynchronizer.steps.syncstep import DeferredException
+        self.DeferredException = DeferredException
+
+        import pending_events
+        self.pending_events = pending_events
+
+        self.clock = FakeClock()
+        self.store = pending_events.PendingEventStore(clock=self.clock)
+        self.store._ensure_worker = Mock()
+
+        self.log = Mock()
+        self.model_accessor = Mock()
+        self.known_onus = set()
+        self.handled = []
+
+    def tearDown(self):
+        sys.path = self.sys_path_save
+
+    def handler(self, value):
+        if value["serialNumber"].split("-")[0].lower() not in self.known_onus:
+            raise self.DeferredException("ONU device %s is not know to XOS yet" % value["serialNumber"])
+        self.handled.append(value["id"])
+
+    def process(self, serial_number, id):
+        return self.store.process(self.model_accessor, self.log, serial_number, self.handler,
+                                  {"serialNumber": serial_number, "id": id})
+
+    def test_known_onu_is_processed(self):
+        self.known_onus.add("brcm1234")
+
+        self.assertTrue(self.process("BRCM1234", 1))
+        self.assertEqual(self.handled, [1])
+        self.assertEqual(self.store.get_stats()["parked"], 0)
+
+    def test_unknown_onu_is_parked_and_replayed_in_order(self):
+        self.assertFalse(self.process("BRCM1234", 1))
+        self.known_onus.add("brcm1234")
+
+        # a later event for the same ONU waits behind the parked one
+        self.assertFalse(self.process("BRCM1234-1", 2))
+        self.assertEqual(self.handled, [])
+
+        # events for other ONUs are not blocked
+        self.known_onus.add("alph0001")
+        self.assertTrue(self.process("ALPH0001", 3))
+
+        self.assertEqual(self.store.replay("BRCM1234"), 2)
+        self.assertEqual(self.handled, [3, 1, 2])
+        self.assertFalse(self.store.is_parked("BRCM1234"))
+
+        stats = self.store.get_stats()
+        self.assertEqual(stats["parked_total"], 2)
+        self.assertEqual(stats["replayed_total"], 2)
+
+    def test_replay_keeps_events_parked_if_onu_still_unknown(self):
+        self.process("BRCM1234", 1)
+
+        self.assertEqual(self.store.replay("BRCM1234"), 0)
+        self.assertTrue(self.store.is_parked("BRCM1234"))
+
+    def test_check_replays_known_onus(self):
+        self.process("BRCM1234", 1)
+        self.process("ALPH0001", 2)
+        self.known_onus.add("brcm1234")
+
+        def get_onu(model_accessor, serial_number):
+            if serial_number.lower() not in self.known_onus:
+                raise IndexError()
+            return Mock()
+
+        with patch.object(self.pending_events.onu_index, "get_onu", side_effect=get_onu):
+            self.store.check(self.model_accessor)
+
+        self.assertEqual(self.handled, [1])
+        self.assertTrue(self.store.is_parked("ALPH0001"))
+
+    def test_replay_serialized_with_events_of_the_olt(self):
+        self.store.process(self.model_accessor, self.log, "BRCM1234", self.handler,
+                           {"serialNumber": "BRCM1234", "deviceId": "of:0001", "id": 1})
+        self.known_onus.update(["brcm1234", "alph0001"])
+
+        replaying = threading.Event()
+        release = threading.Event()
+
+        def blocking_handler(value):
+            replaying.set()
+            release.wait(5)
+            self.handler(value)
+        self.store.events["brcm1234"][0].handler = blocking_handler
+
+        replay = threading.Thread(target=self.store.replay, args=("BRCM1234",))
+        replay.start()
+        self.assertTrue(replaying.wait(5))
+
+        # an event of the same OLT, processed by an event step while the parked event is replayed
+        event = threading.Thread(target=self.store.process, args=(
+            self.model_accessor, self.log, "ALPH0001", self.handler,
+            {"serialNumber": "ALPH0001", "deviceId": "of:0001", "id": 2}))
+        event.start()
+        event.join(0.2)
+        self.assertTrue(event.is_alive())
+        self.assertEqual(self.handled, [])
+
+        # the events of the other OLTs aren't blocked
+        self.known_onus.add("brcm5678")
+        self.store.process(self.model_accessor, self.log, "BRCM5678", self.handler,
+                           {"serialNumber": "BRCM5678", "deviceId": "of:0002", "id": 3})
+        self.assertEqual(self.handled, [3])
+
+        release.set()
+        replay.join(5)
+        event.join(5)
+        self.assertEqual(self.handled, [3, 1, 2])
+
+    def test_serialized_batch(self):
+        values = [{"serialNumber": "BRCM1234", "deviceId": "of:0002"},
+                  {"serialNumber": "ALPH0001", "deviceId": "of:0001"},
+                  {"serialNumber": "BRCM5678", "deviceId": "of:0002"}]
+
+        with self.store.serialized(values):
+            # held by this thread, not by the others
+            acquired = []
+            thread = threading.Thread(target=lambda: acquired.append(
+                self.store.event_lock({"deviceId": "of:0001"}).acquire(False)))
+            thread.start()
+            thread.join(5)
+            self.assertEqual(acquired, [False])
+
+        lock = self.store.event_lock({"deviceId": "of:0001"})
+        self.assertTrue(lock.acquire(False))
+        lock.release()
+
+    def test_ttl(self):
+        self.process("BRCM1234", 1)
+        self.clock.now += self.store.ttl / 2
+        self.process("ALPH0001", 2)
+
+        self.clock.now += self.store.ttl / 2 + 1
+        self.assertEqual(self.store.expire(), 1)
+        self.assertFalse(self.store.is_parked("BRCM1234"))
+        self.assertTrue(self.store.is_parked("ALPH0001"))
+
+        stats = self.store.get_stats()
+        self.assertEqual(stats["parked"], 1)
+        self.assertEqual(stats["expired_total"], 1)
+        self.assertEqual(stats["oldest_age"], self.store.ttl / 2 + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import random
+
+import os, sys
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+def brute_force(ranges, port_no):
+    return any(f is not None and t is not None and f <= port_no <= t for (f, t) in ranges.values())
+
+
+class TestPonPortRanges(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        from pon_port_ranges import PonPortRanges
+        self.ranges = PonPortRanges()
+
+    def tearDown(self):
+        sys.path = self.sys_path_save
+
+    def test_empty(self):
+        self.assertFalse(self.ranges.contains(0))
+        self.assertEqual(self.ranges.intervals(), [])
+        self.assertEqual(len(self.ranges), 0)
+
+    def test_bounds_are_inclusive(self):
+        self.ranges.add(1, 10, 20)
+
+        self.assertFalse(self.ranges.contains(9))
+        self.assertTrue(self.ranges.contains(10))
+        self.assertTrue(self.ranges.contains(20))
+        self.assertFalse(self.ranges.contains(21))
+
+    def test_merge(self):
+        self.ranges.add(1, 10, 20)
+        self.ranges.add(2, 15, 30)
+        self.ranges.add(3, 31, 35)
+        self.ranges.add(4, 40, 50)
+        self.ranges.add(5, 42, 45)
+
+        self.assertEqual(self.ranges.intervals(), [(10, 35), (40, 50)])
+
+        # removing an overlapping entry keeps the ports of the others
+        self.ranges.remove(2)
+        self.assertEqual(self.ranges.intervals(), [(10, 20), (31, 35), (40, 50)])
+        self.ranges.remove(4)
+        self.assertEqual(self.ranges.intervals(), [(10, 20), (31, 35), (42, 45)])
+
+    def test_update_entry(self):
+        self.ranges.add(1, 10, 20)
+        self.ranges.add(1, 30, 40)
+
+        self.assertFalse(self.ranges.contains(15))
+        self.assertTrue(self.ranges.contains(35))
+        self.assertEqual(len(self.ranges), 1)
+
+    def test_invalid_ranges(self):
+        self.ranges.add(1, 20, 10)
+        self.ranges.add(2, None, None)
+
+        self.assertEqual(self.ranges.intervals(), [])
+        self.assertFalse(self.ranges.contains(15))
+        self.assertEqual(len(self.ranges), 2)
+
+    def test_copy(self):
+        self.ranges.add(1, 10, 20)
+        copy = self.ranges.copy()
+        self.ranges.remove(1)
+
+        self.assertTrue(copy.contains(15))
+        self.assertFalse(self.ranges.contains(15))
+
+    def test_random_against_brute_force(self):
+        # seeded so that a failure can be reproduced
+        for seed in range(50):
+            rnd = random.Random(seed)
+            expected = {}
+            for _ in range(rnd.randint(1, 60)):
+                entry_id = rnd.randint(1, 20)
+                if expected and rnd.random() < 0.3:
+                    entry_id = rnd.choice(list(expected))
+                    self.ranges.remove(entry_id)
+                    del expected[entry_id]
+                    continue
+
+                pon_port_from = rnd.randint(0, 100)
+                pon_port_to = pon_port_from + rnd.randint(-5, 30)
+                self.ranges.add(entry_id, pon_port_from, pon_port_to)
+                expected[entry_id] = (pon_port_from, pon_port_to)
+
+                for port_no in range(-2, 140):
+                    self.assertEqual(self.ranges.contains(port_no), brute_force(expected, port_no),
+                                     "seed %s, port %s, ranges %s" % (seed, port_no, expected))
+
+            # the intervals are sorted and disjoint
+            intervals = self.ranges.intervals()
+            for ((f1, t1), (f2, t2)) in zip(intervals, intervals[1:]):
+                self.assertTrue(f1 <= t1 < f2 - 1 < t2)
+
+            for entry_id in list(expected):
+                self.ranges.remove(entry_id)
+            self.assertEqual(self.ranges.intervals(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
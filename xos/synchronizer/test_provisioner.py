@@ -0,0 +1,145 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from mock import Mock
+
+import os, sys
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestProvisioningScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        from provisioner import ProvisioningScheduler
+
+        self.clock = FakeClock()
+        self.log = Mock()
+        self.scheduler = ProvisioningScheduler(delay=180, retry_delay=30, clock=self.clock)
+        # never start the background worker in the tests
+        self.scheduler._ensure_worker = Mock()
+
+    def tearDown(self):
+        sys.path = self.sys_path_save
+
+    def test_job_fires_when_due(self):
+        action = Mock()
+        due = self.scheduler.schedule("of:1234/16", action, self.log)
+
+        self.assertEqual(due, 1180.0)
+        self.assertEqual(self.scheduler.run_pending(), 0)
+        action.assert_not_called()
+
+        self.clock.now = 1180.0
+        self.assertEqual(self.scheduler.run_pending(), 1)
+        action.assert_called_once()
+        self.assertFalse(self.scheduler.is_pending("of:1234/16"))
+
+    def test_reschedule_keeps_due_time(self):
+        first = Mock()
+        second = Mock()
+        self.scheduler.schedule("of:1234/16", first, self.log)
+        self.clock.now = 1100.0
+        due = self.scheduler.schedule("of:1234/16", second, self.log)
+
+        self.assertEqual(due, 1180.0)
+        self.assertEqual(self.scheduler.pending_count(), 1)
+
+        self.clock.now = 1180.0
+        self.scheduler.run_pending()
+        first.assert_not_called()
+        second.assert_called_once()
+
+    def test_many_jobs_wait_concurrently(self):
+        actions = [Mock() for i in range(128)]
+        for (i, action) in enumerate(actions):
+            self.scheduler.schedule("of:1234/%s" % i, action, self.log)
+
+        self.clock.now = 1180.0
+        self.assertEqual(self.scheduler.run_pending(), 128)
+        for action in actions:
+            action.assert_called_once()
+
+    def test_cancel(self):
+        action = Mock()
+        self.scheduler.schedule("of:1234/16", action, self.log)
+        self.assertTrue(self.scheduler.cancel("of:1234/16"))
+        self.assertFalse(self.scheduler.cancel("of:1234/16"))
+
+        self.clock.now = 1180.0
+        self.assertEqual(self.scheduler.run_pending(), 0)
+        action.assert_not_called()
+
+    def test_failed_job_is_retried(self):
+        action = Mock(side_effect=[Exception("onos is down"), None])
+        self.scheduler.schedule("of:1234/16", action, self.log)
+
+        self.clock.now = 1180.0
+        self.scheduler.run_pending()
+        self.assertTrue(self.scheduler.is_pending("of:1234/16"))
+
+        self.clock.now = 1209.0
+        self.assertEqual(self.scheduler.run_pending(), 0)
+
+        self.clock.now = 1210.0
+        self.assertEqual(self.scheduler.run_pending(), 1)
+        self.assertEqual(action.call_count, 2)
+        self.assertFalse(self.scheduler.is_pending("of:1234/16"))
+
+    def test_cancel_while_running(self):
+        def action():
+            # the ONU is disabled while the subscriber is being added
+            self.assertTrue(self.scheduler.cancel("of:1234/16"))
+            raise Exception("onos is down")
+
+        self.scheduler.schedule("of:1234/16", Mock(side_effect=action), self.log)
+
+        self.clock.now = 1180.0
+        self.assertEqual(self.scheduler.run_pending(), 1)
+        self.assertFalse(self.scheduler.is_pending("of:1234/16"))
+        self.assertFalse(self.scheduler.cancel("of:1234/16"))
+
+        self.clock.now = 1210.0
+        self.assertEqual(self.scheduler.run_pending(), 0)
+
+    def test_schedule_while_running(self):
+        retried = Mock()
+
+        def action():
+            # cancelled, then scheduled again while the first job is running
+            self.scheduler.cancel("of:1234/16")
+            self.scheduler.schedule("of:1234/16", retried, self.log, delay=0)
+            raise Exception("onos is down")
+
+        self.scheduler.schedule("of:1234/16", Mock(side_effect=action), self.log)
+
+        self.clock.now = 1180.0
+        self.scheduler.run_pending()
+        self.assertEqual(self.scheduler.run_pending(), 1)
+        retried.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
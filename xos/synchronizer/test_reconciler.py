@@ -0,0 +1,370 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from mock import Mock, patch
+import json
+import threading
+import urlparse
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+
+import os, sys
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class StubOltAppHandler(BaseHTTPRequestHandler):
+    # keep-alive needs HTTP/1.1 and a Content-Length on every response
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body=""):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def subscriber(self):
+        (of_dpid, uni_port_id) = self.path.split("/")[-2:]
+        return (of_dpid, long(uni_port_id))
+
+    def do_GET(self):
+        url = urlparse.urlparse(self.path)
+        of_dpid = urlparse.parse_qs(url.query)["deviceId"][0]
+        with self.server.lock:
+            self.server.gets.append(of_dpid)
+            if of_dpid in self.server.failing_olts:
+                self.reply(500, "boom")
+                return
+            entries = [{"location": "%s/%s" % s, "tagInfo": {}} for s in sorted(self.server.subscribers)
+                       if s[0] == of_dpid]
+        self.reply(200, json.dumps({"entries": entries}))
+
+    def do_POST(self):
+        with self.server.lock:
+            self.server.posts.append(self.subscriber())
+            self.server.subscribers.add(self.subscriber())
+        self.reply(200, "ok")
+
+    def do_DELETE(self):
+        with self.server.lock:
+            self.server.deletes.append(self.subscriber())
+            self.server.subscribers.discard(self.subscriber())
+        self.reply(204)
+
+
+class StubOltAppServer(ThreadingMixIn, HTTPServer):
+    """ The subscribers of the olt-app, kept in memory """
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), StubOltAppHandler)
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.failing_olts = set()
+        self.gets = []
+        self.posts = []
+        self.deletes = []
+
+
+class TestSubscriberReconciler(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        # Setting up the config module
+        from xosconfig import Config
+        config = os.path.join(test_path, "test_config.yaml")
+        Config.clear()
+        Config.init(config, "synchronizer-config-schema.yaml")
+        # END Setting up the config module
+
+        self.server = StubOltAppServer()
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+
+        from reconciler import SubscriberReconciler, NttHelpers
+        self.NttHelpers = NttHelpers
+
+        self.sis = []
+        service = Mock(onos_voltha_url="127.0.0.1", onos_voltha_port=self.server.server_address[1],
+                       onos_voltha_user="karaf", onos_voltha_pass="karaf")
+
+        self.model_accessor = Mock()
+        self.model_accessor.NttWorkflowDriverService.objects.first.return_value = service
+        self.model_accessor.NttWorkflowDriverServiceInstance.objects.all.side_effect = lambda: self.sis
+        self.model_accessor.NttWorkflowDriverServiceInstance.objects.filter.side_effect = self.filter_sis
+        self.package = "B"
+        self.model_accessor.TechnologyProfile.objects.get.side_effect = lambda **kwargs: Mock(
+            id=1, profile_id=64,
+            profile_value='{"profile_type": "EPON","epon_attribute": {"package_type": "%s"}}' % self.package)
+        from technology_profile import technology_profile_cache
+        technology_profile_cache.clear()
+
+        self.log = Mock()
+        self.reconciler = SubscriberReconciler(self.model_accessor, self.log, batch_size=2)
+
+    def tearDown(self):
+        self.reconciler.stop()
+        self.server.shutdown()
+        self.server.server_close()
+        sys.path = self.sys_path_save
+
+    def filter_sis(self, **kwargs):
+        return [si for si in self.sis if all(getattr(si, k) == v for (k, v) in kwargs.items())]
+
+    def add_si(self, of_dpid, uni_port_id, admin_onu_state="ENABLED", oper_onu_status="ENABLED",
+               authentication_state="APPROVED"):
+        si = Mock(of_dpid=of_dpid, uni_port_id=uni_port_id, admin_onu_state=admin_onu_state,
+                  oper_onu_status=oper_onu_status, authentication_state=authentication_state, status_message="")
+        self.sis.append(si)
+        return si
+
+    def test_in_sync(self):
+        self.add_si("of:1", 16)
+        self.add_si("of:1", 17)
+        self.server.subscribers = set([("of:1", 16), ("of:1", 17)])
+
+        stats = self.reconciler.reconcile()
+
+        self.assertEqual(self.server.gets, ["of:1"])
+        self.assertEqual(self.server.posts, [])
+        self.assertEqual(self.server.deletes, [])
+        self.assertEqual((stats["olts"], stats["added"], stats["removed"], stats["failed"]), (1, 0, 0, 0))
+        self.assertTrue(stats["seconds"] >= 0)
+
+    def test_add_missing_subscribers(self):
+        missing = self.add_si("of:1", 16)
+        self.add_si("of:1", 17)
+        self.add_si("of:2", 16)
+        self.server.subscribers = set([("of:1", 17)])
+
+        stats = self.reconciler.reconcile()
+
+        # one request per OLT
+        self.assertEqual(sorted(self.server.gets), ["of:1", "of:2"])
+        self.assertEqual(sorted(self.server.posts), [("of:1", 16), ("of:2", 16)])
+        self.assertEqual(self.server.subscribers, set([("of:1", 16), ("of:1", 17), ("of:2", 16)]))
+        self.assertEqual(stats["added"], 2)
+        self.assertEqual(missing.status_message, "Subscriber has been provisioned in ONOS")
+
+    def test_remove_stale_subscribers(self):
+        self.add_si("of:1", 16)
+        disabled = self.add_si("of:1", 17, oper_onu_status="DISABLED")
+        self.add_si("of:1", 18, admin_onu_state="DISABLED")
+        self.add_si("of:1", 19, authentication_state="DENIED")
+        # an OLT without enabled subscribers
+        self.add_si("of:2", 16, oper_onu_status="DISABLED")
+        self.server.subscribers = set([("of:1", 16), ("of:1", 17), ("of:1", 18), ("of:1", 19), ("of:2", 16)])
+
+        stats = self.reconciler.reconcile()
+
+        self.assertEqual(sorted(self.server.deletes), [("of:1", 17), ("of:1", 18), ("of:1", 19), ("of:2", 16)])
+        self.assertEqual(self.server.subscribers, set([("of:1", 16)]))
+        self.assertEqual((stats["olts"], stats["added"], stats["removed"]), (2, 0, 4))
+        self.assertEqual(disabled.status_message, "Subscriber has been removed from ONOS")
+
+    def test_unmanaged_subscribers(self):
+        self.add_si("of:1", 16)
+        self.add_si("of:1", 17, oper_onu_status="DISABLED")
+        # provisioned in the olt-app by someone else, on an OLT with and without service instances
+        self.server.subscribers = set([("of:1", 16), ("of:1", 17), ("of:1", 20), ("of:3", 16)])
+
+        stats = self.reconciler.reconcile()
+
+        self.assertEqual(self.server.gets, ["of:1"])
+        self.assertEqual(self.server.deletes, [("of:1", 17)])
+        self.assertEqual(self.server.subscribers, set([("of:1", 16), ("of:1", 20), ("of:3", 16)]))
+        self.assertEqual(stats["removed"], 1)
+
+    def test_authenticating_subscribers(self):
+        # package B: a subscriber authenticating again stays in ONOS, one not authenticated yet isn't added
+        for state in ["AWAITING", "STARTED", "REQUESTED"]:
+            self.add_si("of:1", 16, authentication_state=state)
+            self.add_si("of:1", 17, authentication_state=state)
+            self.server.subscribers = set([("of:1", 16)])
+
+            stats = self.reconciler.reconcile()
+
+            self.assertEqual(self.server.deletes, [])
+            self.assertEqual(self.server.posts, [])
+            self.assertEqual((stats["added"], stats["removed"]), (0, 0))
+            self.sis = []
+
+    def test_package_a_subscribers(self):
+        # the authentication isn't used with package A
+        self.package = "A"
+        self.add_si("of:1", 16, authentication_state="STARTED")
+
+        stats = self.reconciler.reconcile()
+
+        self.assertEqual(self.server.posts, [("of:1", 16)])
+        self.assertEqual(stats["added"], 1)
+
+    def test_batches(self):
+        for port in range(5):
+            self.add_si("of:1", port)
+        in_flight = []
+        max_in_flight = [0]
+        lock = threading.Lock()
+        add_call = self.reconciler.add_call
+
+        def counting_add_call(onos_client, of_dpid, uni_port_id):
+            call = add_call(onos_client, of_dpid, uni_port_id)
+
+            def counted():
+                with lock:
+                    in_flight.append(uni_port_id)
+                    max_in_flight[0] = max(max_in_flight[0], len(in_flight))
+                try:
+                    return call()
+                finally:
+                    with lock:
+                        in_flight.remove(uni_port_id)
+            return counted
+
+        self.reconciler.add_call = counting_add_call
+        stats = self.reconciler.reconcile()
+
+        self.assertEqual(stats["added"], 5)
+        self.assertEqual(len(self.server.subscribers), 5)
+        self.assertTrue(max_in_flight[0] <= 2)
+
+    def test_skip_busy_subscribers(self):
+        self.add_si("of:1", 16)
+        self.add_si("of:1", 17)
+        handle = self.NttHelpers.subscriber_handle("of:1", 16)
+        self.NttHelpers.provisioning_scheduler.schedule(handle, Mock(), self.log, delay=3600)
+        try:
+            stats = self.reconciler.reconcile()
+        finally:
+            self.NttHelpers.provisioning_scheduler.cancel(handle)
+
+        # the pending provisioning job adds the subscriber
+        self.assertEqual(self.server.posts, [("of:1", 17)])
+        self.assertEqual(stats["skipped"], 1)
+
+    def test_olt_failure(self):
+        self.add_si("of:1", 16)
+        self.add_si("of:2", 16)
+        self.server.failing_olts = set(["of:1"])
+
+        stats = self.reconciler.reconcile()
+
+        self.assertEqual(self.server.posts, [("of:2", 16)])
+        self.assertEqual(stats["failed"], 1)
+        self.log.exception.assert_called_once()
+
+    def test_onos_unavailable(self):
+        self.add_si("of:1", 16)
+        self.add_si("of:2", 16)
+        from onos_client import get_onos_client
+        breaker = get_onos_client(self.model_accessor.NttWorkflowDriverService.objects.first()).breaker
+        for i in range(breaker.failure_threshold):
+            breaker.record_failure()
+
+        try:
+            stats = self.reconciler.reconcile()
+        finally:
+            breaker.record_success()
+
+        self.assertEqual(self.server.gets, [])
+        self.assertEqual(self.server.posts, [])
+        self.assertEqual(stats["unavailable"], 1)
+        self.log.exception.assert_not_called()
+
+    def test_breaker_opens_during_cycle(self):
+        from circuit_breaker import CircuitOpenError
+        for port in range(16, 21):
+            self.add_si("of:1", port)
+        available = threading.Event()
+
+        def add_call(onos_client, of_dpid, uni_port_id):
+            def call():
+                # ONOS fails after the subscribers have been read, the dispatcher holds the calls
+                if not available.is_set():
+                    raise CircuitOpenError("ONOS is unavailable", 0.05)
+                return self.NttHelpers.add_subscriber(self.log, onos_client, of_dpid, uni_port_id)
+            return call
+
+        with patch.object(self.reconciler, "add_call", side_effect=add_call), \
+                patch.object(self.reconciler, "batch_timeout", 0.2):
+            stats = self.reconciler.reconcile()
+
+            # the reconciler isn't blocked by the outage, the rest of the cycle is deferred
+            self.assertEqual(stats["added"], 2)
+            self.assertEqual(stats["deferred"], 5)
+            self.assertEqual(self.server.posts, [])
+
+            available.set()
+            self.assertTrue(self.NttHelpers.onos_dispatcher.join(5))
+        # the held calls are sent once ONOS is back
+        self.assertEqual(sorted(self.server.posts), [("of:1", 16), ("of:1", 17)])
+
+    def test_only_owned_olts(self):
+        from ownership import olt_ownership
+        self.add_si("of:1", 16)
+        self.add_si("of:2", 16)
+        self.add_si("of:3", 16, oper_onu_status="DISABLED")
+        self.server.subscribers = set([("of:3", 16)])
+
+        with patch.object(olt_ownership, "owns", side_effect=lambda of_dpid: of_dpid == "of:1"):
+            stats = self.reconciler.reconcile()
+
+        self.assertEqual(self.server.gets, ["of:1"])
+        self.assertEqual(self.server.posts, [("of:1", 16)])
+        self.assertEqual(self.server.deletes, [])
+        self.assertEqual(stats["olts"], 1)
+
+    def test_stats(self):
+        from metrics import reconcile_latency, reconcile_corrections_total
+        cycles = reconcile_latency.get_count()
+        added = reconcile_corrections_total.get(operation="add", result="success")
+        self.add_si("of:1", 16)
+
+        self.reconciler.reconcile()
+
+        self.assertEqual(reconcile_latency.get_count(), cycles + 1)
+        self.assertEqual(reconcile_corrections_total.get(operation="add", result="success"), added + 1)
+        stats = self.reconciler.get_stats()
+        self.assertEqual(stats["cycles"], 1)
+        self.assertEqual(stats["last_added"], 1)
+
+    def test_periodic(self):
+        self.add_si("of:1", 16)
+        self.reconciler.interval = 0.01
+        done = threading.Event()
+        reconcile = self.reconciler.reconcile
+
+        def counting_reconcile():
+            stats = reconcile()
+            if self.reconciler.cycles >= 3:
+                done.set()
+            return stats
+
+        self.reconciler.reconcile = counting_reconcile
+        self.reconciler.start()
+
+        self.assertTrue(done.wait(5))
+        self.reconciler.stop()
+        # the subscriber is only added by the first cycle
+        self.assertEqual(self.server.posts, [("of:1", 16)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from mock import Mock
+
+import os, sys
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class TestServiceInstanceIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        from service_instance_index import ServiceInstanceIndex
+        self.index = ServiceInstanceIndex()
+
+        self.sis = {
+            1: Mock(id=1, mac_address="0A0A0A"),
+            2: Mock(id=2, mac_address="0a0a0a"),
+            3: Mock(id=3, mac_address="0b0b0b"),
+        }
+
+        def filter(id=None, mac_address__iexact=None):
+            if id is not None:
+                return [self.sis[id]] if id in self.sis else []
+            return [si for si in self.sis.values() if si.mac_address.lower() == mac_address__iexact]
+
+        self.model_accessor = Mock()
+        objects = self.model_accessor.NttWorkflowDriverServiceInstance.objects
+        objects.all.side_effect = lambda: self.sis.values()
+        objects.filter.side_effect = filter
+        # the API raises a NOT_FOUND error for the unknown ids
+        objects.get.side_effect = Exception("NOT_FOUND")
+
+    def tearDown(self):
+        sys.path = self.sys_path_save
+
+    def test_lookup(self):
+        self.assertEqual(self.index.lookup(self.model_accessor, "0a0a0a"), [self.sis[1], self.sis[2]])
+        self.assertEqual(self.index.lookup(self.model_accessor, "0B0B0B"), [self.sis[3]])
+        self.assertEqual(self.index.lookup(self.model_accessor, "0c0c0c"), [])
+
+        self.model_accessor.NttWorkflowDriverServiceInstance.objects.all.assert_called_once()
+
+    def test_update_and_remove(self):
+        self.index.lookup(self.model_accessor, "0a0a0a")
+
+        self.sis[4] = Mock(id=4, mac_address="0c0c0c")
+        self.index.update(self.sis[4])
+        self.assertEqual(self.index.lookup(self.model_accessor, "0c0c0c"), [self.sis[4]])
+
+        self.index.remove(self.sis[1])
+        self.assertEqual(self.index.lookup(self.model_accessor, "0a0a0a"), [self.sis[2]])
+
+    def test_refresh(self):
+        self.index.lookup(self.model_accessor, "0a0a0a")
+
+        # indexed by another replica
+        self.sis[4] = Mock(id=4, mac_address="0A0A0A")
+
+        self.index.refresh(self.model_accessor, "0A0A0A")
+        self.assertEqual(self.index.lookup(self.model_accessor, "0a0a0a"), [self.sis[1], self.sis[2], self.sis[4]])
+
+    def test_stale_entries_are_dropped(self):
+        self.index.lookup(self.model_accessor, "0a0a0a")
+
+        # SI 1 has been deleted and SI 2 changed MAC without the policy running yet
+        del self.sis[1]
+        self.sis[2].mac_address = "0b0b0b"
+
+        self.assertEqual(self.index.lookup(self.model_accessor, "0a0a0a"), [])
+        self.assertEqual(self.index.lookup_ids(self.model_accessor, "0b0b0b"), [2, 3])
+        self.assertEqual(len(self.index), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from mock import Mock, patch
+
+import os, sys
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTechnologyProfileCache(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        import technology_profile
+        self.technology_profile = technology_profile
+
+        self.clock = FakeClock()
+        self.cache = technology_profile.TechnologyProfileCache(clock=self.clock)
+
+        self.profile = Mock(id=1, profile_id=64,
+                            profile_value='{"profile_type": "EPON","epon_attribute": {"package_type": "A"}}')
+        self.model_accessor = Mock()
+        self.model_accessor.TechnologyProfile.objects.get.return_value = self.profile
+
+    def tearDown(self):
+        sys.path = self.sys_path_save
+
+    def test_parse_package(self):
+        self.assertEqual(self.technology_profile.parse_package(
+            '{"profile_type": "EPON","epon_attribute": {"package_type": "B"}}'), "B")
+        self.assertEqual(self.technology_profile.parse_package('{"profile_type": "GPON"}'), "GPON")
+
+    def test_profile_parsed_once(self):
+        with patch.object(self.technology_profile, "parse_package",
+                          wraps=self.technology_profile.parse_package) as parse_package:
+            for i in range(5):
+                self.assertEqual(self.cache.get_package(self.model_accessor), "A")
+                self.clock.now += self.cache.check_interval
+
+            parse_package.assert_called_once()
+
+        self.model_accessor.TechnologyProfile.objects.get.assert_called_with(profile_id=64)
+
+    def test_no_fetch_within_check_interval(self):
+        self.cache.get_package(self.model_accessor)
+        self.clock.now += self.cache.check_interval - 1
+        self.cache.get_package(self.model_accessor)
+
+        self.assertEqual(self.model_accessor.TechnologyProfile.objects.get.call_count, 1)
+
+    def test_invalidated_on_change(self):
+        self.assertEqual(self.cache.get_package(self.model_accessor), "A")
+
+        self.profile.profile_value = '{"profile_type": "EPON","epon_attribute": {"package_type": "B"}}'
+        self.clock.now += self.cache.check_interval
+
+        self.assertEqual(self.cache.get_package(self.model_accessor), "B")
+
+    def test_update(self):
+        self.assertTrue(self.cache.update(self.profile))
+        self.assertFalse(self.cache.update(self.profile))
+
+        self.assertEqual(self.cache.get_package(self.model_accessor), "A")
+        self.model_accessor.TechnologyProfile.objects.get.assert_not_called()
+
+    def test_generation(self):
+        generation = self.cache.generation
+        self.cache.update(self.profile)
+        self.assertEqual(self.cache.generation, generation + 1)
+
+        self.cache.update(self.profile)
+        self.assertEqual(self.cache.generation, generation + 1)
+
+        self.profile.profile_value = '{"profile_type": "EPON","epon_attribute": {"package_type": "B"}}'
+        self.cache.update(self.profile)
+        self.assertEqual(self.cache.generation, generation + 2)
+
+        self.cache.clear()
+        self.assertEqual(self.cache.generation, generation + 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
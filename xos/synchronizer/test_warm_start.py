@@ -0,0 +1,109 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+from mock import Mock, patch
+
+import os, sys
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class TestWarmStart(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        import warm_start
+        self.warm_start = warm_start
+        from service_instance_index import service_instance_index
+        from whitelist_index import whitelist_index
+        from onu_index import onu_index
+        from technology_profile import technology_profile_cache
+        from olt_information_cache import olt_information_cache
+        self.service_instance_index = service_instance_index
+        self.whitelist_index = whitelist_index
+        self.onu_index = onu_index
+        self.olt_information_cache = olt_information_cache
+        for cache in [service_instance_index, whitelist_index, onu_index, technology_profile_cache,
+                      olt_information_cache]:
+            cache.clear()
+
+        self.log = Mock()
+        self.model_accessor = Mock()
+        self.model_accessor.NttWorkflowDriverServiceInstance.objects.all.return_value = [
+            Mock(id=1, mac_address="0a0a0a"), Mock(id=2, mac_address="0b0b0b")]
+        self.entry = Mock(id=1, owner_id=1, mac_address="0A0A0A", pon_port_from=1, pon_port_to=10,
+                          policed=1, updated=1)
+        self.model_accessor.NttWorkflowDriverWhiteListEntry.objects.all.return_value = [self.entry]
+        self.model_accessor.NttWorkflowDriverService.objects.all.return_value = [Mock(id=1), Mock(id=2)]
+        self.onu = Mock(id=5, serial_number="BRCM1234")
+        self.model_accessor.ONUDevice.objects.all.return_value = [self.onu]
+        self.model_accessor.TechnologyProfile.objects.get.return_value = Mock(
+            id=1, profile_id=64, profile_value='{"profile_type": "EPON","epon_attribute": {"package_type": "B"}}')
+        self.oi = Mock(id=1, of_dpid="of:109299321", port_no=1234, olt_package=None)
+        self.model_accessor.NttWorkflowDriverOltInformation.objects.all.return_value = [
+            self.oi, Mock(id=2, of_dpid="of:109299322", port_no=None)]
+
+    def tearDown(self):
+        sys.path = self.sys_path_save
+
+    def test_run(self):
+        stats = self.warm_start.WarmStart(self.model_accessor, self.log).run()
+
+        self.assertEqual(stats["service_instances"], 2)
+        self.assertEqual(stats["whitelist_entries"], 1)
+        self.assertEqual(stats["onus"], 1)
+        self.assertEqual(stats["olt_information"], 1)
+        self.assertIn("seconds", stats)
+        self.assertIn("memory_kb", stats)
+        self.log.info.assert_called_once()
+
+        # the lookups don't query the data model anymore
+        self.assertEqual(self.service_instance_index.lookup_ids(self.model_accessor, "0A0A0A"), [1])
+        self.assertEqual(self.whitelist_index.lookup(self.model_accessor, 1, "0a0a0a"), [self.entry])
+        self.assertEqual(self.whitelist_index.lookup(self.model_accessor, 2, "0a0a0a"), [])
+        self.model_accessor.NttWorkflowDriverWhiteListEntry.objects.filter.assert_not_called()
+        self.model_accessor.ONUDevice.objects.filter.side_effect = lambda **kwargs: [self.onu]
+        self.assertIs(self.onu_index.get_onu(self.model_accessor, "BRCM1234-1"), self.onu)
+        # looked up by id only
+        self.model_accessor.ONUDevice.objects.filter.assert_called_once_with(id=self.onu.id)
+
+        oi = self.olt_information_cache.get(self.model_accessor, "of:109299321")
+        self.assertIs(oi, self.oi)
+        self.assertEqual(oi.olt_package, "B")
+        # the PON port of the other OLT isn't known yet
+        self.assertIsNone(self.olt_information_cache.get(self.model_accessor, "of:109299322"))
+
+    def test_failed_step(self):
+        self.model_accessor.TechnologyProfile.objects.get.side_effect = IndexError("no profile")
+
+        stats = self.warm_start.WarmStart(self.model_accessor, self.log).run()
+
+        self.assertEqual(stats["olt_information"], 0)
+        self.assertEqual(stats["onus"], 1)
+        self.log.exception.assert_called_once()
+        self.assertEqual(len(self.olt_information_cache), 0)
+
+    def test_disabled(self):
+        with patch.object(self.warm_start.WarmStart, "enabled", False), \
+            patch.object(self.warm_start.registry, "register_stats") as register_mock:
+            warm = self.warm_start.warm_start(self.model_accessor, self.log)
+
+        self.assertEqual(warm.get_stats(), {})
+        register_mock.assert_called_once_with("ntt_warm_start", "Objects preloaded at startup", warm.get_stats)
+        self.model_accessor.NttWorkflowDriverServiceInstance.objects.all.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from mock import Mock, call
+import shutil
+import tempfile
+
+import os, sys
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class TestWhitelistImport(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        # Setting up the config module
+        from xosconfig import Config
+        config = os.path.join(test_path, "test_config.yaml")
+        Config.clear()
+        Config.init(config, "synchronizer-config-schema.yaml")
+        # END Setting up the config module
+
+        import whitelist_import
+        self.whitelist_import = whitelist_import
+
+        self.tmpdir = tempfile.mkdtemp()
+
+        self.owner = Mock(id=1)
+        self.entries = [
+            Mock(id=1, owner_id=1, mac_address="0A0A0A", pon_port_from=1, pon_port_to=2),
+            Mock(id=2, owner_id=1, mac_address="0b0b0b", pon_port_from=1, pon_port_to=2),
+        ]
+
+        self.model_accessor = Mock()
+        self.model_accessor.NttWorkflowDriverWhiteListEntry.objects.filter.side_effect = \
+            lambda owner_id: [e for e in self.entries if e.owner_id == owner_id]
+
+        self.importer = whitelist_import.WhitelistImporter(self.model_accessor, Mock(), self.owner)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        sys.path = self.sys_path_save
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_load_csv(self):
+        path = self.write("whitelist.csv", "mac_address,pon_port_from,pon_port_to\n"
+                                           "0a0a0a,1,2\n"
+                                           "0c0c0c, 536870912, 536870915\n")
+
+        self.assertEqual(self.whitelist_import.load_rows(path), [
+            {"mac_address": "0a0a0a", "pon_port_from": 1, "pon_port_to": 2},
+            {"mac_address": "0c0c0c", "pon_port_from": 536870912, "pon_port_to": 536870915},
+        ])
+
+    def test_load_yaml(self):
+        path = self.write("whitelist.yaml", "whitelist:\n"
+                                            "  - mac_address: 0a0a0a\n"
+                                            "    pon_port_from: 1\n"
+                                            "    pon_port_to: 2\n")
+
+        self.assertEqual(self.whitelist_import.load_rows(path), [
+            {"mac_address": "0a0a0a", "pon_port_from": 1, "pon_port_to": 2},
+        ])
+
+    def test_load_invalid(self):
+        path = self.write("whitelist.csv", "mac_address,pon_port_from,pon_port_to\n"
+                                           "0a0a0a,1,2\n"
+                                           "0b0b0b,3,foo\n")
+        with self.assertRaises(ValueError) as e:
+            self.whitelist_import.load_rows(path)
+        self.assertIn("line 3", str(e.exception))
+
+        path = self.write("whitelist.yml", "- {mac_address: 0a0a0a, pon_port_from: 2, pon_port_to: 1}\n")
+        with self.assertRaises(ValueError):
+            self.whitelist_import.load_rows(path)
+
+        with self.assertRaises(ValueError):
+            self.whitelist_import.load_rows(self.write("whitelist.txt", ""))
+
+    def test_upsert(self):
+        rows = [
+            # unchanged
+            {"mac_address": "0a0a0a", "pon_port_from": 1, "pon_port_to": 2},
+            # new range
+            {"mac_address": "0B0B0B", "pon_port_from": 3, "pon_port_to": 4},
+            # new entry
+            {"mac_address": "0c0c0c", "pon_port_from": 1, "pon_port_to": 2},
+        ]
+
+        new_entry = self.model_accessor.NttWorkflowDriverWhiteListEntry.return_value
+        new_entry.updated = 20
+        new_entry.changed_by_step = 10
+
+        (created, updated) = self.importer.upsert(rows)
+
+        self.assertEqual((created, updated), (1, 1))
+
+        self.assertEqual(self.entries[1].pon_port_from, 3)
+        self.assertEqual(self.entries[1].pon_port_to, 4)
+        # the policies of the entries don't run
+        self.entries[1].save_changed_fields.assert_called_once_with()
+        self.entries[0].save_changed_fields.assert_not_called()
+
+        self.model_accessor.NttWorkflowDriverWhiteListEntry.assert_called_once_with(
+            owner=self.owner, mac_address="0c0c0c", pon_port_from=1, pon_port_to=2, backend_need_delete_policy=True)
+        self.assertEqual(new_entry.save.call_args_list, [call(), call(update_fields=["policed"])])
+        self.assertEqual(new_entry.policed, 20)
+
+        # the existing entries are fetched with a single query
+        self.model_accessor.NttWorkflowDriverWhiteListEntry.objects.filter.assert_called_once_with(owner_id=1)
+
+    def test_upsert_multiple_ranges(self):
+        rows = [
+            {"mac_address": "0a0a0a", "pon_port_from": 1, "pon_port_to": 2},
+            {"mac_address": "0a0a0a", "pon_port_from": 10, "pon_port_to": 20},
+            {"mac_address": "0a0a0a", "pon_port_from": 10, "pon_port_to": 20},
+        ]
+
+        (created, updated) = self.importer.upsert(rows)
+
+        # the existing range is kept, the new one is added once
+        self.assertEqual((created, updated), (1, 0))
+        self.model_accessor.NttWorkflowDriverWhiteListEntry.assert_called_once_with(
+            owner=self.owner, mac_address="0a0a0a", pon_port_from=10, pon_port_to=20, backend_need_delete_policy=True)
+        self.entries[0].save_changed_fields.assert_not_called()
+
+    def test_run(self):
+        rows = [
+            {"mac_address": "0a0a0a", "pon_port_from": 1, "pon_port_to": 2},
+            {"mac_address": "0b0b0b", "pon_port_from": 3, "pon_port_to": 4},
+            {"mac_address": "0c0c0c", "pon_port_from": 1, "pon_port_to": 2},
+        ]
+
+        stats = self.importer.run(rows)
+
+        # the SIs are validated by the policy of the service, in the synchronizer
+        self.model_accessor.NttWorkflowDriverServiceInstance.objects.all.assert_not_called()
+        self.owner.save.assert_called_once_with(update_fields=["updated"], always_update_timestamp=True)
+
+        self.assertEqual(stats["rows"], 3)
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(stats["updated"], 1)
+        self.assertEqual(stats["unchanged"], 1)
+        self.assertTrue(stats["rows_per_second"] > 0)
+
+    def test_run_unchanged(self):
+        stats = self.importer.run([{"mac_address": "0a0a0a", "pon_port_from": 1, "pon_port_to": 2}])
+
+        self.assertEqual(stats["unchanged"], 1)
+        self.owner.save.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from mock import Mock
+
+import os, sys
+
+test_path=os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+
+class TestWhitelistIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.sys_path_save = sys.path
+
+        from whitelist_index import WhitelistIndex
+        self.index = WhitelistIndex()
+
+        self.entries = [
+            Mock(id=1, owner_id=1, mac_address="0A0A0A", pon_port_from=1, pon_port_to=2, policed=1, updated=1),
+            Mock(id=2, owner_id=1, mac_address="0b0b0b", pon_port_from=1, pon_port_to=2, policed=1, updated=1),
+            Mock(id=3, owner_id=2, mac_address="0a0a0a", pon_port_from=1, pon_port_to=2, policed=1, updated=1),
+        ]
+
+        self.model_accessor = Mock()
+        self.model_accessor.NttWorkflowDriverWhiteListEntry.objects.filter.side_effect = \
+            lambda owner_id: [e for e in self.entries if e.owner_id == owner_id]
+
+    def tearDown(self):
+        sys.path = self.sys_path_save
+
+    def test_lookup_normalizes_mac(self):
+        self.assertEqual(self.index.lookup(self.model_accessor, 1, "0a0a0a"), [self.entries[0]])
+        self.assertEqual(self.index.lookup(self.model_accessor, 1, " 0B0B0B "), [self.entries[1]])
+        self.assertEqual(self.index.lookup(self.model_accessor, 2, "0A0A0A"), [self.entries[2]])
+        self.assertEqual(self.index.lookup(self.model_accessor, 1, "0c0c0c"), [])
+
+    def test_owner_loaded_once(self):
+        self.index.lookup(self.model_accessor, 1, "0a0a0a")
+        self.index.lookup(self.model_accessor, 1, "0b0b0b")
+        self.index.lookup(self.model_accessor, 1, "0c0c0c")
+
+        self.model_accessor.NttWorkflowDriverWhiteListEntry.objects.filter.assert_called_once_with(owner_id=1)
+
+    def test_update(self):
+        self.index.lookup(self.model_accessor, 1, "0a0a0a")
+
+        new_entry = Mock(id=4, owner_id=1, mac_address="0a0a0a")
+        self.index.update(new_entry)
+        self.assertEqual(self.index.lookup(self.model_accessor, 1, "0a0a0a"), [self.entries[0], new_entry])
+
+        # changing the MAC moves the entry to the new key
+        self.entries[0].mac_address = "0d0d0d"
+        self.index.update(self.entries[0])
+        self.assertEqual(self.index.lookup(self.model_accessor, 1, "0a0a0a"), [new_entry])
+        self.assertEqual(self.index.lookup(self.model_accessor, 1, "0D0D0D"), [self.entries[0]])
+
+    def test_remove(self):
+        self.index.lookup(self.model_accessor, 1, "0a0a0a")
+
+        self.index.remove(self.entries[0])
+        self.assertEqual(self.index.lookup(self.model_accessor, 1, "0a0a0a"), [])
+        self.assertEqual(len(self.index), 1)
+
+        # removing an unknown entry is a no-op
+        self.index.remove(Mock(id=42))
+        self.assertEqual(len(self.index), 1)
+
+    def test_snapshot(self):
+        self.assertIsNone(self.index.get_snapshot(1))
+        self.index.lookup(self.model_accessor, 1, "0a0a0a")
+        self.assertEqual(self.index.get_snapshot(1), ("0a0a0a", 1, 2))
+
+        # the snapshot doesn't follow the changes of the entry until it's indexed again
+        self.entries[0].pon_port_to = 5
+        self.assertEqual(self.index.get_port_ranges(self.model_accessor, 1, "0a0a0a").intervals(), [(1, 2)])
+        self.index.update(self.entries[0])
+        self.assertEqual(self.index.get_port_ranges(self.model_accessor, 1, "0a0a0a").intervals(), [(1, 5)])
+
+        self.index.remove(self.entries[0])
+        self.assertIsNone(self.index.get_snapshot(1))
+        self.assertEqual(self.index.get_port_ranges(self.model_accessor, 1, "0a0a0a").intervals(), [])
+
+    def test_no_snapshot_before_policy(self):
+        # the entry was updated and its policy hasn't run yet
+        self.entries[0].updated = 2
+        self.index.lookup(self.model_accessor, 1, "0a0a0a")
+        self.assertIsNone(self.index.get_snapshot(1))
+        self.assertEqual(self.index.get_snapshot(2), ("0b0b0b", 1, 2))
+        self.assertEqual(self.index.lookup(self.model_accessor, 1, "0a0a0a"), [self.entries[0]])
+
+        # the policy indexes it again
+        self.index.update(self.entries[0])
+        self.assertEqual(self.index.get_snapshot(1), ("0a0a0a", 1, 2))
+
+    def test_refresh(self):
+        def filter(owner_id, mac_address__iexact=None):
+            return [e for e in self.entries if e.owner_id == owner_id and
+                    (mac_address__iexact is None or e.mac_address.lower() == mac_address__iexact)]
+        self.model_accessor.NttWorkflowDriverWhiteListEntry.objects.filter.side_effect = filter
+
+        self.index.lookup(self.model_accessor, 1, "0a0a0a")
+        generation = self.index.generation
+
+        # the entries didn't change, the index neither
+        self.index.refresh(self.model_accessor, 1, "0A0A0A")
+        self.assertEqual(self.index.generation, generation)
+
+        # updated by another replica
+        new_entry = Mock(id=4, owner_id=1, mac_address="0a0a0a", pon_port_from=5, pon_port_to=6, policed=1, updated=1)
+        self.entries[0] = Mock(id=1, owner_id=1, mac_address="0A0A0A", pon_port_from=1, pon_port_to=3,
+                               policed=1, updated=1)
+        self.entries.append(new_entry)
+        self.index.refresh(self.model_accessor, 1, "0A0A0A")
+        self.assertNotEqual(self.index.generation, generation)
+        self.assertEqual(self.index.lookup(self.model_accessor, 1, "0a0a0a"), [self.entries[0], new_entry])
+        self.assertEqual(self.index.get_port_ranges(self.model_accessor, 1, "0a0a0a").intervals(), [(1, 3), (5, 6)])
+
+        # deleted by another replica
+        del self.entries[0]
+        self.index.refresh(self.model_accessor, 1, "0a0a0a")
+        self.assertEqual(self.index.lookup(self.model_accessor, 1, "0a0a0a"), [new_entry])
+
+    def test_reload_owner(self):
+        # not loaded yet, all the MACs of the owner changed
+        self.assertEqual(self.index.reload_owner(self.model_accessor, 1), set(["0a0a0a", "0b0b0b"]))
+        self.assertEqual(self.index.lookup(self.model_accessor, 1, "0a0a0a"), [self.entries[0]])
+
+        # imported without the policies running
+        new_entry = Mock(id=4, owner_id=1, mac_address="0C0C0C", pon_port_from=1, pon_port_to=2, policed=1, updated=1)
+        self.entries[1] = Mock(id=2, owner_id=1, mac_address="0b0b0b", pon_port_from=3, pon_port_to=4,
+                               policed=1, updated=1)
+        self.entries.append(new_entry)
+        self.assertEqual(self.index.reload_owner(self.model_accessor, 1), set(["0b0b0b", "0c0c0c"]))
+        self.assertEqual(self.index.lookup(self.model_accessor, 1, "0c0c0c"), [new_entry])
+        self.assertEqual(self.index.get_port_ranges(self.model_accessor, 1, "0b0b0b").intervals(), [(3, 4)])
+
+        # deleted
+        del self.entries[0]
+        self.assertEqual(self.index.reload_owner(self.model_accessor, 1), set(["0a0a0a"]))
+        self.assertEqual(self.index.lookup(self.model_accessor, 1, "0a0a0a"), [])
+
+        # the entries of the other owners aren't touched
+        self.assertEqual(self.index.lookup(self.model_accessor, 2, "0a0a0a"), [self.entries[1]])
+
+    def test_port_admitted_by_any_entry(self):
+        self.entries.append(Mock(id=4, owner_id=1, mac_address="0a0a0a", pon_port_from=10, pon_port_to=20))
+
+        self.assertTrue(self.index.is_port_admitted(self.model_accessor, 1, "0A0A0A", 1))
+        self.assertTrue(self.index.is_port_admitted(self.model_accessor, 1, "0a0a0a", 15))
+        self.assertFalse(self.index.is_port_admitted(self.model_accessor, 1, "0a0a0a", 5))
+        self.assertFalse(self.index.is_port_admitted(self.model_accessor, 1, "0c0c0c", 1))
+
+        self.index.remove(self.entries[3])
+        self.assertFalse(self.index.is_port_admitted(self.model_accessor, 1, "0a0a0a", 15))
+
+
+if __name__ == '__main__':
+    unittest.main()
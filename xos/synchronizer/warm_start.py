@@ -0,0 +1,109 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import resource
+import time
+
+from metrics import registry
+from service_instance_index import service_instance_index
+from whitelist_index import whitelist_index
+from onu_index import onu_index
+from technology_profile import technology_profile_cache
+from olt_information_cache import olt_information_cache
+
+
+class WarmStart(object):
+    """
+    Fills the caches and the indexes of the event steps and the model policies with a few bulk queries,
+    before the synchronizer consumes the events, instead of one query per event during the event storm
+    that follows a restart.
+
+    A step that fails is logged and skipped, its cache is filled lazily like without the warm start.
+    """
+
+    enabled = True
+
+    def __init__(self, model_accessor, log, clock=time.time):
+        self.model_accessor = model_accessor
+        self.log = log
+        self.clock = clock
+        self.stats = {}
+
+    def load_service_instances(self):
+        service_instance_index.load(self.model_accessor)
+        return len(service_instance_index)
+
+    def load_whitelist(self):
+        whitelist_index.load(self.model_accessor)
+        return len(whitelist_index)
+
+    def load_onus(self):
+        onus = self.model_accessor.ONUDevice.objects.all()
+        for onu in onus:
+            onu_index.update(onu)
+        return len(onus)
+
+    def load_olt_information(self):
+        # resolved first, the OLT information can't be cached without the package
+        (package, generation) = technology_profile_cache.resolve(self.model_accessor)
+        count = 0
+        for oi in self.model_accessor.NttWorkflowDriverOltInformation.objects.all():
+            # the PON port is only known once an event of the OLT has been processed
+            if oi.port_no is None:
+                continue
+            oi.olt_package = package
+            olt_information_cache.put(oi, generation)
+            count += 1
+        return count
+
+    def run(self):
+        """
+        :return: a dict with the number of loaded objects by kind, the duration and the memory growth (in kB)
+        """
+        start = self.clock()
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        stats = {}
+        for (name, load) in [("service_instances", self.load_service_instances),
+                             ("whitelist_entries", self.load_whitelist),
+                             ("onus", self.load_onus),
+                             ("olt_information", self.load_olt_information)]:
+            try:
+                stats[name] = load()
+            except Exception as e:
+                self.log.exception("Warm start: failed to load %s" % name, e=e)
+                stats[name] = 0
+
+        stats["seconds"] = self.clock() - start
+        # ru_maxrss is the peak resident size, in kB on Linux
+        stats["memory_kb"] = max(0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss)
+        self.stats = stats
+        self.log.info("Warm start done", **stats)
+        return stats
+
+    def get_stats(self):
+        return dict(self.stats)
+
+
+def warm_start(model_accessor, log):
+    """
+    Preload the caches, the events are only consumed once this returns
+
+    :return: the WarmStart
+    """
+    warm = WarmStart(model_accessor, log)
+    registry.register_stats("ntt_warm_start", "Objects preloaded at startup", warm.get_stats)
+    if WarmStart.enabled:
+        warm.run()
+    return warm
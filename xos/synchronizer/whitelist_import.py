@@ -0,0 +1,210 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Bulk import of NttWorkflowDriverWhiteListEntries from a CSV or YAML file.
+
+    python whitelist_import.py [--service ntt-workflow-driver] whitelist.csv
+
+CSV files have a header row with the mac_address, pon_port_from and pon_port_to columns,
+YAML files contain a list of entries with the same fields (optionally under a "whitelist" key).
+
+The entries are saved one by one, the import isn't atomic: if it fails, the entries saved so far
+are kept and the file can be imported again.
+
+The policies of the imported entries don't run one by one: the entries are saved as policed, then
+the service is saved with a new timestamp and its policy, in the synchronizer, reloads the whitelist
+and validates again the service instances of the changed MAC addresses in a single pass.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import yaml
+
+sync_path = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+sys.path.append(sync_path)
+
+from whitelist_index import normalize_mac
+
+
+FIELDS = ["mac_address", "pon_port_from", "pon_port_to"]
+
+
+def parse_row(row, line):
+    try:
+        mac_address = str(row["mac_address"]).strip()
+        pon_port_from = int(row["pon_port_from"])
+        pon_port_to = int(row["pon_port_to"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError("Invalid whitelist entry at line %s: %s" % (line, e))
+
+    if not mac_address:
+        raise ValueError("Invalid whitelist entry at line %s: empty mac_address" % line)
+    if pon_port_from > pon_port_to:
+        raise ValueError("Invalid whitelist entry at line %s: pon_port_from is greater than pon_port_to" % line)
+
+    return {"mac_address": mac_address, "pon_port_from": pon_port_from, "pon_port_to": pon_port_to}
+
+
+def load_rows(path):
+    """
+    Read the whitelist entries from a .csv, .yaml or .yml file
+
+    :raises ValueError: if an entry is invalid
+    """
+    if path.endswith(".csv"):
+        with open(path) as f:
+            # the header is line 1
+            return [parse_row(row, line) for (line, row) in enumerate(csv.DictReader(f), 2)]
+
+    if path.endswith(".yaml") or path.endswith(".yml"):
+        with open(path) as f:
+            data = yaml.safe_load(f) or []
+        if isinstance(data, dict):
+            data = data.get("whitelist", [])
+        return [parse_row(row, index) for (index, row) in enumerate(data, 1)]
+
+    raise ValueError("Unsupported file type %s, expected .csv, .yaml or .yml" % path)
+
+
+class WhitelistImporter(object):
+    """
+    Upserts a batch of whitelist entries for a service, then triggers the revalidation of the
+    service instances of the changed entries by the policy of the service.
+    """
+
+    def __init__(self, model_accessor, log, owner):
+        self.model_accessor = model_accessor
+        self.log = log
+        self.owner = owner
+
+    def upsert(self, rows):
+        """
+        Create or update the whitelist entries. A MAC address can be whitelisted on several
+        PON port ranges: the rows of a MAC address are matched with its existing entries,
+        ranges that already exist are left untouched, the other ranges update the remaining
+        entries of the MAC address (by id) or create new ones. Entries are never deleted.
+
+        :return: (created, updated)
+        """
+        existing = {}
+        for entry in self.model_accessor.NttWorkflowDriverWhiteListEntry.objects.filter(owner_id=self.owner.id):
+            existing.setdefault(normalize_mac(entry.mac_address), []).append(entry)
+
+        rows_by_mac = {}
+        for row in rows:
+            rows_by_mac.setdefault(normalize_mac(row["mac_address"]), []).append(row)
+
+        created = 0
+        updated = 0
+        for (mac, mac_rows) in rows_by_mac.items():
+            entries = sorted(existing.get(mac, []), key=lambda e: e.id)
+            ranges = set((e.pon_port_from, e.pon_port_to) for e in entries)
+            new_ranges = []
+            for row in mac_rows:
+                port_range = (row["pon_port_from"], row["pon_port_to"])
+                if port_range not in ranges and port_range not in new_ranges:
+                    new_ranges.append(port_range)
+
+            # the entries whose range isn't in the file can be reused for the new ranges
+            wanted = set((row["pon_port_from"], row["pon_port_to"]) for row in mac_rows)
+            reusable = [e for e in entries if (e.pon_port_from, e.pon_port_to) not in wanted]
+
+            for (pon_port_from, pon_port_to) in new_ranges:
+                if reusable:
+                    entry = reusable.pop(0)
+                    entry.pon_port_from = pon_port_from
+                    entry.pon_port_to = pon_port_to
+                    # without always_update_timestamp the policy of the entry doesn't run
+                    entry.save_changed_fields()
+                    updated += 1
+                else:
+                    entry = self.model_accessor.NttWorkflowDriverWhiteListEntry(
+                        owner=self.owner,
+                        mac_address=mac_rows[0]["mac_address"],
+                        pon_port_from=pon_port_from,
+                        pon_port_to=pon_port_to,
+                        # set by the policy of the entry, which doesn't run
+                        backend_need_delete_policy=True
+                    )
+                    entry.save()
+                    self.mark_policed(entry)
+                    created += 1
+
+        return (created, updated)
+
+    def mark_policed(self, entry):
+        # as the policy engine does once the policies of a model ran
+        entry.policed = max(entry.updated, entry.changed_by_step)
+        entry.save(update_fields=["policed"])
+
+    def revalidate(self):
+        """
+        Save the service with a new timestamp: its policy validates again the service instances of
+        the changed entries
+        """
+        self.owner.save(update_fields=["updated"], always_update_timestamp=True)
+
+    def run(self, rows):
+        start = time.time()
+        (created, updated) = self.upsert(rows)
+        if created or updated:
+            self.revalidate()
+        elapsed = time.time() - start
+
+        stats = {
+            "rows": len(rows),
+            "created": created,
+            "updated": updated,
+            "unchanged": len(rows) - created - updated,
+            "upsert_time": elapsed,
+            "rows_per_second": len(rows) / elapsed if elapsed > 0 else float(len(rows)),
+        }
+        self.log.info("Imported whitelist", **stats)
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import NttWorkflowDriverWhiteListEntries from a CSV or YAML file")
+    parser.add_argument("file", help="the .csv, .yaml or .yml file to import")
+    parser.add_argument("--service", default="ntt-workflow-driver", help="name of the NttWorkflowDriverService")
+    args = parser.parse_args()
+
+    rows = load_rows(args.file)
+
+    from xosconfig import Config
+    base_config_file = os.path.join(sync_path, "config.yaml")
+    mounted_config_file = os.path.join(sync_path, "mounted_config.yaml")
+    config_schema = os.path.join(sync_path, "ntt-workflow-driver-config-schema.yaml")
+    if os.path.isfile(mounted_config_file):
+        Config.init(base_config_file, config_schema, mounted_config_file)
+    else:
+        Config.init(base_config_file, config_schema)
+
+    from multistructlog import create_logger
+    from xossynchronizer.modelaccessor import model_accessor
+    log = create_logger(Config().get('logging'))
+
+    owner = model_accessor.NttWorkflowDriverService.objects.get(name=args.service)
+    stats = WhitelistImporter(model_accessor, log, owner).run(rows)
+    print(json.dumps(stats, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
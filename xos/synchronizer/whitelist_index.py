@@ -0,0 +1,211 @@
+# Copyright 2020-present Open Networking Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from pon_port_ranges import PonPortRanges
+
+
+def normalize_mac(mac_address):
+    if not mac_address:
+        return ""
+    return mac_address.strip().lower()
+
+
+def indexed_fields(entry):
+    return (entry.id, normalize_mac(entry.mac_address), entry.pon_port_from, entry.pon_port_to)
+
+
+class WhitelistIndex(object):
+    """
+    In-memory index of the NttWorkflowDriverWhiteListEntry keyed by (owner_id, normalized MAC).
+
+    The entries of an owner are loaded from the data model the first time that owner is
+    looked up, afterwards the index is kept current by the whitelist model policy.
+    `generation` changes whenever an entry is indexed or removed, so that the values derived
+    from the whitelist can be invalidated.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            # (owner_id, mac) -> {entry_id: entry}
+            self.entries = {}
+            # entry_id -> (owner_id, mac), to find the old key when the MAC of an entry changes
+            self.keys = {}
+            # entry_id -> (mac, pon_port_from, pon_port_to) as last indexed, the policies
+            # compare it with the updated entry to find out what changed
+            self.snapshots = {}
+            # (owner_id, mac) -> PonPortRanges of the entries
+            self.port_ranges = {}
+            self.loaded_owners = set()
+
+    def _add(self, entry, loaded=False):
+        self._remove(entry.id)
+        self.generation += 1
+        key = (entry.owner_id, normalize_mac(entry.mac_address))
+        self.entries.setdefault(key, {})[entry.id] = entry
+        self.keys[entry.id] = key
+        if not (loaded and entry.policed < entry.updated):
+            # the policy hasn't run yet for an entry loaded from the data model updated since,
+            # the update isn't known: without snapshot the policy validates all its SIs again
+            self.snapshots[entry.id] = (key[1], entry.pon_port_from, entry.pon_port_to)
+        self.port_ranges.setdefault(key, PonPortRanges()).add(entry.id, entry.pon_port_from, entry.pon_port_to)
+
+    def _remove(self, entry_id):
+        key = self.keys.pop(entry_id, None)
+        if key is None:
+            return
+        self.generation += 1
+        self.snapshots.pop(entry_id, None)
+        entries = self.entries.get(key)
+        entries.pop(entry_id, None)
+        self.port_ranges[key].remove(entry_id)
+        if not entries:
+            del self.entries[key]
+            del self.port_ranges[key]
+
+    def load_owner(self, model_accessor, owner_id):
+        entries = model_accessor.NttWorkflowDriverWhiteListEntry.objects.filter(owner_id=owner_id)
+        with self.lock:
+            for entry in entries:
+                self._add(entry, loaded=True)
+            self.loaded_owners.add(owner_id)
+
+    def load(self, model_accessor):
+        """
+        Load the entries of all the owners at once
+        """
+        entries = model_accessor.NttWorkflowDriverWhiteListEntry.objects.all()
+        # the services without entries are loaded too
+        owner_ids = [service.id for service in model_accessor.NttWorkflowDriverService.objects.all()]
+        with self.lock:
+            for entry in entries:
+                self._add(entry, loaded=True)
+                self.loaded_owners.add(entry.owner_id)
+            self.loaded_owners.update(owner_ids)
+
+    def reload_owner(self, model_accessor, owner_id):
+        """
+        Load the entries of `owner_id` again, when they changed without their policies running (eg: a bulk import)
+
+        :return: the normalized MAC addresses whose entries changed
+        """
+        entries = model_accessor.NttWorkflowDriverWhiteListEntry.objects.filter(owner_id=owner_id)
+        current = {}
+        for entry in entries:
+            current.setdefault(normalize_mac(entry.mac_address), []).append(entry)
+        with self.lock:
+            indexed = dict((key[1], by_id.values()) for (key, by_id) in self.entries.items() if key[0] == owner_id)
+            if owner_id in self.loaded_owners:
+                changed = set(mac for mac in set(indexed) | set(current)
+                              if sorted(map(indexed_fields, indexed.get(mac, []))) !=
+                              sorted(map(indexed_fields, current.get(mac, []))))
+            else:
+                changed = set(current)
+            for mac in changed:
+                for entry in indexed.get(mac, []):
+                    self._remove(entry.id)
+            for mac in changed:
+                for entry in current.get(mac, []):
+                    self._add(entry, loaded=True)
+            self.loaded_owners.add(owner_id)
+        return changed
+
+    def refresh(self, model_accessor, owner_id, mac_address):
+        """
+        Index the entries of `owner_id` matching `mac_address` as found in the data model, when their policy
+        may have run in another replica. The index (and its generation) only changes if the entries did.
+        """
+        self._ensure_owner(model_accessor, owner_id)
+        mac = normalize_mac(mac_address)
+        entries = model_accessor.NttWorkflowDriverWhiteListEntry.objects.filter(owner_id=owner_id,
+                                                                               mac_address__iexact=mac)
+        current = dict((entry.id, entry) for entry in entries)
+        with self.lock:
+            indexed = self.entries.get((owner_id, mac), {})
+            if sorted(map(indexed_fields, indexed.values())) == sorted(map(indexed_fields, current.values())):
+                return
+            for entry_id in list(indexed):
+                if entry_id not in current:
+                    self._remove(entry_id)
+            for entry in current.values():
+                self._add(entry, loaded=True)
+
+    def update(self, entry):
+        with self.lock:
+            self._add(entry)
+
+    def remove(self, entry):
+        with self.lock:
+            self._remove(entry.id)
+
+    def lookup(self, model_accessor, owner_id, mac_address):
+        """
+        Return the whitelist entries of `owner_id` matching `mac_address`, ordered by id.
+        """
+        self._ensure_owner(model_accessor, owner_id)
+        with self.lock:
+            entries = self.entries.get((owner_id, normalize_mac(mac_address)), {})
+            return [entries[entry_id] for entry_id in sorted(entries)]
+
+    def get_generation(self, model_accessor, owner_id):
+        """
+        Return the generation of the index once the entries of `owner_id` are loaded
+        """
+        self._ensure_owner(model_accessor, owner_id)
+        with self.lock:
+            return self.generation
+
+    def get_snapshot(self, entry_id):
+        """
+        Return the (mac, pon_port_from, pon_port_to) of an entry as it was last indexed, None if it isn't indexed
+        """
+        with self.lock:
+            return self.snapshots.get(entry_id)
+
+    def _ensure_owner(self, model_accessor, owner_id):
+        with self.lock:
+            loaded = owner_id in self.loaded_owners
+        if not loaded:
+            self.load_owner(model_accessor, owner_id)
+
+    def get_port_ranges(self, model_accessor, owner_id, mac_address):
+        """
+        Return a copy of the PonPortRanges of the entries of `owner_id` matching `mac_address`
+        """
+        self._ensure_owner(model_accessor, owner_id)
+        with self.lock:
+            ranges = self.port_ranges.get((owner_id, normalize_mac(mac_address)))
+            return ranges.copy() if ranges else PonPortRanges()
+
+    def is_port_admitted(self, model_accessor, owner_id, mac_address, port_no):
+        """
+        Check if one of the entries of `owner_id` matching `mac_address` admits the PON port
+        """
+        self._ensure_owner(model_accessor, owner_id)
+        with self.lock:
+            ranges = self.port_ranges.get((owner_id, normalize_mac(mac_address)))
+            return ranges is not None and ranges.contains(port_no)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.keys)
+
+
+whitelist_index = WhitelistIndex()